@@ -1,5 +1,23 @@
 from .config import *
 from .credential import *
 from .launcher import *
+from .autotype import *
+from .otp import *
+from .hashing import *
+from .mutate import *
+from .columns import *
+from .completion import *
+from .compression import *
+from .history import *
+from .filter import *
+from .merge import *
+from .parsers import *
+from .schema import *
+from .template import *
+from .watch import *
+from .script import *
+from .stats import *
+from .spray import *
+from .vault import *
 
 name = 'ctfcred'
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+import shutil
+import subprocess
+
+from typing import Callable
+from ctfcred.config import Config, DependencyException
+
+
+class AutoTypeException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class AutoType:
+    '''
+    AutoType performs a sequence of fields and key presses for a credential, like filling
+    the username and password of a login form and submitting it. Sequences consist of field
+    names and keys in angle brackets, e.g. user<TAB>pass<ENTER>. If a typing tool is available
+    (wtype on Wayland, xdotool on X11), the sequence is typed into the focused window.
+    Otherwise, the fields are placed into the clipboard one after another, where each field
+    is served for exactly one paste (wl-copy --paste-once or xclip -loops 1). Key presses
+    are skipped in this case. Typed text is passed via stdin, so that it does not show up
+    within the process list.
+    '''
+    default = 'user<TAB>pass<ENTER>'
+
+    fields = {
+               'pass': 0,
+               'user': 11,
+               'otp': 13,
+               'url': 14,
+               'domain': 15,
+               'user_domain': 16,
+             }
+
+    keys = {
+             'TAB': 'Tab',
+             'ENTER': 'Return',
+             'ESC': 'Escape',
+             'SPACE': 'space',
+           }
+
+    token = re.compile(r'<(\w+)>|(\w+)|(\S)')
+
+    def parse(sequence: str) -> list[tuple[str, str]]:
+        '''
+        Parses a sequence into a list of steps. Each step is either a field that needs
+        to be typed or a key that needs to be pressed.
+
+        Parameters:
+            sequence        Sequence to parse (e.g. user<TAB>pass<ENTER>)
+
+        Returns:
+            list            Tuples of step kind (field or key) and field or key name
+        '''
+        steps = []
+
+        for match in AutoType.token.finditer(sequence):
+
+            key, field, invalid = match.groups()
+
+            if key:
+                steps.append(('key', AutoType.keys.get(key.upper(), key)))
+
+            elif field in AutoType.fields:
+                steps.append(('field', field))
+
+            else:
+                raise AutoTypeException(f"Invalid item '{field or invalid}' within sequence '{sequence}'. "
+                                        f"Available fields: {', '.join(AutoType.fields)}.")
+
+        if not any(kind == 'field' for kind, name in steps):
+            raise AutoTypeException(f"Sequence '{sequence}' does not contain any field.")
+
+        return steps
+
+    def typer() -> str:
+        '''
+        Returns the available typing tool.
+
+        Parameters:
+            None
+
+        Returns:
+            str             wtype, xdotool or None
+        '''
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wtype'):
+            return 'wtype'
+
+        if os.environ.get('DISPLAY') and shutil.which('xdotool'):
+            return 'xdotool'
+
+        return None
+
+    def clipper() -> str:
+        '''
+        Returns the available tool to serve a single paste from the clipboard.
+
+        Parameters:
+            None
+
+        Returns:
+            str             wl-copy, xclip or None
+        '''
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-copy'):
+            return 'wl-copy'
+
+        if os.environ.get('DISPLAY') and shutil.which('xclip'):
+            return 'xclip'
+
+        return None
+
+    def type_steps(tool: str, steps: list[tuple[str, str]]) -> None:
+        '''
+        Types the specified steps into the focused window.
+
+        Parameters:
+            tool            Typing tool (wtype or xdotool)
+            steps           Tuples of step kind (text or key) and value
+
+        Returns:
+            None
+        '''
+        for kind, value in steps:
+
+            if kind == 'key' and tool == 'wtype':
+                subprocess.run(['wtype', '-k', value], check=True)
+
+            elif kind == 'key':
+                subprocess.run(['xdotool', 'key', '--clearmodifiers', value], check=True)
+
+            elif tool == 'wtype':
+                subprocess.run(['wtype', '-'], input=value.encode('utf-8'), check=True)
+
+            else:
+                subprocess.run(['xdotool', 'type', '--clearmodifiers', '--file', '-'], input=value.encode('utf-8'), check=True)
+
+    def rotate(tool: str, steps: list[tuple[str, str]]) -> None:
+        '''
+        Places the text steps into the clipboard one after another. Each call blocks until
+        the clipboard content was pasted once.
+
+        Parameters:
+            tool            Clipboard tool (wl-copy or xclip)
+            steps           Tuples of step kind (text or key) and value
+
+        Returns:
+            None
+        '''
+        if tool == 'wl-copy':
+            command = ['wl-copy', '--paste-once', '--foreground']
+
+        else:
+            command = ['xclip', '-selection', 'clipboard', '-loops', '1', '-quiet']
+
+        for kind, value in steps:
+
+            if kind == 'text':
+                subprocess.run(command, input=value.encode('utf-8'), stdout=subprocess.DEVNULL, check=True)
+
+    def detach() -> bool:
+        '''
+        Forks a detached child process that performs the sequence, so that the calling
+        process (e.g. a rofi script mode callback) can return immediately.
+
+        Parameters:
+            None
+
+        Returns:
+            bool            True within the child process, False within the parent
+        '''
+        if os.fork() != 0:
+            return False
+
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+
+        for fd in range(3):
+            os.dup2(devnull, fd)
+
+        return True
+
+    def run(steps: list[tuple[str, str]], notify: Callable[[str], None] = None, detach: bool = False) -> None:
+        '''
+        Performs the specified steps, either by typing them or by rotating the clipboard.
+        Typing starts after a short delay, which gives the previously focused window the
+        chance to regain the focus after the picker was closed.
+
+        Parameters:
+            steps           Tuples of step kind (text or key) and value
+            notify          Optional function to send a notification with
+            detach          Perform the sequence within a detached child process
+
+        Returns:
+            None
+        '''
+        typer = AutoType.typer()
+        clipper = None if typer else AutoType.clipper()
+
+        if not typer and not clipper:
+            raise DependencyException('Auto-Type requires wtype, xdotool, wl-copy or xclip.')
+
+        if clipper and notify:
+            notify(f"Paste {len([step for step in steps if step[0] == 'text'])} values one after another")
+
+        if detach and not AutoType.detach():
+            return
+
+        try:
+
+            if typer:
+                time.sleep(Config.autotype_delay)
+                AutoType.type_steps(typer, steps)
+
+            else:
+                AutoType.rotate(clipper, steps)
+
+        finally:
+
+            if detach:
+                sys.stdout.flush()
+                os._exit(0)
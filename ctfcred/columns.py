@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import heapq
+import json
+import mmap
+import struct
+
+from pathlib import Path
+from typing import Iterable, Iterator
+from ctfcred.config import Config
+from ctfcred.utils import create_private
+
+
+class ColumnStore:
+    '''
+    The ColumnStore maintains a columnar copy of the credential file next to the YAML store.
+    For each field, it stores a dictionary of the distinct values (sorted and length prefixed).
+    Exports that only need a single field can stream the distinct values from the memory
+    mapped dictionary without parsing the YAML store or creating Credential objects. The
+    column files are only readable by the current user.
+    '''
+    fields = ['username', 'password', 'url', 'domain']
+
+    def path(name: str) -> Path:
+        '''
+        Returns the path of a file within the column directory.
+
+        Parameters:
+            name        Name of the file
+
+        Returns:
+            Path        Path of the file
+        '''
+        return Config.column_dir.joinpath(name)
+
+    def write(records: list[dict]) -> None:
+        '''
+        Writes the column files for the specified credential records. The meta file is written
+        last and contains the modification time and size of the credential file. Column files
+        are only considered valid if these match the current credential file. Encrypted
+        credential files have no column store.
+
+        Parameters:
+            records     Credential records as stored within the credential file
+
+        Returns:
+            None
+        '''
+        if Config.is_encrypted():
+            return
+
+        Config.column_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        for field in ColumnStore.fields:
+
+            dictionary = sorted({record.get(field) for record in records if record.get(field)})
+            data = b''.join(struct.pack('<I', len(value)) + value for value in (v.encode('utf-8') for v in dictionary))
+
+            ColumnStore.write_file(f'{field}.dict', data)
+
+        stat = Config.credential_file.stat()
+        meta = {
+                 'mtime': stat.st_mtime_ns,
+                 'size': stat.st_size,
+                 'count': len(records),
+                 'default_url': Config.default_url,
+                 'default_domain': Config.default_domain,
+               }
+
+        ColumnStore.write_file('meta.json', json.dumps(meta).encode('utf-8'))
+
+    def resync(meta: dict) -> None:
+        '''
+        Marks the column files as in sync with the credential file again, after the credential
+        file was rewritten without changing its credentials or defaults. Nothing is done if the
+        column files were not in sync before (meta is None).
+
+        Parameters:
+            meta        Meta information obtained before the credential file was rewritten
+
+        Returns:
+            None
+        '''
+        if meta is None or Config.is_encrypted():
+            return
+
+        stat = Config.credential_file.stat()
+        meta = dict(meta, mtime=stat.st_mtime_ns, size=stat.st_size)
+
+        ColumnStore.write_file('meta.json', json.dumps(meta).encode('utf-8'))
+
+    def write_file(name: str, data: bytes) -> None:
+        '''
+        Atomically replaces a file within the column directory. The file is only readable
+        by the current user.
+
+        Parameters:
+            name        Name of the file
+            data        Content of the file
+
+        Returns:
+            None
+        '''
+        path = ColumnStore.path(name)
+        tmp = path.with_name(path.name + '.tmp')
+        create_private(tmp)
+
+        with open(tmp, 'wb') as file:
+            file.write(data)
+
+        os.replace(tmp, path)
+
+    def meta() -> dict:
+        '''
+        Returns the meta information of the column files if they are in sync with the
+        credential file. Otherwise, None is returned.
+
+        Parameters:
+            None
+
+        Returns:
+            dict        Meta information or None
+        '''
+        try:
+            with open(ColumnStore.path('meta.json'), 'r') as file:
+                meta = json.load(file)
+
+            stat = Config.credential_file.stat()
+
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('mtime') != stat.st_mtime_ns or meta.get('size') != stat.st_size:
+            return None
+
+        return meta
+
+    def read_dictionary(field: str) -> Iterator[str]:
+        '''
+        Streams the distinct values of a field from the memory mapped dictionary file.
+
+        Parameters:
+            field       Field to read
+
+        Returns:
+            iterator    Sorted distinct values of the field
+        '''
+        with open(ColumnStore.path(f'{field}.dict'), 'rb') as file:
+
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+                offset = 0
+
+                while offset < len(data):
+
+                    length, = struct.unpack_from('<I', data, offset)
+                    offset += 4
+
+                    yield data[offset:offset + length].decode('utf-8')
+                    offset += length
+
+    def distinct(field: str) -> Iterable[str]:
+        '''
+        Returns the sorted distinct values of the specified field. For urls and domains, the
+        configured default value is included. If the column files are out of sync with the
+        credential file, None is returned.
+
+        Parameters:
+            field       Field to read
+
+        Returns:
+            iterable    Sorted distinct values or None
+        '''
+        meta = ColumnStore.meta()
+
+        if meta is None:
+            return None
+
+        values = ColumnStore.read_dictionary(field)
+        default = meta.get(f'default_{field}')
+
+        if default:
+            values = ColumnStore.unique(heapq.merge(values, [default]))
+
+        return values
+
+    def unique(values: Iterable[str]) -> Iterator[str]:
+        '''
+        Removes adjacent duplicates from a sorted iterable.
+
+        Parameters:
+            values      Sorted iterable
+
+        Returns:
+            iterator    Sorted iterable without duplicates
+        '''
+        last = None
+
+        for value in values:
+
+            if value != last:
+                yield value
+
+            last = value
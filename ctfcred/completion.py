@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+
+from typing import Iterable
+from ctfcred.config import Config
+from ctfcred.utils import create_private
+
+
+class CompletionIndex:
+    '''
+    The CompletionIndex maintains plain text files with the distinct values of certain
+    credential fields (one value per line, sorted). The bash completion script reads these
+    files directly, so that stored values can be completed without starting python and
+    parsing the credential file on each TAB.
+    '''
+    fields = {
+               'user': lambda record: [record.get('username')],
+               'alias': lambda record: [record.get('alias')],
+               'domain': lambda record: [record.get('domain')],
+               'url': lambda record: [record.get('url')],
+               'tag': lambda record: record.get('tags') or [],
+             }
+
+    def write(records: list[dict]) -> None:
+        '''
+        Writes the completion index for the specified credential records. Apart from the
+        credential fields, the configured defaults, the names of export watermarks and the
+        ids of import batches are indexed. Encrypted credential files are not indexed. The
+        index is only readable by the current user.
+
+        Parameters:
+            records     Credential records as stored within the credential file
+
+        Returns:
+            None
+        '''
+        if Config.is_encrypted():
+            return
+
+        index = {field: set() for field in CompletionIndex.fields}
+
+        for record in records:
+            for field, values in CompletionIndex.fields.items():
+                index[field].update(values(record))
+
+        index['domain'].add(Config.default_domain)
+        index['url'].add(Config.default_url)
+        index['watermark'] = set(Config.watermarks)
+        index['batch'] = {str(batch) for batch in Config.imports}
+
+        for field, values in index.items():
+            CompletionIndex.write_field(field, values)
+
+    def write_field(field: str, values: Iterable[str]) -> None:
+        '''
+        Atomically replaces the index file of a single field. Encrypted credential files
+        are not indexed.
+
+        Parameters:
+            field       Name of the indexed field
+            values      Values of the field
+
+        Returns:
+            None
+        '''
+        if Config.is_encrypted():
+            return
+
+        Config.completion_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        Config.completion_dir.chmod(0o700)
+
+        path = Config.completion_dir.joinpath(field)
+        tmp = path.with_name(path.name + '.tmp')
+        create_private(tmp)
+
+        with open(tmp, 'w') as file:
+            file.writelines(f'{value}\n' for value in sorted(value for value in values if value and '\n' not in value))
+
+        os.replace(tmp, path)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import io
+import gzip
+
+from pathlib import Path
+from typing import IO
+from ctfcred.config import DependencyException
+
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+
+class Compression:
+    '''
+    The Compression class provides transparent compression for the credential file, for
+    exports and for imported files. Compressed files are detected by their magic bytes
+    when reading and by their file extension when writing. All streams are compressed and
+    decompressed incrementally, so files are never buffered as a whole. gzip support is
+    always available, zstd requires the optional zstandard package.
+    '''
+    methods = ['gzip', 'zstd']
+
+    magic = {
+              b'\x1f\x8b': 'gzip',
+              b'\x28\xb5\x2f\xfd': 'zstd',
+            }
+
+    suffixes = {
+                 '.gz': 'gzip',
+                 '.zst': 'zstd',
+               }
+
+    def detect(path: Path) -> str:
+        '''
+        Detects the compression method of a file by its magic bytes.
+
+        Parameters:
+            path            Path of the file
+
+        Returns:
+            str             Compression method or None for uncompressed files
+        '''
+        try:
+            with open(path, 'rb') as file:
+                head = file.read(4)
+
+        except FileNotFoundError:
+            return None
+
+        for magic, method in Compression.magic.items():
+            if head.startswith(magic):
+                return method
+
+        return None
+
+    def zstd() -> zstandard:
+        '''
+        Returns the zstandard module or raises a DependencyException if it is missing.
+
+        Parameters:
+            None
+
+        Returns:
+            module          zstandard module
+        '''
+        if zstandard is None:
+            raise DependencyException("zstd compression requires the 'zstandard' package.")
+
+        return zstandard
+
+    def open(path: Path, mode: str = 'r', method: str = None, errors: str = None) -> IO:
+        '''
+        Opens a possibly compressed file. When reading, the compression method is detected
+        from the file content. When writing, the compression method is taken from the
+        method argument or, if not specified, from the file extension.
+
+        Parameters:
+            path            Path of the file
+            mode            Open mode ('r', 'rb', 'w', 'wb' or 'a')
+            method          Compression method for writing (gzip, zstd or None)
+            errors          Error handling for text mode
+
+        Returns:
+            IO              File object
+        '''
+        path = Path(path)
+        binary = 'b' in mode
+
+        if mode.startswith('r'):
+            method = Compression.detect(path)
+
+        elif method is None:
+            method = Compression.suffixes.get(path.suffix)
+
+        if method is None:
+            return open(path, mode, errors=None if binary else errors)
+
+        if method == 'gzip':
+            stream = gzip.open(path, mode.rstrip('b') + 'b', compresslevel=6)
+
+        elif mode.startswith('r'):
+            stream = Compression.zstd().ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True)
+
+        else:
+            stream = Compression.zstd().ZstdCompressor().stream_writer(open(path, mode.rstrip('b') + 'b'))
+
+        if binary:
+            return stream
+
+        return io.TextIOWrapper(stream, encoding='utf-8', errors=errors)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import os
+import stat
 import yaml
 import shutil
+import tempfile
 
 from pathlib import Path
+from ctfcred.utils import create_private
 
 
 class DependencyException(Exception):
@@ -25,6 +29,7 @@ class Config:
     '''
     notify_send = True
     browser = True
+    rofi = True
 
     move_up = 'Ctrl+K'
     copy_otp = 'Ctrl+o'
@@ -35,6 +40,8 @@ class Config:
     copy_username = 'Ctrl+C'
     copy_password = 'Ctrl+c'
     copy_user_domain = 'Ctrl+F'
+    copy_user_pass = 'Ctrl+U'
+    autotype = 'Ctrl+T'
     delete_credential = 'Ctrl+X'
 
     key_mappings = [
@@ -47,20 +54,43 @@ class Config:
                     '-kb-custom-7', copy_user_domain,
                     '-kb-custom-8', move_up,
                     '-kb-custom-9', move_down,
-                    '-kb-custom-10', open_url
+                    '-kb-custom-10', open_url,
+                    '-kb-custom-11', copy_user_pass,
+                    '-kb-custom-12', autotype,
                    ]
 
     url_sep = 30
     user_sep = 20
 
+    delimiter = '\n'
+    otp_column = False
+
     credential_file = Path.home().joinpath('.ctfcred.yml')
+    hash_cache = Path.home().joinpath('.cache', 'ctfcred', 'hashes.json')
+    column_dir = Path.home().joinpath('.cache', 'ctfcred', 'columns')
+    completion_dir = Path.home().joinpath('.cache', 'ctfcred', 'completion')
+    row_cache = Path.home().joinpath('.cache', 'ctfcred', 'rows.json')
+    history_dir = Path.home().joinpath('.local', 'share', 'ctfcred', 'history')
+    agent_socket = Path(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()) \
+        .joinpath(f'ctfcred-agent-{os.getuid()}.sock')
+
+    agent_ttl = 900
+    encrypted = None
+    compression = None
+    vault_magic = b'ctfcred-vault-1\n'
 
     default_url = None
     default_domain = None
+    default_sequence = None
+    autotype_delay = 0.3
+
+    imports = {}
+    watermarks = {}
 
     def check_external_dependencies() -> None:
         '''
-        Checks if the required external execuatbles are present.
+        Checks if the required external execuatbles are present. If rofi is not available
+        or there is no graphical session, the terminal picker is used instead.
 
         Parameters:
             None
@@ -68,8 +98,8 @@ class Config:
         Returns:
             None
         '''
-        if not shutil.which('rofi'):
-            raise DependencyException("Unable to find 'rofi' in your current PATH.")
+        display = os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')
+        Config.rofi = Config.rofi and bool(shutil.which('rofi') and display)
 
         if not shutil.which('notify-send'):
             Config.notify_send = False
@@ -88,26 +118,65 @@ class Config:
             content     content of the credential file
         '''
         if not Config.credential_file.is_file():
-            Config.credential_file.touch()
+            create_private(Config.credential_file)
+
+        yml = Config.read_cred_file(Config.credential_file)
+
+        if yml:
+            Config.load_meta(yml)
+
+        return yml
+
+    def load_meta(yml: dict) -> None:
+        '''
+        Applies the defaults, import batches and export watermarks that are stored within
+        the content of a credential file.
+
+        Parameters:
+            yml         content of the credential file
+
+        Returns:
+            None
+        '''
+        Config.default_url = Config.default_url or yml.get('default_url', None)
+        Config.default_domain = Config.default_domain or yml.get('default_domain', None)
+        Config.default_sequence = Config.default_sequence or yml.get('default_sequence', None)
+        Config.imports = yml.get('imports', None) or {}
+        Config.watermarks = yml.get('watermarks', None) or {}
+
+    def read_cred_file(path: Path) -> dict:
+        '''
+        Parses the specified credential file without changing the current configuration.
+
+        Parameters:
+            path        Path of the credential file
+
+        Returns:
+            content     content of the credential file
+        '''
+        with open(path, 'rb') as file:
+
+            if file.read(len(Config.vault_magic)) == Config.vault_magic:
+                from ctfcred.vault import Vault
+                return Vault.read(path)
 
-        with open(Config.credential_file, 'r') as file:
+        from ctfcred.compression import Compression
+
+        with Compression.open(path, 'r') as file:
 
             try:
-                yml = yaml.safe_load(file)
+                return yaml.safe_load(file)
 
             except yaml.YAMLError as e:
                 raise MalformedCredentialFile(str(e))
 
-        if yml:
-            Config.default_url = Config.default_url or yml.get('default_url', None)
-            Config.default_domain = Config.default_domain or yml.get('default_domain', None)
-
-        return yml
-
     def write_cred_file(yml: dict) -> None:
         '''
         Writes the credential file using the specified dictionary. Apart from user
-        credentials, appends the global default url and global default domain.
+        credentials, appends the global default url, global default domain, the default
+        auto-type sequence, the import batches and the export watermarks. The file is
+        replaced atomically, so that an interrupted write never leaves a partially written
+        credential file.
 
         Parameters:
             yml         dictionary that contains the credentials to write
@@ -117,9 +186,87 @@ class Config:
         '''
         yml['default_url'] = Config.default_url
         yml['default_domain'] = Config.default_domain
+        yml['default_sequence'] = Config.default_sequence
+        yml['imports'] = Config.imports
+        yml['watermarks'] = Config.watermarks
+
+        Config.replace_cred_file(Config.credential_file, yml, Config.is_encrypted(), Config.store_compression())
+
+    def replace_cred_file(path: Path, yml: dict, encrypted: bool = False, compression: str = None) -> None:
+        '''
+        Atomically replaces the specified credential file with the specified content.
+        New credential files are only accessible by the current user, existing ones keep
+        their permissions.
+
+        Parameters:
+            path        Path of the credential file
+            yml         content of the credential file
+            encrypted   Whether the credential file uses encrypted storage
+            compression Compression method or None for an uncompressed file
+
+        Returns:
+            None
+        '''
+        resolved = Path(path).resolve()
+        tmp = resolved.with_name(resolved.name + '.tmp')
+        create_private(tmp)
+
+        if encrypted:
+            from ctfcred.vault import Vault
+            data = Vault.write(path, yml)
+
+            with open(tmp, 'wb') as file:
+                file.write(data)
+
+        else:
+            from ctfcred.compression import Compression
+
+            with Compression.open(tmp, 'w', compression) as file:
+                yaml.dump(yml, file, default_flow_style=False)
+
+        if resolved.exists():
+            os.chmod(tmp, stat.S_IMODE(resolved.stat().st_mode))
+
+        os.replace(tmp, resolved)
+
+    def is_encrypted() -> bool:
+        '''
+        Checks whether the credential file uses encrypted storage. Unless the storage was
+        switched explicitly, this is determined by the header of the credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            bool        True if the credential file is encrypted
+        '''
+        if Config.encrypted is None:
+
+            try:
+                with open(Config.credential_file, 'rb') as file:
+                    Config.encrypted = file.read(len(Config.vault_magic)) == Config.vault_magic
+
+            except FileNotFoundError:
+                Config.encrypted = False
+
+        return Config.encrypted
+
+    def store_compression() -> str:
+        '''
+        Returns the compression method of the credential file. Unless the method was
+        set explicitly, it is detected from the magic bytes of the credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            str         Compression method or None for an uncompressed file
+        '''
+        if Config.compression is None:
+            from ctfcred.compression import Compression
+            Config.compression = Compression.detect(Config.credential_file) or ''
 
-        with open(Config.credential_file, 'w') as file:
-            yaml.dump(yml, file, default_flow_style=False)
+        return Config.compression or None
 
     def key_bindings(width: int) -> str:
         '''
@@ -142,8 +289,11 @@ class Config:
         return_str += f'  {Config.open_url.ljust(width)}Open URL\n'
         return_str += f'  {Config.copy_domain.ljust(width)}Copy Domain\n'
         return_str += f'  {Config.copy_user_domain.ljust(width)}Copy User with Domain\n'
+        return_str += f'  {Config.copy_user_pass.ljust(width)}Copy User:Pass\n'
+        return_str += f'  {Config.autotype.ljust(width)}Auto-Type Credential\n'
         return_str += f'  {Config.delete_credential.ljust(width)}Delete Credential\n'
         return_str += f'  {Config.move_up.ljust(width)}Move Credential one Up\n'
-        return_str += f'  {Config.move_down.ljust(width)}Move Credential one Down\n\n'
+        return_str += f'  {Config.move_down.ljust(width)}Move Credential one Down\n'
+        return_str += f"  {'Shift+Enter'.ljust(width)}Select multiple Credentials\n\n"
 
         return return_str
@@ -1,13 +1,35 @@
 from __future__ import annotations
 
+import sys
 import time
 import base64
+import secrets
+import functools
 import itertools
+import concurrent.futures
 
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 from datetime import datetime
 from ctfcred.config import Config
-from ctfcred.utils import print_collection
+from ctfcred.filter import CredentialIndex
+from ctfcred.columns import ColumnStore
+from ctfcred.completion import CompletionIndex
+from ctfcred.compression import Compression
+from ctfcred.history import History
+from ctfcred.otp import TOTPEngine
+from ctfcred.mutate import Mutator
+from ctfcred.hashing import Hasher
+from ctfcred.parsers import parse_loot_file
+from ctfcred.schema import Schema
+from ctfcred.template import Template
+from ctfcred.utils import print_collection, sample, ShardWriter
+
+
+class UnknownImportBatch(Exception):
+    '''
+    Custom Exception class.
+    '''
 
 
 class MissingCredentialAttribute(Exception):
@@ -26,7 +48,9 @@ class Credential:
     count = itertools.count(1)
 
     def __init__(self, username: str, password: str, note: str, url: str, otp: str, domain: str,
-                 created: int, c_note: bool = None, alias: str = None) -> None:
+                 created: int, c_note: bool = None, alias: str = None, modified: float = None,
+                 tags: list[str] = None, batch: int = None, hash: str = None, uid: str = None,
+                 sequence: str = None) -> None:
         '''
         Creates a new Credential object.
 
@@ -40,12 +64,20 @@ class Credential:
             created         Timestamp when the object was created
             c_note          Whether the specified note is a custom note
             alias           Alias to use for the username
+            modified        Timestamp when the object was last modified
+            tags            List of tags for the credential
+            batch           Import batch the credential belongs to
+            hash            NT or NetNTLMv2 hash of the credential
+            uid             Stable identifier of the credential across credential files
+            sequence        Auto-type sequence of the credential
 
         Returns:
             None
         '''
         self.id = next(self.count)
+        self.uid = uid or secrets.token_hex(8)
         self.timestamp = created or time.time()
+        self.modified = modified or self.timestamp
 
         if note:
             self.note = note
@@ -58,6 +90,10 @@ class Credential:
         self.otp = otp
         self.url = url
         self.alias = alias
+        self.tags = sorted(set(tags or []))
+        self.batch = batch
+        self.hash = hash
+        self.sequence = sequence
         self.username = username or None
         self.password = password or None
         self.domain = domain
@@ -80,6 +116,7 @@ class Credential:
         retval = retval and (self.otp == other.otp)
         retval = retval and (self.url == other.url)
         retval = retval and (self.domain == other.domain)
+        retval = retval and (self.hash == other.hash)
 
         if self.custom_note or other.custom_note:
             retval = retval and (self.note == other.note)
@@ -98,10 +135,10 @@ class Credential:
             hash         Hash value
         '''
         if self.custom_note:
-            hash_tuple = (self.username, self.password, self.note, self.otp, self.url, self.domain)
+            hash_tuple = (self.username, self.password, self.note, self.otp, self.url, self.domain, self.hash)
 
         else:
-            hash_tuple = (self.username, self.password, self.otp, self.url, self.domain)
+            hash_tuple = (self.username, self.password, self.otp, self.url, self.domain, self.hash)
 
         return hash(hash_tuple)
 
@@ -124,7 +161,13 @@ class Credential:
                      'url': self.url,
                      'domain': self.domain,
                      'timestamp': self.timestamp,
-                     'alias': self.alias
+                     'modified': self.modified,
+                     'alias': self.alias,
+                     'tags': self.tags,
+                     'batch': self.batch,
+                     'hash': self.hash,
+                     'uid': self.uid,
+                     'sequence': self.sequence,
                     }
 
         return cred_dict
@@ -138,7 +181,7 @@ class Credential:
             None
 
         Returns:
-            prop_str            Property string (P=Password,O=TOP,D=Domain)
+            prop_str            Property string (P=Password,O=TOP,D=Domain,H=Hash)
         '''
         prop_str = ''
 
@@ -151,17 +194,42 @@ class Credential:
         if self.domain:
             prop_str += 'D'
 
-        return prop_str.ljust(3)
+        if self.hash:
+            prop_str += 'H'
+
+        return prop_str.ljust(4)
+
+    def user_string(self, domain: bool, dsep: str = '/') -> str:
+        '''
+        Returns the username of the credential. If domain is true, the username is
+        prefixed with the credential domain or the default domain.
+
+        Parameters:
+            domain          Whether to prefix the username with the domain
+            dsep            Separator between domain and username
 
-    def format(self):
+        Returns:
+            str             Username with optional domain prefix
+        '''
+        domain_str = ''
+
+        if domain:
+            domain_str = self.domain or Config.default_domain or ''
+
+            if domain_str:
+                domain_str += dsep
+
+        return f'{domain_str}{self.username}'
+
+    def format(self, otp: str = '') -> str:
         '''
         Formats the credential object as it is displayed in rofi.
 
         Parameters:
-            None
+            otp             Optional OTP column to display
 
         Returns:
-            None
+            str             Formatted credential
         '''
         cid = f'{self.id}.'.ljust(4)
 
@@ -173,9 +241,14 @@ class Credential:
         url = Credential.ljust((self.url or ''), Config.url_sep)
         prop_str = self.get_hidden_property_string()
         note = self.note or ''
-        return f'{cid}{username}{url}  {prop_str}  {note}\n'
 
-    def clone(self, username: str, password: str, note: str, url: str, otp: str, domain: str, alias: str) -> Credential:
+        if self.tags:
+            note = f'[{",".join(self.tags)}] {note}'
+
+        return f'{cid}{username}{url}  {prop_str}  {otp}{note}\n'
+
+    def clone(self, username: str, password: str, note: str, url: str, otp: str, domain: str, alias: str,
+              tags: list[str] = None, sequence: str = None) -> Credential:
         '''
         Clones the current credential object.
 
@@ -187,6 +260,8 @@ class Credential:
             otp             New otp
             domain          New domain
             alias           New alias
+            tags            Additional tags
+            sequence        New auto-type sequence
 
         Returns:
             credential      Cloned credential object
@@ -197,6 +272,7 @@ class Credential:
         otp = otp or self.otp
         domain = domain or self.domain
         alias = alias or self.alias
+        sequence = sequence or self.sequence
 
         if note:
             note = note
@@ -206,10 +282,13 @@ class Credential:
             note = self.note
             cnote = self.custom_note
 
-        cred = Credential(username, password, note, url, otp, domain, 0, cnote, alias)
+        tags = self.tags + (tags or [])
+
+        cred = Credential(username, password, note, url, otp, domain, 0, cnote, alias, tags=tags, sequence=sequence)
         return cred
 
-    def update(self, username: str, password: str, note: str, url: str, otp: str, domain: str, alias: str) -> None:
+    def update(self, username: str, password: str, note: str, url: str, otp: str, domain: str, alias: str,
+               tags: list[str] = None, sequence: str = None) -> None:
         '''
         Update credential using the specified informations. If the specified
         parameters are None or empty, the old value is kept.
@@ -222,6 +301,8 @@ class Credential:
             otp             New otp
             domain          New domain
             alias           New alias
+            tags            Additional tags
+            sequence        New auto-type sequence
 
         Returns:
             None
@@ -232,6 +313,9 @@ class Credential:
         self.otp = otp or self.otp
         self.domain = domain or self.domain
         self.alias = alias or self.alias
+        self.sequence = sequence or self.sequence
+        self.tags = sorted(set(self.tags + (tags or [])))
+        self.modified = time.time()
 
         if note:
             self.note = note
@@ -248,16 +332,31 @@ class Credential:
             credential      Set of Credential objects
         '''
         Credential.reset_count()
-
-        credentials = set()
         yml = Config.parse_cred_file()
 
         if yml is None:
-            return credentials
+            return set()
+
+        return Credential.from_records(yml.get('credentials', []), Schema.file_version(yml))
+
+    def from_records(records: list[dict], version: int = None) -> set[Credential]:
+        '''
+        Creates Credential objects from their dictionary representation as stored
+        within a credential file. Records of older schema versions are upgraded while
+        they are read.
+
+        Parameters:
+            records         List of credential dictionaries
+            version         Schema version of the records (default: current version)
+
+        Returns:
+            credential      Set of Credential objects
+        '''
+        credentials = set()
 
         try:
 
-            for cred in yml.get('credentials', []):
+            for cred in Schema.records(records, version):
                 username = cred['username']
                 password = cred['password']
                 otp = cred['otp']
@@ -267,8 +366,15 @@ class Credential:
                 timestamp = cred['timestamp']
                 c_note = cred['custom_note']
                 alias = cred['alias']
-
-                cred = Credential(username, password, note, url, otp, domain, timestamp, c_note, alias)
+                modified = cred.get('modified', timestamp)
+                tags = cred.get('tags', None)
+                batch = cred.get('batch', None)
+                hash = cred.get('hash', None)
+                uid = cred.get('uid', None)
+                sequence = cred.get('sequence', None)
+
+                cred = Credential(username, password, note, url, otp, domain, timestamp, c_note, alias, modified, tags,
+                                  batch, hash, uid, sequence)
                 credentials.add(cred)
 
         except KeyError as e:
@@ -289,147 +395,373 @@ class Credential:
         credentials = sorted(list(credentials), key=lambda x: x.id)
         credentials = list(map(lambda x: x.to_dict(), credentials))
 
-        cred_dict = {'credentials': credentials}
+        cred_dict = {'schema': Schema.version, 'credentials': credentials}
         Config.write_cred_file(cred_dict)
+        ColumnStore.write(credentials)
+        CompletionIndex.write(credentials)
+        History.snapshot(credentials)
 
-    def export_usernames(credentials: set[Credential]) -> None:
+    def to_file_meta(credentials: set[Credential]) -> None:
         '''
-        Exports usernames of all credentials into the specified file.
+        Stores the credentials file after only the export watermarks were changed. The
+        column store, the completion index (apart from the watermarks) and the history only
+        depend on the credentials and the defaults, so they are not rebuilt and no new
+        version is created.
 
         Parameters:
-            credentials     Set of Credential objects
-            filename        File System path to copy to
+            credentials     Set of unchanged Credential objects
 
         Returns:
             None
         '''
-        usernames = list(map(lambda x: x.username, credentials))
-        usernames = sorted(list(set(filter(lambda x: x, usernames))))
-        print_collection(usernames)
+        meta = ColumnStore.meta()
+
+        credentials = sorted(list(credentials), key=lambda x: x.id)
+        credentials = list(map(lambda x: x.to_dict(), credentials))
 
-    def export_passwords(credentials: set[Credential]) -> None:
+        Config.write_cred_file({'schema': Schema.version, 'credentials': credentials})
+        ColumnStore.resync(meta)
+        CompletionIndex.write_field('watermark', Config.watermarks)
+
+    def export_column(field: str) -> bool:
         '''
-        Exports passwords of all credentials into the specified file.
+        Exports the distinct values of a single field directly from the column store. Returns
+        False if the column store is not in sync with the credential file.
 
         Parameters:
-            credentials     Set of Credential objects
-            filename        File System path to copy to
+            field           Credential field to export (username, password, url, domain)
+
+        Returns:
+            bool            True if the export was successful, False otherwise
+        '''
+        values = ColumnStore.distinct(field)
+
+        if values is None:
+            return False
+
+        print_collection(values, Config.delimiter)
+        return True
+
+    def export_usernames(credentials: Iterable[Credential]) -> None:
+        '''
+        Exports usernames of all credentials to stdout. Credentials can be passed
+        as an arbitrary iterable, including generators.
+
+        Parameters:
+            credentials     Iterable of Credential objects
 
         Returns:
             None
         '''
-        passwords = list(map(lambda x: x.password, credentials))
-        passwords = sorted(list(set(filter(lambda x: x, passwords))))
-        print_collection(passwords)
+        usernames = sorted({cred.username for cred in credentials if cred.username})
+        print_collection(usernames, Config.delimiter)
 
-    def export_domains(credentials: set[Credential]) -> None:
+    def export_passwords(credentials: Iterable[Credential], hash_algo: str = None, mutator: Mutator = None) -> None:
         '''
-        Exports domains of all credentials into the specified file.
+        Exports passwords of all credentials to stdout. Credentials can be passed
+        as an arbitrary iterable, including generators. If a hash algorithm is specified,
+        the password hashes are exported instead. If a mutator is specified, the mutation
+        candidates of the stored passwords are exported.
 
         Parameters:
-            credentials     Set of Credential objects
+            credentials     Iterable of Credential objects
+            hash_algo       Optional hash algorithm (ntlm, md5, sha1, sha256)
+            mutator         Optional Mutator to create password candidates
 
         Returns:
             None
         '''
-        domains = list(map(lambda x: x.domain, credentials))
+        passwords = sorted({cred.password for cred in credentials if cred.password})
 
-        if Config.default_domain:
-            domains.append(Config.default_domain)
+        if mutator:
+
+            if hash_algo:
+                known = Hasher.hash_passwords(hash_algo, passwords)
+                passwords = Hasher.hash_stream(hash_algo, mutator.candidates(passwords), known)
+
+            else:
+                passwords = mutator.candidates(passwords)
+
+        elif hash_algo:
+            hashes = Hasher.hash_passwords(hash_algo, passwords)
+            passwords = sorted({hashes[password] for password in passwords})
 
-        domains = sorted(list(set(filter(lambda x: x, domains))))
-        print_collection(domains)
+        print_collection(passwords, Config.delimiter)
 
-    def export_urls(credentials: set[Credential]) -> None:
+    def export_domains(credentials: Iterable[Credential]) -> None:
         '''
-        Exports urls of all credentials into the specified file.
+        Exports domains of all credentials to stdout. Credentials can be passed
+        as an arbitrary iterable, including generators.
 
         Parameters:
-            credentials     Set of Credential objects
+            credentials     Iterable of Credential objects
 
         Returns:
             None
         '''
-        urls = list(map(lambda x: x.url, credentials))
+        domains = {cred.domain for cred in credentials if cred.domain}
 
-        if Config.default_url:
-            urls.append(Config.default_url)
+        if Config.default_domain:
+            domains.add(Config.default_domain)
 
-        urls = sorted(list(set(filter(lambda x: x, urls))))
-        print_collection(urls)
+        print_collection(sorted(domains), Config.delimiter)
 
-    def export_user_domain(credentials: set[Credential]) -> None:
+    def export_urls(credentials: Iterable[Credential]) -> None:
         '''
-        Exports usernames fixed with their domain prefix or the default domain.
+        Exports urls of all credentials to stdout. Credentials can be passed
+        as an arbitrary iterable, including generators.
 
         Parameters:
-            credentials     Set of Credential objects
+            credentials     Iterable of Credential objects
 
         Returns:
             None
         '''
-        usernames = list()
+        urls = {cred.url for cred in credentials if cred.url}
 
-        for cred in credentials:
+        if Config.default_url:
+            urls.add(Config.default_url)
 
-            domain = cred.domain or Config.default_domain
+        print_collection(sorted(urls), Config.delimiter)
 
-            if domain:
-                usernames.append(f'{domain}/{cred.username}')
+    def export_user_domain(credentials: Iterable[Credential]) -> None:
+        '''
+        Exports usernames fixed with their domain prefix or the default domain.
 
-            else:
-                usernames.append(f'{cred.username}')
+        Parameters:
+            credentials     Iterable of Credential objects
 
-        usernames = sorted(list(set(usernames)))
-        print_collection(usernames)
+        Returns:
+            None
+        '''
+        usernames = {cred.user_string(True) for cred in credentials}
+        print_collection(sorted(usernames), Config.delimiter)
 
-    def export_user_pass(credentials: set[Credential], sep: str, mix: bool, domain: bool, basic: bool) -> None:
+    def export_user_pass(credentials: Iterable[Credential], sep: str, mix: bool, domain: bool, basic: bool,
+                         hash_algo: str = None, mutator: Mutator = None, template: Template = None,
+                         limit: int = None, fraction: float = None, shards: ShardWriter = None) -> None:
         '''
         Export username:password combinations. If mix is set to true, each possible combination
-        is exported.
+        is exported. Mixed combinations are generated lazily from the distinct usernames and
+        passwords, so the product is never materialized. If a hash algorithm is specified,
+        password hashes are exported instead of passwords. Hashes with domain are exported
+        in the domain\\user:::hash format. If a mutator is specified, the mutation candidates
+        of the passwords of each user are exported. If a template is specified, it is used
+        instead of the user<sep>pass format. Sampling and limiting are applied to the lazy
+        stream of combinations before they are formatted. If a ShardWriter is specified,
+        the combinations are written to its shards instead of stdout.
 
         Parameters:
-            credentials     Set of Credential objects
+            credentials     Iterable of Credential objects
             sep             Separator to use between username and password
             mix             Export all possible username password combinations
             domain          Export usernames with domain
             basic           Export in basic-auth format
+            hash_algo       Optional hash algorithm (ntlm, md5, sha1, sha256)
+            mutator         Optional Mutator to create password candidates
+            template        Optional Template to format the combinations with
+            limit           Optional maximum number of exported combinations
+            fraction        Optional fraction of combinations to export (random sample)
+            shards          Optional ShardWriter to write the combinations to
 
         Returns:
             None
         '''
-        creds = set()
+        dsep = '\\' if hash_algo else '/'
+
+        if hash_algo and domain:
+            sep = ':::'
+
+        names, pairs, passwords = Credential.user_pass_pairs(credentials, mix, domain or template is not None, dsep, mutator)
+
+        secret = Credential.password_secret(passwords, None if mutator else hash_algo)
+        line = Credential.user_pass_line(names, sep, secret, template)
+
+        if not mix and not mutator:
+            pairs = sorted(pairs, key=lambda pair: line(*pair))
 
-        if mix:
-            pairs = itertools.product(credentials, credentials)
+        if fraction:
+            pairs = sample(pairs, fraction)
+
+        if limit is not None:
+            pairs = itertools.islice(pairs, limit)
+
+        if hash_algo and mutator:
+            pairs = Credential.hash_pairs(hash_algo, pairs, passwords)
+
+        creds = ((user, line(user, password)) for user, password in pairs)
+
+        if basic:
+            creds = ((user, base64.b64encode(cred.encode('utf-8')).decode('utf-8')) for user, cred in creds)
+
+        if shards:
+            shards.write_all(creds)
 
         else:
-            pairs = [(i, i) for i in credentials]
+            print_collection((cred for user, cred in creds), Config.delimiter)
+
+    def user_pass_pairs(credentials: Iterable[Credential], mix: bool, domain: bool, dsep: str,
+                        mutator: Mutator = None) -> tuple[dict, Iterable[tuple[str, str]], set[str]]:
+        '''
+        Collects the users and passwords of the specified credentials and creates the
+        user-pass pairs for an export. Mixed pairs and mutation candidates are generated
+        lazily. Other pairs are returned unsorted.
 
-        pairs = list(filter(lambda x: x[0].username and x[1].password, pairs))
+        Parameters:
+            credentials     Iterable of Credential objects
+            mix             Create all possible username password combinations
+            domain          Use usernames with domain
+            dsep            Separator between domain and username
+            mutator         Optional Mutator to create password candidates
 
-        for cred, cred2 in pairs:
+        Returns:
+            tuple           Mapping of user -> (username, domain), user-pass pairs and passwords
+        '''
+        names = dict()
+        pairs = set()
+        passwords = set()
 
-            domain_str = ''
+        for cred in credentials:
 
-            if domain:
+            if cred.username:
+                user = cred.user_string(domain, dsep)
+                names[user] = (cred.username, cred.domain or Config.default_domain)
 
-                domain_str = cred.domain or Config.default_domain or ''
+            if cred.password:
+                passwords.add(cred.password)
 
-                if domain_str:
-                    domain_str += '/'
+            if not mix and cred.username and cred.password:
+                pairs.add((user, cred.password))
 
-            cred_str = f'{domain_str}{cred.username}{sep}{cred2.password}'
-            creds.add(cred_str)
+        if mutator:
+            pairs = Credential.candidate_pairs(names, pairs, passwords if mix else None, mutator)
 
-        creds = sorted(list(creds))
+        elif mix:
+            pairs = itertools.product(sorted(names), sorted(passwords))
 
-        if basic:
-            creds = list(map(lambda x: base64.b64encode(x.encode('utf-8')).decode('utf-8'), creds))
+        return (names, pairs, passwords)
+
+    def candidate_pairs(names: dict, pairs: set[tuple[str, str]], passwords: set[str],
+                        mutator: Mutator) -> Iterator[tuple[str, str]]:
+        '''
+        Lazily creates the mutation candidates of the passwords of each user. If passwords
+        are specified, all of them are used as base words for each user.
+
+        Parameters:
+            names           Mapping of user -> (username, domain)
+            pairs           User-pass pairs of the stored credentials
+            passwords       Optional passwords to use for each user (--mix)
+            mutator         Mutator to create password candidates
+
+        Returns:
+            Iterator        User and password candidate pairs
+        '''
+        words = {user: set() for user in names} if mutator.with_user else dict()
+
+        if passwords is not None:
+            words = {user: passwords for user in names}
+
+        for user, password in pairs:
+            words.setdefault(user, set()).add(password)
+
+        for user in sorted(words):
+            for candidate in mutator.candidates(sorted(words[user]), names[user][0]):
+                yield (user, candidate)
+
+    def password_secret(passwords: set[str], hash_algo: str = None) -> Callable[[str], str]:
+        '''
+        Returns the function that obtains the exported secret for a password. This is
+        either the password itself or its hash.
+
+        Parameters:
+            passwords       Stored passwords to hash in advance
+            hash_algo       Optional hash algorithm (ntlm, md5, sha1, sha256)
+
+        Returns:
+            Callable        Function that maps a password to the exported secret
+        '''
+        if hash_algo:
+            return Hasher.hash_passwords(hash_algo, passwords).__getitem__
+
+        def secret(password: str) -> str:
+            return password
+
+        return secret
+
+    def hash_pairs(hash_algo: str, pairs: Iterable[tuple[str, str]], passwords: set[str]) -> Iterator[tuple[str, str]]:
+        '''
+        Lazily replaces the password candidates of user-pass pairs by their hashes. The
+        candidates are hashed in batches. Hashes of the stored passwords are taken from
+        the hash cache.
+
+        Parameters:
+            hash_algo       Hash algorithm (ntlm, md5, sha1, sha256)
+            pairs           User and password candidate pairs
+            passwords       Stored passwords
+
+        Returns:
+            Iterator        User and hash pairs
+        '''
+        known = Hasher.hash_passwords(hash_algo, passwords)
+        users, candidates = itertools.tee(pairs)
+
+        users = (user for user, candidate in users)
+        hashes = Hasher.hash_stream(hash_algo, (candidate for user, candidate in candidates), known)
+
+        return zip(users, hashes)
+
+    def user_pass_line(names: dict, sep: str, secret: Callable[[str], str],
+                       template: Template = None) -> Callable[[str, str], str]:
+        '''
+        Returns the function that formats a user-pass pair for an export.
 
-        print_collection(creds)
+        Parameters:
+            names           Mapping of user -> (username, domain)
+            sep             Separator to use between username and password
+            secret          Function that maps a password to the exported secret
+            template        Optional Template to format the pairs with
 
-    def import_usernames(filename: Path, with_domain: bool) -> set[Credential]:
+        Returns:
+            Callable        Function that formats a user and password
+        '''
+        if template:
+
+            def line(user: str, password: str) -> str:
+                return template.format(*names[user], secret(password))
+
+        else:
+
+            def line(user: str, password: str) -> str:
+                return f'{user}{sep}{secret(password)}'
+
+        return line
+
+    def export_otp_codes(credentials: Iterable[Credential], sep: str, domain: bool) -> None:
+        '''
+        Exports the current OTP codes of all credentials that have an OTP secret. Codes
+        are computed in one batch for the current time window. Invalid secrets are reported
+        on stderr.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+            sep             Separator to use between username and code
+            domain          Export usernames with domain
+
+        Returns:
+            None
+        '''
+        credentials = [cred for cred in credentials if cred.otp]
+        engine = TOTPEngine(cred.otp for cred in credentials)
+
+        for username in sorted({str(cred.username) for cred in credentials if cred.otp in engine.invalid}):
+            print(f'[-] Invalid OTP secret for user {username}.', file=sys.stderr)
+
+        codes = {f'{cred.user_string(domain)}{sep}{engine.get(cred.otp)}' for cred in credentials
+                 if cred.otp not in engine.invalid}
+
+        print_collection(sorted(codes), Config.delimiter)
+
+    def import_usernames(filename: Path, with_domain: bool, batch: int = None) -> set[Credential]:
         '''
         Import usernames from a file. If domain is true, slash characters are intrepreted as
         domain separator.
@@ -437,15 +769,19 @@ class Credential:
         Parameters:
             filename        Filename to import from
             with_domain     Use / as domain seprator
+            batch           Import batch to assign the credentials to
 
         Returns:
             creds           Set of credential objects
         '''
         creds = set()
 
-        with open(filename, 'r') as f:
+        with Compression.open(filename, 'r') as f:
             lines = f.readlines()
 
+        if batch:
+            Config.imports[batch]['lines'] = len(lines)
+
         for line in lines:
 
             domain = None
@@ -457,35 +793,39 @@ class Credential:
                 domain = split[0]
                 line = '/'.join(split[1:])
 
-            cred = Credential(line, None, 'Import', None, None, domain, 0)
+            cred = Credential(line, None, 'Import', None, None, domain, 0, batch=batch)
             creds.add(cred)
 
         return creds
 
-    def import_passwords(filename: Path) -> set[Credential]:
+    def import_passwords(filename: Path, batch: int = None) -> set[Credential]:
         '''
         Import passwords from a file.
 
         Parameters:
             filename        Filename to import from
+            batch           Import batch to assign the credentials to
 
         Returns:
             creds           Set of credential objects
         '''
         creds = set()
 
-        with open(filename, 'r') as f:
+        with Compression.open(filename, 'r') as f:
             lines = f.readlines()
 
+        if batch:
+            Config.imports[batch]['lines'] = len(lines)
+
         for line in lines:
 
             line = line.strip('\n')
-            cred = Credential(None, line, 'Import', None, None, None, 0)
+            cred = Credential(None, line, 'Import', None, None, None, 0, batch=batch)
             creds.add(cred)
 
         return creds
 
-    def import_userpass(filename: Path, sep: str, with_domain: bool) -> set[Credential]:
+    def import_userpass(filename: Path, sep: str, with_domain: bool, batch: int = None) -> set[Credential]:
         '''
         Import username password combinations from a file, separated by sep.
 
@@ -493,15 +833,19 @@ class Credential:
             filename        Filename to import from
             sep             Separator to expect between username and password
             with_domain     Use / as domain seprator
+            batch           Import batch to assign the credentials to
 
         Returns:
             creds           Set of credential objects
         '''
         creds = set()
 
-        with open(filename, 'r') as f:
+        with Compression.open(filename, 'r') as f:
             lines = f.readlines()
 
+        if batch:
+            Config.imports[batch]['lines'] = len(lines)
+
         for line in lines:
 
             line = line.strip('\n')
@@ -521,11 +865,108 @@ class Credential:
             else:
                 password = sep.join(split[1:])
 
-            cred = Credential(username, password, 'Import', None, None, domain, 0)
+            cred = Credential(username, password, 'Import', None, None, domain, 0, batch=batch)
             creds.add(cred)
 
         return creds
 
+    def import_loot(credentials: set[Credential], records: Iterable[tuple], batch: int = None) -> set[Credential]:
+        '''
+        Merges parsed loot records (username, password, domain, hash) into the specified
+        credentials. Records with a hash but without username (e.g. potfile entries) are
+        cracked hashes: their password is filled into all stored credentials with a matching
+        hash. Other records, including password only records, are added as new credentials.
+        Passwords of already cracked hashes are filled into new records as well. Matching
+        is done via the hash index, so each record requires a single lookup.
+
+        Parameters:
+            credentials     Set of existing Credential objects
+            records         Iterable of parsed loot records
+            batch           Import batch to assign new credentials to
+
+        Returns:
+            credentials     Merged set of Credential objects
+        '''
+        index = CredentialIndex(credentials)
+        hashes = index.index('hash')
+
+        cracked = {cred.hash: cred.password for cred in credentials if cred.hash and cred.password}
+        imported = set()
+
+        for username, password, domain, hash in records:
+
+            if username is None and hash:
+
+                if not password:
+                    continue
+
+                cracked[hash] = password
+
+                for c_id in hashes.get(hash, set()):
+
+                    cred = index.credentials[c_id]
+
+                    if cred.password is None:
+                        cred.password = password
+                        cred.modified = time.time()
+
+                continue
+
+            if username is None and password is None:
+                continue
+
+            password = password or cracked.get(hash)
+            imported.add(Credential(username, password, 'Import', None, None, domain, 0, batch=batch, hash=hash))
+
+        # passwords were possibly changed in place, which invalidates the set hashes
+        credentials = set(credentials)
+
+        if batch:
+            return Credential.merge_import(credentials, imported, batch)
+
+        return credentials.union(imported)
+
+    def import_files(credentials: set[Credential], filenames: list[Path], fmt: str = None, sep: str = ':') -> set[Credential]:
+        '''
+        Imports multiple loot or user-pass files at once. The files are parsed in parallel
+        by a process pool, each worker returning the deduplicated records of one file. The
+        records are merged in the parent process in the order of the specified files, each
+        file within its own import batch. A summary with the number of new and duplicate
+        credentials is printed for each file.
+
+        Parameters:
+            credentials     Set of existing Credential objects
+            filenames       Files to import
+            fmt             Loot format of the files (default: detect per file)
+            sep             Separator for user-pass files
+
+        Returns:
+            credentials     Merged set of Credential objects
+        '''
+        worker = functools.partial(parse_loot_file, fmt=fmt, sep=sep)
+
+        if len(filenames) > 1:
+
+            with concurrent.futures.ProcessPoolExecutor() as pool:
+                results = list(pool.map(worker, filenames))
+
+        else:
+            results = map(worker, filenames)
+
+        for filename, (file_fmt, lines, records) in zip(filenames, results):
+
+            batch = Credential.new_batch(filename.absolute())
+            credentials = Credential.import_loot(credentials, records, batch)
+
+            new = Config.imports[batch]['new']
+            duplicate = Config.imports[batch]['duplicate']
+            Config.imports[batch]['lines'] = lines
+
+            print(f'{str(batch).ljust(4)}  {file_fmt.ljust(11)}  {str(new).rjust(8)} new  ', end='')
+            print(f'{str(duplicate).rjust(8)} duplicate  {filename}')
+
+        return credentials
+
     def ljust(item: str, size: int) -> str:
         '''
         Wrapper around the default ljust function that truncates oversized strings
@@ -560,7 +1001,7 @@ class Credential:
     def filter_imports() -> set[Credential]:
         '''
         Returns a set of credentials where all credentials with the note 'Import'
-        are filtered.
+        are filtered. The recorded import batches are cleared.
 
         Parameters:
             None
@@ -570,8 +1011,108 @@ class Credential:
         '''
         creds = Credential.from_file()
         creds = set(filter(lambda x: x.note != 'Import', creds))
+
+        Config.imports = {}
         return creds
 
+    def new_batch(filename: Path) -> int:
+        '''
+        Registers a new import batch for the specified file and returns its id.
+
+        Parameters:
+            filename        File the batch is imported from
+
+        Returns:
+            int             Id of the new import batch
+        '''
+        batch = max(Config.imports, default=0) + 1
+        Config.imports[batch] = {'file': str(filename), 'lines': 0, 'new': 0, 'timestamp': time.time()}
+
+        return batch
+
+    def merge_import(credentials: set[Credential], imported: set[Credential], batch: int) -> set[Credential]:
+        '''
+        Merges imported credentials into the existing ones and records the number and
+        the uids of the new credentials as well as the number of rejected duplicates for
+        the import batch.
+
+        Parameters:
+            credentials     Set of existing Credential objects
+            imported        Set of imported Credential objects
+            batch           Import batch of the imported credentials
+
+        Returns:
+            credentials     Merged set of Credential objects
+        '''
+        new = imported - credentials
+
+        Config.imports[batch]['new'] = len(new)
+        Config.imports[batch]['duplicate'] = len(imported) - len(new)
+        Config.imports[batch].setdefault('uids', []).extend(sorted(cred.uid for cred in new))
+
+        return credentials.union(new)
+
+    def list_imports() -> None:
+        '''
+        Prints the recorded import batches.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        Config.parse_cred_file()
+
+        for batch, info in sorted(Config.imports.items()):
+
+            timestamp = datetime.fromtimestamp(info['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            counts = f"{str(info['lines']).rjust(8)} lines  {str(info['new']).rjust(8)} new"
+
+            print(f"{str(batch).ljust(4)}  {timestamp}  {counts}  {info['file']}")
+
+    def undo_import(batch: int) -> None:
+        '''
+        Removes all credentials that were added by the specified import batch. The affected
+        credentials are identified by the uids that were recorded for the batch. Batches
+        that were recorded without uids are matched by the batch of the credentials.
+
+        Parameters:
+            batch           Import batch to remove
+
+        Returns:
+            None
+        '''
+        credentials = Credential.from_file()
+
+        if batch not in Config.imports:
+            raise UnknownImportBatch(f'Import batch {batch} does not exist.')
+
+        uids = Config.imports[batch].get('uids')
+
+        if uids is None:
+            credentials = {cred for cred in credentials if cred.batch != batch}
+
+        else:
+            uids = set(uids)
+            credentials = {cred for cred in credentials if cred.uid not in uids}
+
+        del Config.imports[batch]
+        Credential.to_file(credentials)
+
+    def filter_since(credentials: Iterable[Credential], since: float) -> Iterable[Credential]:
+        '''
+        Returns the credentials that were created or modified after the specified timestamp.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+            since           Unix timestamp to compare against
+
+        Returns:
+            credentials     Iterable of matching Credential objects
+        '''
+        return (cred for cred in credentials if cred.modified > since)
+
     def get_by_id(c_id: int, credentials: set[Credential]) -> Credential:
         '''
         Find a credential by id.
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ctfcred.credential import Credential
+
+
+class FilterException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class CredentialIndex:
+    '''
+    Secondary index over a collection of credentials. For each indexed key, the index maps
+    the possible values to the ids of the credentials that have this value. Keys are indexed
+    lazily, so only keys that are actually queried are built. The index pays off when many
+    lookups are performed against the same credentials, like matching loot records by hash.
+    '''
+    keys = {
+             'user': lambda cred: [cred.username],
+             'alias': lambda cred: [cred.alias],
+             'domain': lambda cred: [cred.domain],
+             'url': lambda cred: [cred.url],
+             'note': lambda cred: [cred.note] if cred.custom_note else [],
+             'tag': lambda cred: cred.tags,
+             'batch': lambda cred: [str(cred.batch)] if cred.batch else [],
+             'hash': lambda cred: [cred.hash] if cred.hash else [],
+             'has': lambda cred: [name for name, value in [('user', cred.username), ('password', cred.password),
+                                                           ('otp', cred.otp), ('url', cred.url),
+                                                           ('domain', cred.domain), ('alias', cred.alias),
+                                                           ('tag', cred.tags), ('hash', cred.hash)] if value],
+           }
+
+    def __init__(self, credentials: Iterable[Credential]) -> None:
+        '''
+        Creates a new CredentialIndex for the specified credentials.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+
+        Returns:
+            None
+        '''
+        self.credentials = {cred.id: cred for cred in credentials}
+        self.indexes = {}
+
+    def index(self, key: str) -> dict:
+        '''
+        Returns the index for the specified key. The index is built on first access.
+
+        Parameters:
+            key             Key to obtain the index for
+
+        Returns:
+            dict            Mapping of value -> set of credential ids
+        '''
+        if key not in CredentialIndex.keys:
+            raise FilterException(f"Unknown filter key '{key}'. Available keys: {', '.join(CredentialIndex.keys)}.")
+
+        if key not in self.indexes:
+
+            index = {}
+            values = CredentialIndex.keys[key]
+
+            for cred in self.credentials.values():
+                for value in values(cred):
+                    index.setdefault(value, set()).add(cred.id)
+
+            self.indexes[key] = index
+
+        return self.indexes[key]
+
+    def lookup(self, key: str, value: str) -> set[int]:
+        '''
+        Returns the ids of all credentials where key has the specified value.
+
+        Parameters:
+            key             Key to look up
+            value           Value to look up
+
+        Returns:
+            set             Set of matching credential ids
+        '''
+        return self.index(key).get(value, set())
+
+
+class Filter:
+    '''
+    Filter objects represent a filter expression like domain=corp.local,tag=dc01,has=otp.
+    A credential matches the filter if it matches each of the comma separated clauses.
+    Filters are applied in a single pass over the credentials, using the value functions
+    of the CredentialIndex keys.
+    '''
+
+    def __init__(self, expression: str) -> None:
+        '''
+        Parses the specified filter expression.
+
+        Parameters:
+            expression      Filter expression
+
+        Returns:
+            None
+        '''
+        self.clauses = []
+
+        for clause in expression.split(','):
+
+            if '=' not in clause:
+                raise FilterException(f"Invalid filter clause '{clause}'. Expected format: key=value.")
+
+            key, value = clause.split('=', 1)
+            key = key.strip()
+
+            if key not in CredentialIndex.keys:
+                raise FilterException(f"Unknown filter key '{key}'. Available keys: {', '.join(CredentialIndex.keys)}.")
+
+            self.clauses.append((key, value))
+
+    def apply(self, credentials: Iterable[Credential]) -> list[Credential]:
+        '''
+        Returns the credentials that match the filter, ordered by id.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+
+        Returns:
+            list            Matching Credential objects
+        '''
+        clauses = [(CredentialIndex.keys[key], value) for key, value in self.clauses]
+        matches = [cred for cred in credentials if all(value in values(cred) for values, value in clauses)]
+
+        return sorted(matches, key=lambda cred: cred.id)
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import os
+import json
+import collections
+import struct
+import hashlib
+import functools
+import itertools
+import concurrent.futures
+
+from typing import Iterable, Iterator
+from ctfcred.config import Config
+from ctfcred.utils import create_private
+
+
+class UnsupportedHashAlgorithm(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+def md4(data: bytes) -> bytes:
+    '''
+    Pure python implementation of MD4 (RFC 1320). Modern OpenSSL versions no longer
+    provide MD4 via hashlib, but it is required for computing NT hashes.
+
+    Parameters:
+        data        Data to hash
+
+    Returns:
+        bytes       MD4 digest of the data
+    '''
+    mask = 0xffffffff
+
+    def rotl(x: int, n: int) -> int:
+        return ((x << n) | (x >> (32 - n))) & mask
+
+    length = (len(data) * 8) & 0xffffffffffffffff
+    data += b'\x80' + b'\x00' * ((55 - len(data)) % 64) + struct.pack('<Q', length)
+
+    h = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]
+
+    for offset in range(0, len(data), 64):
+
+        x = struct.unpack('<16I', data[offset:offset + 64])
+        a, b, c, d = h
+
+        for i in range(16):
+            s = [3, 7, 11, 19][i % 4]
+            a = rotl((a + ((b & c) | (~b & d)) + x[i]) & mask, s)
+            a, b, c, d = d, a, b, c
+
+        for i in range(16):
+            k = (i % 4) * 4 + i // 4
+            s = [3, 5, 9, 13][i % 4]
+            a = rotl((a + ((b & c) | (b & d) | (c & d)) + x[k] + 0x5a827999) & mask, s)
+            a, b, c, d = d, a, b, c
+
+        for i in range(16):
+            k = [0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15][i]
+            s = [3, 9, 11, 15][i % 4]
+            a = rotl((a + (b ^ c ^ d) + x[k] + 0x6ed9eba1) & mask, s)
+            a, b, c, d = d, a, b, c
+
+        h = [(v + n) & mask for v, n in zip(h, (a, b, c, d))]
+
+    return struct.pack('<4I', *h)
+
+
+def nt_hash(password: str) -> str:
+    '''
+    Computes the NT hash of the specified password.
+
+    Parameters:
+        password    Password to hash
+
+    Returns:
+        str         Hex encoded NT hash
+    '''
+    data = password.encode('utf-16-le')
+
+    try:
+        return hashlib.new('md4', data).hexdigest()
+
+    except ValueError:
+        return md4(data).hex()
+
+
+def hash_batch(algo: str, passwords: list[str]) -> list[str]:
+    '''
+    Hashes a batch of passwords. This function is executed within the worker
+    processes of the Hasher class.
+
+    Parameters:
+        algo        Hash algorithm to use
+        passwords   Passwords to hash
+
+    Returns:
+        list        Hex encoded hashes in the order of the passwords
+    '''
+    if algo == 'ntlm':
+        return [nt_hash(password) for password in passwords]
+
+    return [hashlib.new(algo, password.encode('utf-8')).hexdigest() for password in passwords]
+
+
+class Hasher:
+    '''
+    The Hasher class computes password hashes for exports. Slow algorithms (ntlm, which
+    uses a pure python MD4) are hashed in batches by a process pool for large amounts of
+    passwords and their hashes are cached within the hash cache file, so that passwords
+    are only hashed once. The cache is keyed by a digest of the password instead of the
+    password itself, only contains the passwords of the most recent export and is not
+    used for encrypted credential files. Other algorithms are always computed inline.
+    '''
+    algorithms = ['md5', 'ntlm', 'sha1', 'sha256']
+    slow = ['ntlm']
+
+    batch_size = 1024
+    pool_threshold = 4096
+
+    def key(password: str) -> str:
+        '''
+        Returns the key of the specified password within the hash cache.
+
+        Parameters:
+            password    Password to obtain the key for
+
+        Returns:
+            str         Hex encoded digest of the password
+        '''
+        return hashlib.blake2b(password.encode('utf-8'), digest_size=16, person=b'ctfcred-cache').hexdigest()
+
+    def load_cache(algo: str) -> dict:
+        '''
+        Loads the cached hashes for the specified algorithm. For encrypted credential
+        files, an empty cache is returned.
+
+        Parameters:
+            algo        Hash algorithm
+
+        Returns:
+            dict        Mapping of password key -> hash
+        '''
+        if Config.is_encrypted():
+            return {}
+
+        try:
+            with open(Config.hash_cache, 'r') as file:
+                return json.load(file).get(algo, {})
+
+        except (OSError, ValueError):
+            return {}
+
+    def store_cache(algo: str, hashes: dict) -> None:
+        '''
+        Stores the specified hashes within the hash cache file. The hash cache file
+        is only readable by the current user. Nothing is stored for encrypted credential
+        files.
+
+        Parameters:
+            algo        Hash algorithm
+            hashes      Mapping of password key -> hash
+
+        Returns:
+            None
+        '''
+        if Config.is_encrypted():
+            return
+
+        try:
+            with open(Config.hash_cache, 'r') as file:
+                cache = json.load(file)
+
+        except (OSError, ValueError):
+            cache = {}
+
+        cache[algo] = hashes
+        Config.hash_cache.parent.mkdir(parents=True, exist_ok=True)
+        create_private(Config.hash_cache)
+
+        with open(Config.hash_cache, 'w') as file:
+            json.dump(cache, file)
+
+    def batches(items: Iterable[str]) -> Iterator[list[str]]:
+        '''
+        Splits a stream of items into batches of batch_size items.
+
+        Parameters:
+            items       Items to split
+
+        Returns:
+            iterator    Lists of items
+        '''
+        items = iter(items)
+        batch = list(itertools.islice(items, Hasher.batch_size))
+
+        while batch:
+            yield batch
+            batch = list(itertools.islice(items, Hasher.batch_size))
+
+    def merge(batch: list[str], known: dict, hashes: list[str]) -> list[str]:
+        '''
+        Merges the hashes of the unknown passwords of a batch with the known hashes.
+
+        Parameters:
+            batch       Passwords of the batch
+            known       Mapping of password -> hash for known passwords
+            hashes      Hashes of the unknown passwords in the order of the batch
+
+        Returns:
+            list        Hashes in the order of the batch
+        '''
+        hashes = iter(hashes)
+        return [known[password] if password in known else next(hashes) for password in batch]
+
+    def hash_pooled(algo: str, batches: Iterator[list[str]], known: dict) -> Iterator[str]:
+        '''
+        Hashes batches of passwords within a process pool. Only a limited amount of
+        batches is in flight at the same time, so that the stream is never materialized.
+
+        Parameters:
+            algo        Hash algorithm to use
+            batches     Batches of passwords to hash
+            known       Mapping of password -> hash for known passwords
+
+        Returns:
+            iterator    Hex encoded hashes in the order of the passwords
+        '''
+        pending = collections.deque()
+        window = 2 * (os.cpu_count() or 1)
+
+        with concurrent.futures.ProcessPoolExecutor() as pool:
+
+            for batch in batches:
+
+                unknown = [password for password in batch if password not in known]
+                pending.append((batch, pool.submit(hash_batch, algo, unknown)))
+
+                if len(pending) >= window:
+                    batch, future = pending.popleft()
+                    yield from Hasher.merge(batch, known, future.result())
+
+            while pending:
+                batch, future = pending.popleft()
+                yield from Hasher.merge(batch, known, future.result())
+
+    def hash_stream(algo: str, passwords: Iterable[str], known: dict = None) -> Iterator[str]:
+        '''
+        Lazily hashes a stream of passwords in batches. Large streams are hashed by a
+        process pool. Hashes of known passwords (e.g. the stored passwords, obtained via
+        hash_passwords) are reused. The stream itself is not added to the hash cache. This
+        is intended for large amounts of generated password candidates.
+
+        Parameters:
+            algo        Hash algorithm to use
+            passwords   Passwords to hash
+            known       Optional mapping of password -> hash for known passwords
+
+        Returns:
+            iterator    Hex encoded hashes in the order of the passwords
+        '''
+        if algo not in Hasher.algorithms:
+            raise UnsupportedHashAlgorithm(f"Hash algorithm '{algo}' is not supported.")
+
+        known = known or {}
+        passwords = iter(passwords)
+
+        head = list(itertools.islice(passwords, Hasher.pool_threshold))
+        batches = Hasher.batches(itertools.chain(head, passwords))
+
+        if algo in Hasher.slow and len(head) >= Hasher.pool_threshold:
+            yield from Hasher.hash_pooled(algo, batches, known)
+            return
+
+        for batch in batches:
+            unknown = [password for password in batch if password not in known]
+            yield from Hasher.merge(batch, known, hash_batch(algo, unknown))
+
+    def hash_passwords(algo: str, passwords: Iterable[str]) -> dict:
+        '''
+        Returns a mapping of password -> hash for the specified passwords. For slow
+        algorithms, hashes are taken from the hash cache if available. Missing hashes are
+        computed in batches, using a process pool when the amount of passwords is large
+        enough. Afterwards, the cache only contains the hashes of the specified passwords.
+
+        Parameters:
+            algo        Hash algorithm to use
+            passwords   Passwords to hash
+
+        Returns:
+            dict        Mapping of password -> hash
+        '''
+        if algo not in Hasher.algorithms:
+            raise UnsupportedHashAlgorithm(f"Hash algorithm '{algo}' is not supported.")
+
+        if algo not in Hasher.slow:
+            passwords = list(set(passwords))
+            return dict(zip(passwords, hash_batch(algo, passwords)))
+
+        cache = Hasher.load_cache(algo)
+        keys = {password: Hasher.key(password) for password in passwords}
+
+        hashes = {password: cache[key] for password, key in keys.items() if key in cache}
+        missing = sorted(keys.keys() - hashes.keys())
+
+        batches = [missing[i:i + Hasher.batch_size] for i in range(0, len(missing), Hasher.batch_size)]
+        worker = functools.partial(hash_batch, algo)
+
+        if len(missing) >= Hasher.pool_threshold:
+
+            with concurrent.futures.ProcessPoolExecutor() as pool:
+                results = list(pool.map(worker, batches))
+
+        else:
+            results = map(worker, batches)
+
+        for batch, batch_hashes in zip(batches, results):
+            hashes.update(zip(batch, batch_hashes))
+
+        if missing or len(cache) != len(hashes):
+            Hasher.store_cache(algo, {keys[password]: value for password, value in hashes.items()})
+
+        return hashes
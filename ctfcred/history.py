@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import os
+import json
+import difflib
+import fcntl
+import hashlib
+import contextlib
+
+from pathlib import Path
+from datetime import datetime
+from ctfcred.vault import Vault
+from ctfcred.config import Config
+from ctfcred.utils import encode_record, decode_record
+
+
+class UnknownVersion(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class History:
+    '''
+    The History class keeps versioned snapshots of the credential file. Each credential
+    record is stored once as content addressed blob within an append only pack file. Each
+    version is described by a small manifest that only contains the edit operations on the
+    list of blobs of the previous version. Every full_interval versions, a full manifest is
+    written so that reconstructing a version only needs to replay a short chain. If the
+    credential file is encrypted, blobs are encrypted with the key of the credential file.
+    The history directory is only accessible by the current user. Processes that modify
+    the history hold an exclusive lock on it.
+    '''
+    keep = 100
+    full_interval = 32
+
+    def digest(data: str) -> str:
+        '''
+        Returns the content address of a serialized record.
+
+        Parameters:
+            data            Serialized record
+
+        Returns:
+            str             Content address
+        '''
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+    def manifest_path(version: int) -> Path:
+        '''
+        Returns the path of the manifest for the specified version.
+
+        Parameters:
+            version         Version number
+
+        Returns:
+            Path            Path of the manifest
+        '''
+        return Config.history_dir.joinpath('manifests', f'{version:08d}.json')
+
+    def versions() -> list[int]:
+        '''
+        Returns the numbers of all available versions in ascending order.
+
+        Parameters:
+            None
+
+        Returns:
+            list            Available versions
+        '''
+        try:
+            return sorted(int(path.stem) for path in Config.history_dir.joinpath('manifests').glob('*.json'))
+
+        except ValueError:
+            return []
+
+    def manifest(version: int) -> dict:
+        '''
+        Loads the manifest of the specified version.
+
+        Parameters:
+            version         Version number
+
+        Returns:
+            dict            Manifest of the version
+        '''
+        try:
+            with open(History.manifest_path(version), 'r') as file:
+                return json.load(file)
+
+        except FileNotFoundError:
+            raise UnknownVersion(f'Version {version} does not exist.')
+
+    def write_manifest(manifest: dict) -> None:
+        '''
+        Atomically writes a manifest.
+
+        Parameters:
+            manifest        Manifest to write
+
+        Returns:
+            None
+        '''
+        path = History.manifest_path(manifest['version'])
+        tmp = path.with_name(path.name + '.tmp')
+
+        with open(tmp, 'w') as file:
+            json.dump(manifest, file)
+
+        os.replace(tmp, path)
+
+    def records(version: int) -> list[str]:
+        '''
+        Returns the blob addresses of all records of the specified version. The manifest
+        chain is followed back to the last full manifest and replayed forwards.
+
+        Parameters:
+            version         Version number
+
+        Returns:
+            list            Blob addresses in the order of the credential file
+        '''
+        chain = [History.manifest(version)]
+
+        while chain[-1]['parent'] is not None:
+            chain.append(History.manifest(chain[-1]['parent']))
+
+        records = chain[-1]['records']
+
+        for manifest in reversed(chain[:-1]):
+            for start, end, blobs in reversed(manifest['ops']):
+                records[start:end] = blobs
+
+        return records
+
+    @contextlib.contextmanager
+    def lock() -> None:
+        '''
+        Creates the history directory if required and holds an exclusive lock on it, so
+        that other ctfcred processes do not modify the history at the same time.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        Config.history_dir.joinpath('manifests').mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(Config.history_dir, 0o700)
+
+        with open(Config.history_dir.joinpath('lock'), 'a') as file:
+
+            fcntl.flock(file, fcntl.LOCK_EX)
+
+            try:
+                yield
+
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def load_blobs(blobs: set[str] = None) -> dict:
+        '''
+        Loads blobs from the pack file.
+
+        Parameters:
+            blobs           Blob addresses to load (default: all)
+
+        Returns:
+            dict            Mapping of blob address -> serialized record
+        '''
+        loaded = {}
+
+        try:
+            with open(Config.history_dir.joinpath('objects.pack'), 'r') as file:
+
+                for line in file:
+
+                    blob, _, data = line.rstrip('\n').partition('\t')
+
+                    if blobs is None or blob in blobs:
+                        loaded[blob] = Vault.open_blob(data)
+
+        except FileNotFoundError:
+            pass
+
+        return loaded
+
+    def snapshot(records: list[dict]) -> None:
+        '''
+        Creates a new version for the specified credential records. Only records that are
+        not part of the previous version are appended to the pack file. If nothing changed,
+        no version is created. If the number of versions exceeds the retention limit, old
+        versions are pruned. Both happen while holding the history lock.
+
+        Parameters:
+            records         Credential records as stored within the credential file
+
+        Returns:
+            None
+        '''
+        with History.lock():
+            History.append(records)
+
+    def append(records: list[dict]) -> None:
+        '''
+        Creates a new version for the specified credential records. The caller needs to
+        hold the history lock.
+
+        Parameters:
+            records         Credential records as stored within the credential file
+
+        Returns:
+            None
+        '''
+        serialized = [encode_record(record) for record in records]
+        blobs = [History.digest(data) for data in serialized]
+
+        meta = {
+                 'default_url': Config.default_url,
+                 'default_domain': Config.default_domain,
+                 'default_sequence': Config.default_sequence,
+                 'imports': Config.imports,
+                 'watermarks': Config.watermarks,
+               }
+
+        versions = History.versions()
+        last = History.manifest(versions[-1]) if versions else None
+        previous = History.records(versions[-1]) if versions else []
+
+        if last and blobs == previous and last['meta'] == json.loads(json.dumps(meta)):
+            return
+
+        known = set(previous)
+        current = set(blobs)
+        seal = Vault.seal_blob if Config.is_encrypted() else lambda data: data
+
+        added = {blob: data for blob, data in zip(blobs, serialized) if blob not in known}
+
+        with open(Config.history_dir.joinpath('objects.pack'), 'a') as file:
+            file.writelines(f'{blob}\t{seal(data)}\n' for blob, data in added.items())
+
+        version = versions[-1] + 1 if versions else 1
+        changes = [len(current - known), len(known - current)]
+
+        manifest = {'version': version, 'timestamp': datetime.now().timestamp(), 'count': len(blobs),
+                    'changes': changes, 'meta': meta}
+
+        if last is None or version % History.full_interval == 0:
+            manifest.update({'parent': None, 'records': blobs})
+
+        else:
+            matcher = difflib.SequenceMatcher(None, previous, blobs, autojunk=False)
+            ops = [[i1, i2, blobs[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+            manifest.update({'parent': versions[-1], 'ops': ops})
+
+        History.write_manifest(manifest)
+
+        if len(versions) + 1 > History.keep + History.full_interval:
+            History.prune()
+
+    def prune() -> None:
+        '''
+        Removes all versions that exceed the retention limit. The oldest remaining version
+        is rewritten as full manifest and blobs that are no longer referenced are removed
+        from the pack file. The caller needs to hold the history lock.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        versions = History.versions()
+
+        if len(versions) <= History.keep:
+            return
+
+        oldest = versions[-History.keep]
+        manifest = History.manifest(oldest)
+
+        if manifest['parent'] is not None:
+            manifest['records'] = History.records(oldest)
+            manifest['parent'] = None
+
+            del manifest['ops']
+            History.write_manifest(manifest)
+
+        for version in versions[:-History.keep]:
+            History.manifest_path(version).unlink()
+
+        referenced = set()
+
+        for version in versions[-History.keep:]:
+
+            manifest = History.manifest(version)
+
+            if manifest['parent'] is None:
+                referenced.update(manifest['records'])
+
+            else:
+                referenced.update(blob for _, _, blobs in manifest['ops'] for blob in blobs)
+
+        pack = Config.history_dir.joinpath('objects.pack')
+        tmp = pack.with_name(pack.name + '.tmp')
+
+        with open(pack, 'r') as source, open(tmp, 'w') as target:
+
+            for line in source:
+
+                blob = line.partition('\t')[0]
+
+                if blob in referenced:
+                    referenced.discard(blob)
+                    target.write(line)
+
+        os.replace(tmp, pack)
+
+    def reseal() -> None:
+        '''
+        Rewrites the pack file after the credential file was switched to or from encrypted
+        storage, so that blobs are stored the same way as the credential file. This
+        happens while holding the history lock.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        pack = Config.history_dir.joinpath('objects.pack')
+
+        if not pack.is_file():
+            return
+
+        with History.lock():
+            History.rewrite_pack()
+
+    def rewrite_pack() -> None:
+        '''
+        Rewrites the pack file with the current storage of the credential file. The caller
+        needs to hold the history lock.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        pack = Config.history_dir.joinpath('objects.pack')
+        seal = Vault.seal_blob if Config.is_encrypted() else lambda data: data
+        tmp = pack.with_name(pack.name + '.tmp')
+
+        with open(tmp, 'w') as file:
+            file.writelines(f'{blob}\t{seal(data)}\n' for blob, data in History.load_blobs().items())
+
+        os.replace(tmp, pack)
+
+    def restore(version: int) -> list[dict]:
+        '''
+        Restores the configuration of the specified version and returns its records.
+
+        Parameters:
+            version         Version to restore
+
+        Returns:
+            list            Credential records of the version
+        '''
+        manifest = History.manifest(version)
+        blobs = History.records(version)
+        loaded = History.load_blobs(set(blobs))
+
+        Config.default_url = manifest['meta']['default_url']
+        Config.default_domain = manifest['meta']['default_domain']
+        Config.default_sequence = manifest['meta'].get('default_sequence')
+        Config.imports = {int(batch): info for batch, info in manifest['meta']['imports'].items()}
+        Config.watermarks = manifest['meta']['watermarks']
+
+        return [decode_record(loaded[blob]) for blob in blobs]
+
+    def list_versions() -> None:
+        '''
+        Prints the available versions.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        for version in History.versions():
+
+            manifest = History.manifest(version)
+            timestamp = datetime.fromtimestamp(manifest['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            added, removed = manifest['changes']
+
+            print(f"{str(version).ljust(6)}  {timestamp}  {str(manifest['count']).rjust(8)} credentials  +{added} -{removed}")
+
+    def diff(old: int, new: int) -> None:
+        '''
+        Prints the records that differ between two versions. Changed records are shown
+        as removal of the old and addition of the new record.
+
+        Parameters:
+            old             First version
+            new             Second version
+
+        Returns:
+            None
+        '''
+        old_blobs, new_blobs = History.records(old), History.records(new)
+        removed = [blob for blob in old_blobs if blob not in set(new_blobs)]
+        added = [blob for blob in new_blobs if blob not in set(old_blobs)]
+
+        loaded = History.load_blobs(set(removed + added))
+
+        for sign, blobs in (('-', removed), ('+', added)):
+            for blob in blobs:
+
+                record = decode_record(loaded[blob])
+                note = record['note'] if record['custom_note'] else ''
+
+                user_pass = f"{record['username'] or ''}:{record['password'] or ''}"
+                print(f"{sign} {user_pass}  {record['domain'] or ''}  {record['url'] or ''}  {note}".rstrip())
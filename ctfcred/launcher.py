@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-import pyotp
+import sys
+import base64
 import pyperclip
 import subprocess
 
-from typing import Any
-from ctfcred.config import Config
+from typing import Any, Iterable
+from ctfcred.config import Config, DependencyException
+from ctfcred.otp import TOTPEngine
+from ctfcred.autotype import AutoType
+from ctfcred.picker import Picker
 from ctfcred.credential import Credential
 
 
@@ -19,11 +23,25 @@ class Launcher:
     '''
     This class is responsible for laucnhing external programs.
     '''
+    otp = TOTPEngine()
+    where = None
+
+    copy_codes = {
+                   0: 'passwords',
+                   10: 'passwords',
+                   11: 'usernames',
+                   13: 'otp codes',
+                   14: 'urls',
+                   15: 'domains',
+                   16: 'usernames',
+                   20: 'credentials',
+                 }
 
     def notify_send(item: Any, msg: str = None) -> None:
         '''
         Send a user notification using notify-send command. By default, the message contains
-        information that a certain item was copied.
+        information that a certain item was copied. Without notify-send, messages are
+        printed when using the terminal picker. Copied items are not printed to the terminal.
 
         Parameters:
             item        Item that was copied to clipboard
@@ -41,23 +59,49 @@ class Launcher:
         if Config.notify_send:
             subprocess.call(['notify-send', '-t', '1500', message])
 
-    def copy_otp(secret: str) -> None:
+        elif not Config.rofi:
+            print(f"[+] {msg or 'Copied to clipboard.'}", file=sys.stderr)
+
+    def clipboard(content: str) -> None:
         '''
-        Generate and copy an OTP to the clipboard.
+        Copies content to the clipboard. If no clipboard mechanism is available, which is
+        common on remote systems, the content is sent to the terminal using the OSC 52
+        escape sequence, which is supported by most terminal emulators.
 
         Parameters:
-            secret          Base32 encoded secret
+            content     Content to copy
 
         Returns:
             None
         '''
-        if secret is not None:
-            otp = pyotp.TOTP(secret).now()
-            pyperclip.copy(otp)
-            Launcher.notify_send(otp)
+        try:
+            pyperclip.copy(content)
 
-        else:
-            Launcher.copy_wrapper(None)
+        except pyperclip.PyperclipException:
+
+            if Config.rofi:
+                raise
+
+            encoded = base64.b64encode(content.encode('utf-8')).decode('ascii')
+
+            with open('/dev/tty', 'w') as tty:
+                tty.write(f'\033]52;c;{encoded}\a')
+
+    def load_otp(credentials: set[Credential]) -> None:
+        '''
+        Loads the OTP secrets of the specified credentials into the OTP engine. Invalid
+        secrets are reported once using notify-send.
+
+        Parameters:
+            credentials         Set of credential objects
+
+        Returns:
+            None
+        '''
+        for cred in credentials:
+
+            if cred.otp and cred.otp not in Launcher.otp.invalid and not Launcher.otp.add(cred.otp):
+                Launcher.notify_send(None, f'Invalid OTP secret for user {cred.username}')
 
     def copy_wrapper(item: str) -> None:
         '''
@@ -71,55 +115,110 @@ class Launcher:
             None
         '''
         if item is not None:
-            pyperclip.copy(item)
+            Launcher.clipboard(item)
             Launcher.notify_send(item)
 
         else:
-            pyperclip.copy('None')
+            Launcher.clipboard('None')
             Launcher.notify_send('None')
 
-    def copy_default(item: str, type_str: str) -> None:
+    def copy_lines(items: list[str], name: str) -> None:
         '''
-        If item exists, copy it to clipboard. Otherwise, copy the default
-        value to clipboard.
+        Copies multiple items to the clipboard at once. Each item is placed on a separate
+        line and missing items are skipped. Only a single notification is sent.
 
         Parameters:
-            item        Item to copy to the clipboard
-            type_str    Either url or domain
+            items       Items to copy to the clipboard
+            name        Name of the copied items used within the notification
 
         Returns:
             None
         '''
-        if item:
-            Launcher.copy_wrapper(item)
+        items = [item for item in items if item]
+        Launcher.clipboard('\n'.join(items))
 
-        elif type_str == 'url':
-            Launcher.copy_wrapper(Config.default_url)
+        Launcher.notify_send(None, f'{len(items)} {name} copied to clipboard')
 
-        elif type_str == 'domain':
-            Launcher.copy_wrapper(Config.default_domain)
+    def user_domain(cred: Credential) -> str:
+        '''
+        Returns the username of a credential prefixed with it's domain or the default domain.
 
-        else:
-            Launcher.copy_wrapper('None')
+        Parameters:
+            cred        Credential that represents the user
+
+        Returns:
+            str         Username with domain
+        '''
+        domain = cred.domain or Config.default_domain
+
+        if domain:
+            return f'{domain}/{cred.username}'
+
+        return cred.username
 
-    def copy_user_domain(cred: Credential) -> None:
+    def field(code: int, cred: Credential) -> str:
         '''
-        Copy a user with it's corresponding domain or the default domain.
+        Returns the value that is copied for the specified rofi status code. Urls and
+        domains fall back to the configured default values.
 
         Parameters:
-            cred        Credential that represents the user
+            code        Rofi status code
+            cred        Credential to obtain the value from
+
+        Returns:
+            str         Value to copy
+        '''
+        if code == 0 or code == 10:
+            return cred.password
+
+        elif code == 11:
+            return cred.username
+
+        elif code == 13:
+            return Launcher.otp.get(cred.otp)
+
+        elif code == 14:
+            return cred.url or Config.default_url
+
+        elif code == 15:
+            return cred.domain or Config.default_domain
+
+        elif code == 16:
+            return Launcher.user_domain(cred)
+
+        elif code == 20:
+            return f"{cred.username or ''}:{cred.password or ''}"
+
+    def autotype(cred: Credential, detach: bool = False) -> None:
+        '''
+        Performs the auto-type sequence of a credential. The sequence of the credential
+        is used if present, otherwise the configured default sequence. Fields without
+        value are skipped.
+
+        Parameters:
+            cred        Credential to perform the sequence for
+            detach      Perform the sequence within a detached child process
 
         Returns:
             None
         '''
-        if cred.domain:
-            Launcher.copy_wrapper(f'{cred.domain}/{cred.username}')
+        sequence = cred.sequence or Config.default_sequence or AutoType.default
+        steps = []
 
-        elif Config.default_domain:
-            Launcher.copy_wrapper(f'{Config.default_domain}/{cred.username}')
+        Launcher.load_otp([cred])
 
-        else:
-            Launcher.copy_wrapper(cred.username)
+        for kind, name in AutoType.parse(sequence):
+
+            if kind == 'key':
+                steps.append((kind, name))
+
+            else:
+                value = Launcher.field(AutoType.fields[name], cred)
+
+                if value:
+                    steps.append(('text', value))
+
+        AutoType.run(steps, lambda msg: Launcher.notify_send(None, msg), detach)
 
     def open_url(cred: Credential) -> None:
         '''
@@ -136,136 +235,207 @@ class Launcher:
 
         subprocess.call(['xdg-open', cred.url])
 
-    def start_rofi(credentials: set[Credential], prompt: str = 'Select Credential') -> tuple[int, Credential]:
+    def start_rofi(credentials: set[Credential], prompt: str = 'Select Credential', multi: bool = False) -> tuple[int, Any]:
         '''
         Takes a set of credential objects and displays them within rofi. Retruns the selected
-        credential object and the exit code of rofi.
+        credential object and the exit code of rofi. If a filter was configured, only matching
+        credentials are displayed. In multi select mode, rofi allows selecting several
+        credentials (Shift+Enter) and a list of the selected credentials is returned. If
+        rofi is not available, the terminal picker is used instead. Cancelling the
+        selection exits ctfcred.
 
         Parameters:
             credentials         Set of credential objects to display
+            prompt              Prompt to display within rofi
+            multi               Allow selecting multiple credentials
 
         Returns:
-            Credential          User selected credential
+            tuple               Exit code and selected credential (or list of credentials)
+        '''
+        if Launcher.where:
+            credentials = Launcher.where.apply(credentials)
+
+        cred_list = sorted(credentials, key=lambda x: x.id)
+        Launcher.load_otp(cred_list)
+
+        rows = (cred.format(Launcher.otp.column(cred.otp) if Config.otp_column else '') for cred in cred_list)
+
+        if Config.rofi:
+            code, indices = Launcher.rofi(rows, prompt, multi)
+
+        elif sys.stdin.isatty():
+            code, indices = Picker(list(rows), prompt, multi).run()
+
+        else:
+            raise DependencyException("Unable to find 'rofi' in your current PATH and not running within a terminal.")
+
+        if code == 1 and not indices:
+            sys.exit(0)
+
+        try:
+            selected = [cred_list[index] for index in indices]
+
+        except IndexError:
+            selected = []
+
+        if not selected:
+            raise RofiException(f"rofi returned unexpected index: '{' '.join(map(str, indices))}'.")
+
+        if multi:
+            return (code, selected)
+
+        return (code, selected[0])
+
+    def rofi(rows: Iterable[str], prompt: str, multi: bool) -> tuple[int, list[int]]:
+        '''
+        Displays the specified rows within rofi. rofi is started before the rows are
+        consumed, so that formatting the rows overlaps with the startup of rofi.
+
+        Parameters:
+            rows                Rows to display
+            prompt              Prompt to display within rofi
+            multi               Allow selecting multiple rows
+
+        Returns:
+            tuple               Exit code of rofi and selected row indices
         '''
         command = ['rofi', '-dmenu', '-format', 'i', '-p', prompt] + Config.key_mappings
+
+        if multi:
+            command.append('-multi-select')
+
         process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
 
-        cred_list = sorted(credentials, key=lambda x: x.id)
+        for row in rows:
+            process.stdin.write(row.encode('utf-8'))
 
-        for cred in cred_list:
-            process.stdin.write(cred.format().encode('utf-8'))
+        output = process.communicate()[0].decode('utf-8')
 
         try:
-            index = (process.communicate()[0]).decode('utf-8')
-            index = int(index)
+            return (process.returncode, [int(index) for index in output.split()])
 
         except ValueError:
-            raise RofiException(f"rofi returned unexpected index: '{index}'.")
+            raise RofiException(f"rofi returned unexpected index: '{output.strip()}'.")
 
-        credential = cred_list[index]
-        return (process.returncode, credential)
+    def restart(cred_list: list[Credential]) -> None:
+        '''
+        Writes the credentials and launches rofi again.
 
-    def handle_exit(code: int, cred: Credential, cred_list: list[Credential]) -> None:
+        Parameters:
+            cred_list       List of all available credentials
+
+        Returns:
+            None
+        '''
+        Credential.to_file(cred_list)
+        creds = Credential.from_file()
+
+        status, selected = Launcher.start_rofi(creds, 'Select Credential', True)
+        Launcher.handle_exit(status, selected, creds)
+
+    def handle_exit(code: int, selected: Any, cred_list: list[Credential]) -> None:
         '''
-        Performs an action accordin to the exit code of rofi.
+        Performs an action accordin to the exit code of rofi. Actions are applied to all
+        selected credentials. Changes are applied in memory and written once.
 
         Parameters:
             code            Exit code of rofi
-            cred            User selected credential object
+            selected        User selected credential object or list of credential objects
             cred_list       List of all available credentials
 
         Returns:
             None
         '''
-        if Launcher.handle_copy(code, cred):
+        selection = selected if isinstance(selected, list) else [selected]
+
+        if Launcher.handle_copy(code, selection):
             pass
 
-        elif Launcher.handle_movement(code, cred, cred_list):
+        elif Launcher.handle_movement(code, selection, cred_list):
             pass
 
         elif code == 12:
-            cred_list.remove(cred)
 
-            Credential.to_file(cred_list)
-            creds = Credential.from_file()
+            for cred in selection:
+                cred_list.remove(cred)
 
-            status, selected = Launcher.start_rofi(creds)
-            Launcher.handle_exit(status, selected, creds)
+            Launcher.restart(cred_list)
 
         elif code == 19:
-            Launcher.open_url(cred)
+
+            for cred in selection:
+                Launcher.open_url(cred)
 
         else:
             raise RofiException(f'rofi returned unexpected return code: {code}.')
 
-    def handle_movement(code: int, cred: Credential, cred_list: set[Credential]) -> bool:
+    def handle_movement(code: int, selection: list[Credential], cred_list: set[Credential]) -> bool:
         '''
-        Handle credential movement according to rofi status code.
+        Handle credential movement according to rofi status code. Selected credentials are
+        moved as a block. Credentials that are already at the top or bottom stay in place.
 
         Parameters:
             code            Rofi status code
-            cred            Selected credential object
+            selection       Selected credential objects
             cred_list       Credential list
 
         Returns:
             bool            True if movement code, false otherwise
         '''
-        old_id = cred.id
-
         if code == 17:
-            new_id = cred.id - 1
+            step = -1
 
         elif code == 18:
-            new_id = cred.id + 1
+            step = 1
 
         else:
             return False
 
-        other = Credential.get_by_id(new_id, cred_list)
+        ids = {cred.id: cred for cred in cred_list}
+        selected = {id(cred) for cred in selection}
+        moved = False
+
+        for cred in sorted(selection, key=lambda x: x.id, reverse=step > 0):
 
-        if other:
+            other = ids.get(cred.id + step)
 
-            other.id = old_id
-            cred.id = new_id
+            if other is None or id(other) in selected:
+                continue
 
-            Credential.to_file(cred_list)
-            creds = Credential.from_file()
+            other.id, cred.id = cred.id, other.id
+            ids[other.id], ids[cred.id] = other, cred
 
-            status, selected = Launcher.start_rofi(creds)
-            Launcher.handle_exit(status, selected, creds)
+            moved = True
+
+        if moved:
+            Launcher.restart(cred_list)
 
         return True
 
-    def handle_copy(code: int, cred: Credential) -> bool:
+    def handle_copy(code: int, selection: list[Credential]) -> bool:
         '''
-        Handle credential copy operations according to rofi status code.
+        Handle credential copy operations according to rofi status code. If multiple
+        credentials are selected, the values of all of them are copied line by line.
+        The auto-type sequence is only performed for the first selected credential.
 
         Parameters:
             code            Rofi status code
-            cred            Selected credential object
+            selection       Selected credential objects
 
         Returns:
             bool            True if copy code, false otherwise
         '''
-        if code == 0 or code == 10:
-            Launcher.copy_wrapper(cred.password)
-
-        elif code == 11:
-            Launcher.copy_wrapper(cred.username)
-
-        elif code == 13:
-            Launcher.copy_otp(cred.otp)
+        if code == 21:
+            Launcher.autotype(selection[0])
+            return True
 
-        elif code == 14:
-            Launcher.copy_default(cred.url, 'url')
-
-        elif code == 15:
-            Launcher.copy_default(cred.domain, 'domain')
+        if code not in Launcher.copy_codes:
+            return False
 
-        elif code == 16:
-            Launcher.copy_user_domain(cred)
+        if len(selection) == 1:
+            Launcher.copy_wrapper(Launcher.field(code, selection[0]))
 
         else:
-            return False
+            Launcher.copy_lines([Launcher.field(code, cred) for cred in selection], Launcher.copy_codes[code])
 
         return True
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import hashlib
+
+from pathlib import Path
+from ctfcred.config import Config
+from ctfcred.compression import Compression
+from ctfcred.credential import Credential
+from ctfcred.schema import Schema
+
+
+class CredentialMerger:
+    '''
+    The CredentialMerger combines the credentials of different credential files. Records are
+    matched by their stable uid and, for records that were created independently, by a hash
+    over their identifying content. Matched records are merged field by field. All lookups
+    are done via dictionaries, so merging scales linearly with the number of credentials.
+    '''
+    fields = ['username', 'password', 'domain', 'hash', 'otp', 'url', 'alias', 'note', 'sequence']
+
+    def __init__(self, base: set[Credential] = None) -> None:
+        '''
+        Creates a new CredentialMerger. If a base is specified, merges are performed as
+        three-way merges against this base.
+
+        Parameters:
+            base            Common ancestor of the credentials to merge
+
+        Returns:
+            None
+        '''
+        self.base = CredentialMerger.index(base) if base is not None else None
+
+        self.added = 0
+        self.updated = 0
+        self.removed = 0
+        self.conflicts = 0
+
+    def key(cred: Credential) -> str:
+        '''
+        Returns the content hash of a credential. It covers the fields that identify a
+        credential, so that independently created copies of a credential share the key.
+
+        Parameters:
+            cred            Credential to compute the key for
+
+        Returns:
+            str             Hex encoded content hash
+        '''
+        content = '\0'.join(value or '' for value in (cred.username, cred.password, cred.domain, cred.hash))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def value(cred: Credential, field: str) -> str:
+        '''
+        Returns the value of a merged field. Notes are only considered if they are custom.
+
+        Parameters:
+            cred            Credential to obtain the value from
+            field           Name of the field
+
+        Returns:
+            str             Value of the field
+        '''
+        if field == 'note' and not cred.custom_note:
+            return None
+
+        return getattr(cred, field)
+
+    def index(credentials: set[Credential]) -> tuple[dict, dict]:
+        '''
+        Creates the uid and content indexes for the specified credentials.
+
+        Parameters:
+            credentials     Set of Credential objects
+
+        Returns:
+            tuple           Mapping of uid -> credential and key -> credential
+        '''
+        uids = {cred.uid: cred for cred in credentials}
+        keys = {CredentialMerger.key(cred): cred for cred in credentials}
+
+        return (uids, keys)
+
+    def lookup(index: tuple[dict, dict], cred: Credential) -> Credential:
+        '''
+        Looks up the counterpart of a credential within an index.
+
+        Parameters:
+            index           Index as returned by CredentialMerger.index
+            cred            Credential to look up
+
+        Returns:
+            credential      Matching credential or None
+        '''
+        uids, keys = index
+        return uids.get(cred.uid) or keys.get(CredentialMerger.key(cred))
+
+    def changed(cred: Credential, other: Credential) -> bool:
+        '''
+        Checks whether any of the merged fields differs between two credentials.
+
+        Parameters:
+            cred            First credential
+            other           Second credential
+
+        Returns:
+            bool            True if any field differs
+        '''
+        value = CredentialMerger.value
+        return any(value(cred, field) != value(other, field) for field in CredentialMerger.fields)
+
+    def resolve(self, mine: Credential, theirs: Credential, base: Credential) -> bool:
+        '''
+        Merges theirs into mine field by field. A field that was only changed on one side
+        takes the changed value. Missing values are filled from the other side. If both
+        sides changed a field to different values, the more recently modified credential
+        wins and a conflict is counted.
+
+        Parameters:
+            mine            Local credential (updated in place)
+            theirs          Remote credential
+            base            Common ancestor or None
+
+        Returns:
+            bool            True if mine was changed
+        '''
+        value = CredentialMerger.value
+        changed = False
+
+        for field in CredentialMerger.fields:
+
+            m, t = value(mine, field), value(theirs, field)
+
+            if m == t or (base is not None and t == value(base, field)):
+                continue
+
+            if m is not None and (base is None or m != value(base, field)):
+
+                if t is None:
+                    continue
+
+                self.conflicts += 1
+
+                if mine.modified >= theirs.modified:
+                    continue
+
+            if field == 'note':
+                mine.note, mine.custom_note = theirs.note, theirs.custom_note
+
+            else:
+                setattr(mine, field, t)
+
+            changed = True
+
+        tags = sorted(set(mine.tags) | set(theirs.tags))
+
+        if tags != mine.tags:
+            mine.tags = tags
+            changed = True
+
+        if changed:
+            mine.modified = max(mine.modified, theirs.modified)
+
+        return changed
+
+    def merge(self, mine: set[Credential], theirs: set[Credential]) -> set[Credential]:
+        '''
+        Merges theirs into mine. Without a base, credentials that only exist on one side
+        are kept. With a base, credentials that were deleted on one side and not changed
+        on the other side are removed. Added credentials get ids above the local ones, so
+        that they are appended in their original order and the local order is kept.
+
+        Parameters:
+            mine            Local credentials
+            theirs          Remote credentials
+
+        Returns:
+            set             Merged credentials
+        '''
+        index = CredentialMerger.index(mine)
+        lookup = CredentialMerger.lookup
+
+        merged = set()
+        matched = set()
+        last = max((cred.id for cred in mine), default=0)
+
+        for cred in sorted(theirs, key=lambda x: x.id):
+
+            own = lookup(index, cred)
+            base = lookup(self.base, cred) if self.base else None
+
+            if own is None:
+
+                if base is None or CredentialMerger.changed(cred, base):
+                    last += 1
+                    cred.id = last
+                    self.added += 1
+                    merged.add(cred)
+
+                continue
+
+            matched.add(id(own))
+
+            if self.resolve(own, cred, base):
+                self.updated += 1
+
+        for cred in mine:
+
+            if id(cred) not in matched and self.base:
+
+                base = lookup(self.base, cred)
+
+                if base is not None and not CredentialMerger.changed(cred, base):
+                    self.removed += 1
+                    continue
+
+            merged.add(cred)
+
+        return merged
+
+    def report(self) -> None:
+        '''
+        Prints a summary of the merge.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        print(f'[+] Merge done: {self.added} added, {self.updated} updated, {self.removed} removed, '
+              f'{self.conflicts} conflicts.')
+
+    def read(path: Path) -> set[Credential]:
+        '''
+        Reads the credentials of a credential file other than the configured one.
+
+        Parameters:
+            path            Path of the credential file
+
+        Returns:
+            set             Set of Credential objects
+        '''
+        return CredentialMerger.read_file(path)[0]
+
+    def read_file(path: Path) -> tuple[set[Credential], dict]:
+        '''
+        Reads the credentials and the remaining content (defaults, import batches and
+        export watermarks) of a credential file other than the configured one.
+
+        Parameters:
+            path            Path of the credential file
+
+        Returns:
+            tuple           Set of Credential objects and remaining content
+        '''
+        yml = Config.read_cred_file(path) or {}
+        credentials = Credential.from_records(yml.pop('credentials', None) or [], Schema.file_version(yml))
+
+        return (credentials, yml)
+
+    def write_file(path: Path, credentials: set[Credential], meta: dict) -> None:
+        '''
+        Writes credentials to a credential file other than the configured one. The file
+        keeps its remaining content, its encryption and its compression.
+
+        Parameters:
+            path            Path of the credential file
+            credentials     Set of Credential objects
+            meta            Remaining content as returned by read_file
+
+        Returns:
+            None
+        '''
+        yml = dict(meta)
+        yml['schema'] = Schema.version
+        yml['credentials'] = [cred.to_dict() for cred in sorted(credentials, key=lambda x: x.id)]
+
+        with open(path, 'rb') as file:
+            encrypted = file.read(len(Config.vault_magic)) == Config.vault_magic
+
+        Config.replace_cred_file(path, yml, encrypted, Compression.detect(path))
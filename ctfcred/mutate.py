@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import os
+import math
+import hashlib
+import collections
+import functools
+import itertools
+import concurrent.futures
+
+from typing import Iterable, Iterator
+from datetime import datetime
+
+
+class MutationException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+def position(char: str) -> int:
+    '''
+    Converts a hashcat position character (0-9, A-Z) into an integer.
+
+    Parameters:
+        char        Position character
+
+    Returns:
+        int         Corresponding position
+    '''
+    if char.isdigit():
+        return int(char)
+
+    if 'A' <= char <= 'Z':
+        return ord(char) - ord('A') + 10
+
+    raise MutationException(f"Invalid rule position: '{char}'.")
+
+
+def title(word: str) -> str:
+    '''
+    Lowercases the word and uppercases the first character and each character after a space.
+
+    Parameters:
+        word        Word to transform
+
+    Returns:
+        str         Transformed word
+    '''
+    return ' '.join(part[:1].upper() + part[1:] for part in word.lower().split(' '))
+
+
+class Rule:
+    '''
+    Rule objects represent a single compiled hashcat rule. The supported functions are a
+    subset of the hashcat rule language. Each function is described by the number and kind
+    of its arguments (N = position, X = character) and a transformation function.
+    '''
+    functions = {
+                  ':': ('', lambda w: w),
+                  'l': ('', lambda w: w.lower()),
+                  'u': ('', lambda w: w.upper()),
+                  'c': ('', lambda w: w[:1].upper() + w[1:].lower()),
+                  'C': ('', lambda w: w[:1].lower() + w[1:].upper()),
+                  't': ('', lambda w: w.swapcase()),
+                  'T': ('N', lambda w, n: w[:n] + w[n:n + 1].swapcase() + w[n + 1:]),
+                  'r': ('', lambda w: w[::-1]),
+                  'd': ('', lambda w: w + w),
+                  'p': ('N', lambda w, n: w * (n + 1)),
+                  'f': ('', lambda w: w + w[::-1]),
+                  '{': ('', lambda w: w[1:] + w[:1]),
+                  '}': ('', lambda w: w[-1:] + w[:-1]),
+                  '$': ('X', lambda w, x: w + x),
+                  '^': ('X', lambda w, x: x + w),
+                  '[': ('', lambda w: w[1:]),
+                  ']': ('', lambda w: w[:-1]),
+                  'D': ('N', lambda w, n: w[:n] + w[n + 1:]),
+                  'x': ('NN', lambda w, n, m: w[n:n + m]),
+                  'O': ('NN', lambda w, n, m: w[:n] + w[n + m:]),
+                  'i': ('NX', lambda w, n, x: w[:n] + x + w[n:] if n <= len(w) else w),
+                  'o': ('NX', lambda w, n, x: w[:n] + x + w[n + 1:] if n < len(w) else w),
+                  "'": ('N', lambda w, n: w[:n]),
+                  's': ('XX', lambda w, x, y: w.replace(x, y)),
+                  '@': ('X', lambda w, x: w.replace(x, '')),
+                  'z': ('N', lambda w, n: w[:1] * n + w),
+                  'Z': ('N', lambda w, n: w + w[-1:] * n),
+                  'q': ('', lambda w: ''.join(c * 2 for c in w)),
+                  'k': ('', lambda w: w[1:2] + w[:1] + w[2:]),
+                  'K': ('', lambda w: w[:-2] + w[-1:] + w[-2:-1] if len(w) > 1 else w),
+                  'E': ('', title),
+                }
+
+    def __init__(self, rule: str) -> None:
+        '''
+        Compiles the specified rule string.
+
+        Parameters:
+            rule            Rule in hashcat syntax
+
+        Returns:
+            None
+        '''
+        self.rule = rule
+        self.ops = []
+
+        index = 0
+
+        while index < len(rule):
+
+            char = rule[index]
+            index += 1
+
+            if char in ' \t':
+                continue
+
+            if char not in Rule.functions:
+                raise MutationException(f"Unsupported rule function '{char}' in rule '{rule}'.")
+
+            kinds, func = Rule.functions[char]
+            args = rule[index:index + len(kinds)]
+
+            if len(args) != len(kinds):
+                raise MutationException(f"Missing argument for rule function '{char}' in rule '{rule}'.")
+
+            index += len(kinds)
+            args = [position(arg) if kind == 'N' else arg for kind, arg in zip(kinds, args)]
+
+            self.ops.append((func, args))
+
+    def apply(self, word: str) -> str:
+        '''
+        Applies the rule to the specified word.
+
+        Parameters:
+            word            Word to mutate
+
+        Returns:
+            str             Mutated word
+        '''
+        for func, args in self.ops:
+            word = func(word, *args)
+
+        return word
+
+
+class BloomFilter:
+    '''
+    Simple bloom filter that is used to deduplicate mutation candidates with bounded memory.
+    The filter may report false positives, which causes a small fraction of candidates to
+    be dropped, but never lets a duplicate candidate pass.
+    '''
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.0001) -> None:
+        '''
+        Creates a new BloomFilter sized for the specified capacity and error rate.
+
+        Parameters:
+            capacity        Expected number of items
+            error_rate      Acceptable false positive rate
+
+        Returns:
+            None
+        '''
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> bool:
+        '''
+        Adds an item to the filter. Returns True if the item was not contained before.
+
+        Parameters:
+            item            Item to add
+
+        Returns:
+            bool            True if the item is new, False otherwise
+        '''
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+
+        new = False
+
+        for i in range(self.hashes):
+
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+
+        return new
+
+
+def mutate_chunk(rules: list[str], words: list[str]) -> list[str]:
+    '''
+    Applies the specified rules to a chunk of words. This function is executed within
+    the worker processes of the Mutator class.
+
+    Parameters:
+        rules       Rule strings to apply
+        words       Chunk of words to mutate
+
+    Returns:
+        list        Mutation candidates
+    '''
+    compiled = [Rule(rule) for rule in rules]
+    return [rule.apply(word) for word in words for rule in compiled]
+
+
+class Mutator:
+    '''
+    The Mutator class creates password candidates by applying hashcat style rules to
+    stored passwords. Candidates are generated lazily and deduplicated per user, using
+    a set or, for large amounts of candidates, a bloom filter sized for the user. Large
+    amounts of words are split across worker processes.
+    '''
+    chunk_size = 256
+    pool_threshold = 1000000
+    exact_threshold = 1000000
+
+    def __init__(self, rules: list[str] = None, limit: int = None, with_user: bool = False) -> None:
+        '''
+        Creates a new Mutator object.
+
+        Parameters:
+            rules           Rule strings in hashcat syntax (default: Mutator.default_rules())
+            limit           Maximum number of candidates per user
+            with_user       Also use the username as base word and suffix
+
+        Returns:
+            None
+        '''
+        self.rules = rules or Mutator.default_rules()
+        self.compiled = [Rule(rule) for rule in self.rules]
+
+        self.limit = limit
+        self.with_user = with_user
+        self.seen = None
+
+    def default_rules() -> list[str]:
+        '''
+        Returns the default rule set. It contains common capitalization, leetspeak and
+        special character rules as well as season and year suffixes for the current and
+        the previous year.
+
+        Parameters:
+            None
+
+        Returns:
+            list            List of rule strings
+        '''
+        rules = [':', 'c', 'u', 'l', 't', 'r', '$!', '$1', '$1 $2 $3', 'c $!', 'c $1', 'c $1 $!', 'c $1 $2 $3',
+                 'sa@', 'se3', 'so0', 'si1', 'ss$', 'sa@ se3 si1 so0 ss$', 'c sa@ so0', 'c sa@ so0 $!']
+
+        year = datetime.now().year
+
+        for y in (year - 1, year):
+
+            suffix = ' '.join(f'${digit}' for digit in str(y))
+            rules += [suffix, f'c {suffix}', f'c {suffix} $!']
+
+            for season in ('Spring', 'Summer', 'Autumn', 'Winter'):
+                rules.append(f'c {" ".join("$" + char for char in season)} {suffix}')
+
+        return rules
+
+    def load_rules(filename: str) -> list[str]:
+        '''
+        Loads rules from a hashcat rule file. Empty lines and comments are skipped.
+
+        Parameters:
+            filename        Rule file to load
+
+        Returns:
+            list            List of rule strings
+        '''
+        with open(filename, 'r') as file:
+            lines = (line.rstrip('\n') for line in file)
+            return [line for line in lines if line.strip() and not line.startswith('#')]
+
+    def mutations(self, words: list[str]) -> Iterator[str]:
+        '''
+        Applies all rules to the specified words. Words are split into chunks that are
+        mutated by a process pool if the amount of work exceeds the configured threshold.
+        Only a limited amount of chunks is in flight at the same time and candidates are
+        returned in the same order as for the sequential case.
+
+        Parameters:
+            words           Words to mutate
+
+        Returns:
+            iterator        Mutation candidates (may contain duplicates)
+        '''
+        if len(words) * len(self.rules) < Mutator.pool_threshold:
+            return (rule.apply(word) for word in words for rule in self.compiled)
+
+        chunks = (words[i:i + Mutator.chunk_size] for i in range(0, len(words), Mutator.chunk_size))
+        worker = functools.partial(mutate_chunk, self.rules)
+
+        def generate():
+
+            pending = collections.deque()
+            window = 2 * (os.cpu_count() or 1)
+
+            with concurrent.futures.ProcessPoolExecutor() as pool:
+
+                try:
+                    for chunk in chunks:
+
+                        pending.append(pool.submit(worker, chunk))
+
+                        if len(pending) >= window:
+                            yield from pending.popleft().result()
+
+                    while pending:
+                        yield from pending.popleft().result()
+
+                finally:
+                    for future in pending:
+                        future.cancel()
+
+        return generate()
+
+    def seen_filter(self, username: str, count: int) -> set | BloomFilter:
+        '''
+        Returns the already seen candidates for the specified user. Consecutive calls for
+        the same user share the same set. Otherwise, a new set is created. If the expected
+        amount of candidates exceeds the exact threshold, a bloom filter that is sized for
+        this amount is used instead.
+
+        Parameters:
+            username        User the candidates are generated for
+            count           Expected amount of candidates
+
+        Returns:
+            seen            Set or BloomFilter of seen candidates
+        '''
+        if self.seen is None or self.seen[0] != username:
+
+            if count > Mutator.exact_threshold:
+                self.seen = (username, BloomFilter(count))
+
+            else:
+                self.seen = (username, set())
+
+        return self.seen[1]
+
+    def candidates(self, words: Iterable[str], username: str = None) -> Iterator[str]:
+        '''
+        Returns unique mutation candidates for the specified words. Candidates are deduplicated
+        per user and limited by the configured per user limit. Consecutive calls for the same
+        user do not repeat candidates. When with_user is set, the username is used as an
+        additional base word and as suffix.
+
+        Parameters:
+            words           Words to mutate
+            username        Optional user the candidates are generated for
+
+        Returns:
+            iterator        Unique mutation candidates
+        '''
+        words = list(words)
+
+        if username and self.with_user:
+            words += [username] + [f'{word}{username}' for word in words]
+
+        count = len(words) * len(self.rules)
+        seen = self.seen_filter(username, min(count, self.limit or count))
+
+        def add(candidate: str) -> bool:
+
+            if isinstance(seen, BloomFilter):
+                return seen.add(candidate)
+
+            new = candidate not in seen
+            seen.add(candidate)
+
+            return new
+
+        candidates = (candidate for candidate in self.mutations(words) if candidate and add(candidate))
+
+        if self.limit:
+            candidates = itertools.islice(candidates, self.limit)
+
+        return candidates
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import time
+import pyotp
+import binascii
+
+from typing import Iterable
+
+
+class TOTPEngine:
+    '''
+    The TOTPEngine computes TOTP codes for a collection of OTP secrets. Codes for all known
+    secrets are computed in one batch for the current time window and are cached until the
+    window rolls over. Secrets that are not valid base32 are detected once during loading.
+    '''
+
+    def __init__(self, secrets: Iterable[str] = ()) -> None:
+        '''
+        Creates a new TOTPEngine and validates the specified secrets.
+
+        Parameters:
+            secrets         Base32 encoded OTP secrets
+
+        Returns:
+            None
+        '''
+        self.totps = {}
+        self.invalid = set()
+
+        self.codes = {}
+        self.window = None
+        self.interval = 30
+
+        for secret in secrets:
+            self.add(secret)
+
+    def add(self, secret: str) -> bool:
+        '''
+        Adds a secret to the engine. Returns False if the secret is not valid base32.
+
+        Parameters:
+            secret          Base32 encoded OTP secret
+
+        Returns:
+            bool            True if the secret is valid, False otherwise
+        '''
+        if secret in self.totps:
+            return True
+
+        if not secret or secret in self.invalid:
+            return False
+
+        try:
+            totp = pyotp.TOTP(secret)
+            totp.byte_secret()
+
+        except (binascii.Error, ValueError):
+            self.invalid.add(secret)
+            return False
+
+        self.totps[secret] = totp
+
+        if self.window is not None:
+            self.codes[secret] = totp.at(self.window * self.interval)
+
+        return True
+
+    def refresh(self) -> None:
+        '''
+        Computes the codes for all valid secrets if the current time window differs from
+        the cached one.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        window = int(time.time()) // self.interval
+
+        if window == self.window:
+            return
+
+        for_time = window * self.interval
+        self.codes = {secret: totp.at(for_time) for secret, totp in self.totps.items()}
+        self.window = window
+
+    def get(self, secret: str) -> str:
+        '''
+        Returns the current code for the specified secret. None is returned for
+        invalid or empty secrets.
+
+        Parameters:
+            secret          Base32 encoded OTP secret
+
+        Returns:
+            str             Current TOTP code
+        '''
+        if not self.add(secret):
+            return None
+
+        self.refresh()
+        return self.codes[secret]
+
+    def remaining(self) -> int:
+        '''
+        Returns the number of seconds until the current time window rolls over.
+
+        Parameters:
+            None
+
+        Returns:
+            int             Remaining seconds of the current window
+        '''
+        return self.interval - int(time.time()) % self.interval
+
+    def column(self, secret: str) -> str:
+        '''
+        Returns the OTP column as displayed in rofi. The column contains the current
+        code and the remaining seconds of the current window.
+
+        Parameters:
+            secret          Base32 encoded OTP secret
+
+        Returns:
+            str             Formatted OTP column
+        '''
+        if not secret:
+            return ''.ljust(14)
+
+        code = self.get(secret)
+
+        if code is None:
+            return 'invalid'.ljust(14)
+
+        return f'{code} ({self.remaining()}s)'.ljust(14)
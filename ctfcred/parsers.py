@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import re
+import sys
+import time
+
+from pathlib import Path
+from typing import Iterable, Iterator
+from ctfcred.compression import Compression
+
+
+class UnknownLootFormat(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class LootParser:
+    '''
+    The LootParser parses the output of common offensive tools line by line. Each parsed line
+    results in a record tuple (username, password, domain, hash). Lines are processed lazily
+    using precompiled regular expressions, so arbitrary large files can be parsed without
+    reading them into memory.
+    '''
+    ansi = re.compile(r'\x1b\[[0-9;]*m')
+    hex_password = re.compile(r'^\$HEX\[([0-9a-fA-F]*)\]$')
+    nt_hash = re.compile(r'^(?:[0-9a-fA-F]{32}:)?([0-9a-fA-F]{32})$')
+
+    secretsdump_hash = re.compile(r'^(?:([^\\:\s]+)\\)?([^:\s]+):\d+:[0-9a-fA-F]{32}:([0-9a-fA-F]{32}):::')
+    secretsdump_clear = re.compile(r'^(?:([^\\:\s]+)\\)?([^:\s]+):CLEARTEXT:(.*)$')
+    potfile_ntlmv2 = re.compile(r'^([^:\s]+::[^:\s]*:[0-9a-fA-F]{16}:[0-9a-fA-F]{32}:[0-9a-fA-F]+):(.*)$')
+    potfile_nt = re.compile(r'^([0-9a-fA-F]{32}):(.*)$')
+    netexec = re.compile(r'\[\+\]\s+(?:([^\\\s]+)\\)?([^:\s]+):(.*?)(?:\s+\((?:Pwn3d!|Guest)\))?\s*$')
+    responder = re.compile(r'(([^\s:]+)::([^\s:]+):[0-9a-fA-F]{16}:[0-9a-fA-F]{32}:[0-9a-fA-F]+)')
+
+    detectable = ['netexec', 'potfile', 'responder', 'secretsdump']
+    formats = detectable + ['userpass']
+
+    def __init__(self, fmt: str, sep: str = ':') -> None:
+        '''
+        Creates a new LootParser for the specified format.
+
+        Parameters:
+            fmt             Loot format (netexec, potfile, responder, secretsdump, userpass)
+            sep             Separator between username and password (userpass format)
+
+        Returns:
+            None
+        '''
+        if fmt not in LootParser.formats:
+            raise UnknownLootFormat(f"Unknown loot format '{fmt}'. Available formats: {', '.join(LootParser.formats)}.")
+
+        self.fmt = fmt
+        self.sep = sep
+        self.handler = getattr(self, f'parse_{fmt}')
+
+        self.lines = 0
+        self.records = 0
+        self.seconds = 0.0
+
+    def detect(filename: Path, default: str = None) -> str:
+        '''
+        Guesses the loot format of a file by parsing its first lines with each of the
+        available parsers. The userpass format matches almost anything and is therefore
+        never detected, but can be specified as default.
+
+        Parameters:
+            filename        File to inspect
+            default         Format to return if no format matches
+
+        Returns:
+            str             Name of the detected format
+        '''
+        with Compression.open(filename, 'r', errors='replace') as file:
+            lines = [line for _, line in zip(range(64), file)]
+
+        hits = {fmt: sum(1 for _ in LootParser(fmt).parse(lines)) for fmt in LootParser.detectable}
+        fmt = max(hits, key=hits.get)
+
+        if not hits[fmt] and default:
+            return default
+
+        if not hits[fmt]:
+            raise UnknownLootFormat(f'Unable to detect the loot format of {filename}.')
+
+        return fmt
+
+    def parse(self, lines: Iterable[str]) -> Iterator[tuple]:
+        '''
+        Parses the specified lines and yields a record for each line that matches the
+        format of the parser.
+
+        Parameters:
+            lines           Iterable of lines to parse
+
+        Returns:
+            iterator        Record tuples (username, password, domain, hash)
+        '''
+        start = time.perf_counter()
+
+        for line in lines:
+
+            self.lines += 1
+            record = self.handler(line.rstrip('\r\n'))
+
+            if record is not None:
+                self.records += 1
+                yield record
+
+        self.seconds += time.perf_counter() - start
+
+    def parse_file(self, filename: Path) -> Iterator[tuple]:
+        '''
+        Parses the specified file line by line.
+
+        Parameters:
+            filename        File to parse
+
+        Returns:
+            iterator        Record tuples (username, password, domain, hash)
+        '''
+        with Compression.open(filename, 'r', errors='replace') as file:
+            yield from self.parse(file)
+
+    def report(self) -> None:
+        '''
+        Prints the throughput of the parser to stderr.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        rate = self.lines / self.seconds if self.seconds else 0
+        print(f'[+] Parsed {self.lines} lines ({self.records} records) in {self.seconds:.2f}s ({rate:.0f} lines/s)',
+              file=sys.stderr)
+
+    def decode_password(password: str) -> str:
+        '''
+        Decodes passwords in hashcat's $HEX[...] notation.
+
+        Parameters:
+            password        Password to decode
+
+        Returns:
+            str             Decoded password
+        '''
+        match = LootParser.hex_password.match(password)
+
+        if match:
+            return bytes.fromhex(match.group(1)).decode('utf-8', errors='replace')
+
+        return password
+
+    def parse_secretsdump(self, line: str) -> tuple:
+        '''
+        Parses a line of secretsdump output. Supported are NT hash lines
+        (domain\\user:rid:lm:nt:::) and cleartext lines (domain\\user:CLEARTEXT:pass).
+
+        Parameters:
+            line            Line to parse
+
+        Returns:
+            tuple           Record tuple or None
+        '''
+        match = LootParser.secretsdump_hash.match(line)
+
+        if match:
+            return (match.group(2), None, match.group(1), match.group(3).lower())
+
+        match = LootParser.secretsdump_clear.match(line)
+
+        if match:
+            return (match.group(2), match.group(3), match.group(1), None)
+
+        return None
+
+    def parse_potfile(self, line: str) -> tuple:
+        '''
+        Parses a line of a hashcat or john potfile (hash:password). Only NT and NetNTLMv2
+        hashes are considered, as these are the ones that can be joined to stored users.
+
+        Parameters:
+            line            Line to parse
+
+        Returns:
+            tuple           Record tuple or None
+        '''
+        match = LootParser.potfile_ntlmv2.match(line)
+
+        if match:
+            return (None, LootParser.decode_password(match.group(2)), None, match.group(1))
+
+        match = LootParser.potfile_nt.match(line)
+
+        if match:
+            return (None, LootParser.decode_password(match.group(2)), None, match.group(1).lower())
+
+        return None
+
+    def parse_netexec(self, line: str) -> tuple:
+        '''
+        Parses a NetExec / CrackMapExec success line ([+] domain\\user:secret). Secrets
+        that look like NT hashes are stored as hash.
+
+        Parameters:
+            line            Line to parse
+
+        Returns:
+            tuple           Record tuple or None
+        '''
+        match = LootParser.netexec.search(LootParser.ansi.sub('', line))
+
+        if not match:
+            return None
+
+        domain, username, secret = match.groups()
+        nt_hash = LootParser.nt_hash.match(secret)
+
+        if nt_hash:
+            return (username, None, domain, nt_hash.group(1).lower())
+
+        return (username, secret or None, domain, None)
+
+    def parse_responder(self, line: str) -> tuple:
+        '''
+        Parses a NetNTLMv2 hash from a Responder log (user::domain:challenge:proof:blob).
+
+        Parameters:
+            line            Line to parse
+
+        Returns:
+            tuple           Record tuple or None
+        '''
+        match = LootParser.responder.search(line)
+
+        if match:
+            return (match.group(2), None, match.group(3), match.group(1))
+
+        return None
+
+    def parse_userpass(self, line: str) -> tuple:
+        '''
+        Parses a plain user-pass line (user:pass). The username may be prefixed with
+        a domain separated by a slash or backslash.
+
+        Parameters:
+            line            Line to parse
+
+        Returns:
+            tuple           Record tuple or None
+        '''
+        if not line:
+            return None
+
+        username, _, password = line.partition(self.sep)
+        domain, _, user = username.replace('\\', '/').rpartition('/')
+
+        return (user or None, password or None, domain or None, None)
+
+
+def parse_loot_file(filename: Path, fmt: str = None, sep: str = ':') -> tuple:
+    '''
+    Parses a complete loot file and returns its deduplicated records. If no format is
+    specified, it is detected and the file is treated as user-pass file when detection
+    fails. This function is executed within the worker processes of multi file imports.
+
+    Parameters:
+        filename        File to parse
+        fmt             Loot format of the file
+        sep             Separator for user-pass files
+
+    Returns:
+        tuple           Format, number of lines and list of unique records
+    '''
+    fmt = fmt or LootParser.detect(filename, 'userpass')
+    parser = LootParser(fmt, sep)
+    records = list(dict.fromkeys(parser.parse_file(filename)))
+
+    return (fmt, parser.lines, records)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import bisect
+import curses
+import itertools
+
+
+class Picker:
+    '''
+    The Picker is a terminal replacement for rofi that is used when no graphical session
+    is available (e.g. over SSH). Rows are filtered while typing. For this purpose, all
+    rows are joined into a single lower case search string together with a table of row
+    offsets, so that rare search tokens are located with str.find instead of testing each row.
+    Queries that extend the previous query only filter the previous results. Only the
+    currently visible rows are drawn. Actions are mapped to the rofi exit codes of the
+    corresponding ctfcred key bindings.
+    '''
+    keys = {
+             '\x19': 11,         # Ctrl+Y      Copy Username
+             '\x18': 12,         # Ctrl+X      Delete Credential
+             '\x0f': 13,         # Ctrl+O      Copy OTP Value
+             '\x0c': 14,         # Ctrl+L      Copy URL Value
+             '\x04': 15,         # Ctrl+D      Copy Domain
+             '\x06': 16,         # Ctrl+F      Copy User with Domain
+             '\x0b': 17,         # Ctrl+K      Move Credential one Up
+             curses.KEY_SR: 17,  # Shift+Up    Move Credential one Up
+             '\x0e': 18,         # Ctrl+N      Move Credential one Down
+             curses.KEY_SF: 18,  # Shift+Down  Move Credential one Down
+             '\x17': 19,         # Ctrl+W      Open URL
+             '\x15': 20,         # Ctrl+U      Copy User:Pass
+             '\x14': 21,         # Ctrl+T      Auto-Type Credential
+           }
+
+    cancel = ('\x1b', '\x03', '\x07')
+    submit = ('\n', '\r', curses.KEY_ENTER)
+    backspace = ('\x7f', '\b', curses.KEY_BACKSPACE)
+
+    help = ('Enter:pass ^Y:user ^U:user:pass ^T:type ^O:otp ^L:url ^W:open ^D:domain ^F:user@domain '
+            '^X:delete ^K/^N:move Tab:mark')
+
+    def __init__(self, rows: list[str], prompt: str = 'Select Credential', multi: bool = False) -> None:
+        '''
+        Creates a new Picker and builds the search string for the specified rows.
+
+        Parameters:
+            rows            Rows to display
+            prompt          Prompt to display
+            multi           Allow marking multiple rows
+
+        Returns:
+            None
+        '''
+        self.rows = [row.rstrip('\n') for row in rows]
+        self.prompt = prompt
+        self.multi = multi
+
+        self.texts = [row.lower() for row in self.rows]
+        self.haystack = '\n'.join(self.texts)
+        self.offsets = list(itertools.accumulate((len(text) + 1 for text in self.texts[:-1]), initial=0))
+
+        self.cache = {'': list(range(len(self.rows)))}
+        self.query = ''
+        self.results = self.cache['']
+
+        self.cursor = 0
+        self.top = 0
+        self.marked = []
+
+    def find(self, token: str) -> list[int]:
+        '''
+        Returns the indices of all rows that contain the specified token. If the token is
+        rare, its occurrences are located within the search string and mapped to rows
+        using the offset table. Frequent tokens are checked row by row instead.
+
+        Parameters:
+            token           Lower case search token
+
+        Returns:
+            list            Matching row indices
+        '''
+        if self.haystack.count(token) > len(self.texts) // 8:
+            return [index for index, text in enumerate(self.texts) if token in text]
+
+        matches = []
+        pos = self.haystack.find(token)
+
+        while pos != -1:
+
+            index = bisect.bisect_right(self.offsets, pos) - 1
+            matches.append(index)
+
+            if index + 1 >= len(self.offsets):
+                break
+
+            pos = self.haystack.find(token, self.offsets[index + 1])
+
+        return matches
+
+    def search(self, query: str) -> list[int]:
+        '''
+        Returns the rows that contain all whitespace separated tokens of the query (case
+        insensitive). Results of previous queries are cached. If the query extends the
+        previous one, only the previous results are checked against the changed tokens.
+
+        Parameters:
+            query           Search query
+
+        Returns:
+            list            Matching row indices
+        '''
+        if query in self.cache:
+            return self.cache[query]
+
+        tokens = query.lower().split()
+
+        if query.startswith(self.query) and self.query.strip():
+            candidates = self.results
+            known = set(self.query.lower().split())
+
+        elif tokens:
+            token = max(tokens, key=len)
+            candidates = self.find(token)
+            known = {token}
+
+        else:
+            return self.cache['']
+
+        check = [token for token in tokens if token not in known]
+
+        if check:
+            candidates = [index for index in candidates if all(token in self.texts[index] for token in check)]
+
+        self.cache[query] = candidates
+        return candidates
+
+    def update(self, query: str) -> None:
+        '''
+        Changes the current query and resets the cursor.
+
+        Parameters:
+            query           New search query
+
+        Returns:
+            None
+        '''
+        self.results = self.search(query)
+        self.query = query
+        self.cursor = 0
+        self.top = 0
+
+    def selection(self) -> list[int]:
+        '''
+        Returns the marked rows or, if no row is marked, the row under the cursor.
+
+        Parameters:
+            None
+
+        Returns:
+            list            Selected row indices
+        '''
+        if self.marked:
+            return list(self.marked)
+
+        return [self.results[self.cursor]] if self.results else []
+
+    def draw(self, screen) -> None:
+        '''
+        Draws the visible rows, a status line and the prompt.
+
+        Parameters:
+            screen          curses window
+
+        Returns:
+            None
+        '''
+        height, width = screen.getmaxyx()
+        visible = max(1, height - 2)
+
+        if self.cursor < self.top:
+            self.top = self.cursor
+
+        elif self.cursor >= self.top + visible:
+            self.top = self.cursor - visible + 1
+
+        screen.erase()
+
+        for line, index in enumerate(self.results[self.top:self.top + visible]):
+
+            mark = '*' if index in self.marked else ' '
+            attr = curses.A_REVERSE if self.top + line == self.cursor else curses.A_NORMAL
+
+            screen.addnstr(line, 0, f'{mark}{self.rows[index]}', width - 1, attr)
+
+        status = f'{len(self.results)}/{len(self.rows)}  {Picker.help}'
+
+        screen.addnstr(height - 2, 0, status, width - 1, curses.A_DIM)
+        screen.addnstr(height - 1, 0, f'{self.prompt}: {self.query}', width - 1)
+        screen.refresh()
+
+    def action(self, key) -> tuple[int, list[int]]:
+        '''
+        Returns the result of the picker if the key selects an action or cancels it.
+
+        Parameters:
+            key             Pressed key
+
+        Returns:
+            tuple           rofi exit code and selected row indices or None
+        '''
+        if key in Picker.cancel:
+            return (1, [])
+
+        if key in Picker.submit:
+            return (0, self.selection()) if self.results else None
+
+        if key in Picker.keys:
+            return (Picker.keys[key], self.selection())
+
+        return None
+
+    def navigate(self, key, page: int) -> bool:
+        '''
+        Moves the cursor if the key is a navigation key.
+
+        Parameters:
+            key             Pressed key
+            page            Number of rows per page
+
+        Returns:
+            bool            True if the key was a navigation key
+        '''
+        moves = {curses.KEY_UP: -1, curses.KEY_DOWN: 1, curses.KEY_PPAGE: -page, curses.KEY_NPAGE: page}
+
+        if key not in moves:
+            return False
+
+        self.cursor = max(min(self.cursor + moves[key], len(self.results) - 1), 0)
+        return True
+
+    def edit(self, key) -> None:
+        '''
+        Changes the query or toggles the mark of the row under the cursor.
+
+        Parameters:
+            key             Pressed key
+
+        Returns:
+            None
+        '''
+        if key == '\t' and self.multi and self.results:
+
+            index = self.results[self.cursor]
+
+            if index in self.marked:
+                self.marked.remove(index)
+
+            else:
+                self.marked.append(index)
+
+            self.cursor = min(self.cursor + 1, len(self.results) - 1)
+
+        elif key in Picker.backspace:
+            self.update(self.query[:-1])
+
+        elif isinstance(key, str) and key.isprintable():
+            self.update(self.query + key)
+
+    def loop(self, screen) -> tuple[int, list[int]]:
+        '''
+        Handles key presses until an action is selected or the picker is cancelled.
+
+        Parameters:
+            screen          curses window
+
+        Returns:
+            tuple           rofi exit code and selected row indices
+        '''
+        curses.raw()
+        screen.keypad(True)
+
+        while True:
+
+            self.draw(screen)
+            key = screen.get_wch()
+
+            result = self.action(key)
+
+            if result is not None:
+                return result
+
+            if not self.navigate(key, max(1, screen.getmaxyx()[0] - 2)):
+                self.edit(key)
+
+    def run(self) -> tuple[int, list[int]]:
+        '''
+        Displays the picker within the terminal.
+
+        Parameters:
+            None
+
+        Returns:
+            tuple           rofi exit code and selected row indices
+        '''
+        return curses.wrapper(self.loop)
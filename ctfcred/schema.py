@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+from datetime import datetime
+
+
+def migrate_v0(record: dict) -> dict:
+    '''
+    Credential files of early ctfcred versions did not contain aliases and did not
+    distinguish between custom notes and the default timestamp note. Missing optional
+    attributes are added.
+
+    Parameters:
+        record      Credential record of schema version 0
+
+    Returns:
+        dict        Credential record of schema version 1
+    '''
+    for attribute in ['otp', 'url', 'domain', 'alias', 'note']:
+        record.setdefault(attribute, None)
+
+    record.setdefault('timestamp', 0)
+    record.setdefault('custom_note', record['note'] is not None and not isinstance(record['note'], datetime))
+
+    return record
+
+
+def migrate_v1(record: dict) -> dict:
+    '''
+    Adds the modification time, tags, import batch, hash and uid attributes that were
+    introduced after the first schema version.
+
+    Parameters:
+        record      Credential record of schema version 1
+
+    Returns:
+        dict        Credential record of schema version 2
+    '''
+    record.setdefault('modified', record['timestamp'])
+
+    for attribute in ['tags', 'batch', 'hash', 'uid']:
+        record.setdefault(attribute, None)
+
+    return record
+
+
+def migrate_v2(record: dict) -> dict:
+    '''
+    Adds the auto-type sequence attribute.
+
+    Parameters:
+        record      Credential record of schema version 2
+
+    Returns:
+        dict        Credential record of schema version 3
+    '''
+    record.setdefault('sequence', None)
+    return record
+
+
+class Schema:
+    '''
+    The Schema class describes the layout of credential records and upgrades records of
+    older credential files. Each migration upgrades a record by one version and the list
+    of migrations forms a chain from the first to the current version. Credential files
+    store the version they were written with; files without version are treated as version
+    0. Migrations only add attributes with setdefault, so they can be applied to records
+    of any older version. Records are migrated lazily while they are read. The migrated
+    form is written back the next time the credential file is persisted.
+    '''
+    migrations = [migrate_v0, migrate_v1, migrate_v2]
+    version = len(migrations)
+
+    def migrate(record: dict, version: int) -> dict:
+        '''
+        Upgrades a single record to the current schema version.
+
+        Parameters:
+            record          Credential record
+            version         Schema version of the record
+
+        Returns:
+            dict            Upgraded credential record
+        '''
+        for migration in Schema.migrations[version:]:
+            record = migration(record)
+
+        return record
+
+    def records(records: Iterable[dict], version: int = None) -> Iterator[dict]:
+        '''
+        Lazily upgrades the specified records. Records of the current version are passed
+        through unchanged.
+
+        Parameters:
+            records         Credential records
+            version         Schema version of the records (default: current version)
+
+        Returns:
+            Iterator        Upgraded credential records
+        '''
+        if version is None or version >= Schema.version:
+            return iter(records)
+
+        return (Schema.migrate(record, version) for record in records)
+
+    def file_version(yml: dict) -> int:
+        '''
+        Returns the schema version of the content of a credential file.
+
+        Parameters:
+            yml             Content of a credential file
+
+        Returns:
+            int             Schema version
+        '''
+        return yml.get('schema', 0)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import os
+import sys
+import shlex
+
+from ctfcred.config import Config
+from ctfcred.launcher import Launcher
+from ctfcred.credential import Credential
+from ctfcred.utils import encode_record, decode_record, create_private
+
+
+class RofiScript:
+    '''
+    The RofiScript class implements ctfcred as rofi script mode. Instead of starting a new
+    rofi process after each action, rofi stays open and invokes ctfcred for each selected
+    entry. Actions that continue the session (delete, move) print the updated rows and the
+    new cursor position. To answer these callbacks quickly, the credentials and their
+    formatted rows are cached as json next to the column store. The cache is only valid
+    while the credential file is unchanged and is not used for encrypted credential files.
+    '''
+    mode = 'ctfcred'
+
+    def stamp() -> list:
+        '''
+        Returns the modification time and size of the credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            list            Modification time and size or None
+        '''
+        try:
+            stat = Config.credential_file.stat()
+            return [stat.st_mtime_ns, stat.st_size]
+
+        except FileNotFoundError:
+            return None
+
+    def rows(credentials: list[Credential]) -> list[str]:
+        '''
+        Formats the credentials as rofi script rows. The uid of each credential is attached
+        as info, which rofi passes back within the ROFI_INFO environment variable.
+
+        Parameters:
+            credentials     Credentials sorted by id
+
+        Returns:
+            list            Formatted rows
+        '''
+        return [cred.format().rstrip('\n') + f'\0info\x1f{cred.uid}' for cred in credentials]
+
+    def write_cache(credentials: list[Credential], rows: list[str]) -> None:
+        '''
+        Writes the row cache for the current state of the credential file. The cache
+        contains all records and is only readable by the current user.
+
+        Parameters:
+            credentials     Credentials sorted by id
+            rows            Formatted rows of the credentials
+
+        Returns:
+            None
+        '''
+        if Config.is_encrypted():
+            return
+
+        meta = {
+                 'default_url': Config.default_url,
+                 'default_domain': Config.default_domain,
+                 'default_sequence': Config.default_sequence,
+                 'imports': Config.imports,
+                 'watermarks': Config.watermarks,
+               }
+
+        cache = {'stamp': RofiScript.stamp(), 'meta': meta, 'records': [cred.to_dict() for cred in credentials], 'rows': rows}
+
+        Config.row_cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Config.row_cache.with_name(Config.row_cache.name + '.tmp')
+        create_private(tmp)
+
+        with open(tmp, 'w') as file:
+            file.write(encode_record(cache))
+
+        os.replace(tmp, Config.row_cache)
+
+    def read_cache() -> dict:
+        '''
+        Reads the row cache if it matches the current credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            dict            Content of the cache or None
+        '''
+        if Config.is_encrypted():
+            return None
+
+        try:
+            with open(Config.row_cache, 'r') as file:
+                cache = decode_record(file.read())
+
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if cache.get('stamp') != RofiScript.stamp():
+            return None
+
+        return cache
+
+    def load() -> tuple[list[Credential], list[str]]:
+        '''
+        Loads the credentials and their rows from the cache or, if the cache is outdated,
+        from the credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            tuple           Credentials sorted by id and their rows
+        '''
+        cache = RofiScript.read_cache()
+
+        if cache is not None:
+
+            Credential.reset_count()
+            meta = cache['meta']
+            meta['imports'] = {int(batch): info for batch, info in meta['imports'].items()}
+
+            Config.load_meta(meta)
+            credentials = sorted(Credential.from_records(cache['records']), key=lambda x: x.id)
+
+            return (credentials, cache['rows'])
+
+        credentials = sorted(Credential.from_file(), key=lambda x: x.id)
+        rows = RofiScript.rows(credentials)
+
+        RofiScript.write_cache(credentials, rows)
+        return (credentials, rows)
+
+    def save(credentials: list[Credential]) -> tuple[list[Credential], list[str]]:
+        '''
+        Writes the credentials and updates the row cache.
+
+        Parameters:
+            credentials     Credentials to write
+
+        Returns:
+            tuple           Credentials sorted by id and their rows
+        '''
+        Credential.to_file(credentials)
+
+        credentials = sorted(credentials, key=lambda x: x.id)
+        rows = RofiScript.rows(credentials)
+
+        RofiScript.write_cache(credentials, rows)
+        return (credentials, rows)
+
+    def emit(rows: list[str], selection: int = 0) -> None:
+        '''
+        Prints the rows together with the mode options that keep rofi open and place the
+        cursor on the specified row.
+
+        Parameters:
+            rows            Rows to display
+            selection       Index of the selected row
+
+        Returns:
+            None
+        '''
+        options = [('prompt', 'Select Credential'), ('use-hot-keys', 'true'), ('no-custom', 'true'),
+                   ('new-selection', str(max(0, min(selection, len(rows) - 1))))]
+
+        output = [f'\0{name}\x1f{value}' for name, value in options] + rows
+        sys.stdout.write('\n'.join(output) + '\n')
+
+    def view(credentials: list[Credential], rows: list[str]) -> tuple[list[Credential], list[str]]:
+        '''
+        Applies the configured filter to the credentials. Without filter, the cached rows
+        are used as they are.
+
+        Parameters:
+            credentials     Credentials sorted by id
+            rows            Rows of the credentials
+
+        Returns:
+            tuple           Displayed credentials and their rows
+        '''
+        if Launcher.where is None:
+            return (credentials, rows)
+
+        shown = sorted(Launcher.where.apply(credentials), key=lambda x: x.id)
+        return (shown, RofiScript.rows(shown))
+
+    def run() -> None:
+        '''
+        Answers a rofi script mode callback. The action is determined by the ROFI_RETV
+        environment variable and the selected credential by ROFI_INFO. Copy actions and
+        opening urls print nothing, which closes rofi. Auto-type sequences are performed
+        by a detached process once rofi was closed. Delete and move actions print the
+        updated rows and keep the cursor on the affected credential.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        code = int(os.environ.get('ROFI_RETV', '0'))
+
+        credentials, rows = RofiScript.load()
+        shown, rows = RofiScript.view(credentials, rows)
+
+        cred = next((cred for cred in shown if cred.uid == os.environ.get('ROFI_INFO')), None)
+
+        if code == 0 or cred is None:
+            RofiScript.emit(rows)
+            return
+
+        code = 0 if code == 1 else code
+
+        if code == 21:
+            Launcher.autotype(cred, True)
+            return
+
+        if Launcher.handle_copy(code, [cred]):
+            return
+
+        if code == 19:
+            Launcher.open_url(cred)
+            return
+
+        selection = shown.index(cred)
+        position = credentials.index(cred)
+
+        if code == 12:
+            credentials.remove(cred)
+
+        elif code == 17 or code == 18:
+
+            other = position - 1 if code == 17 else position + 1
+
+            if not 0 <= other < len(credentials):
+                RofiScript.emit(rows, selection)
+                return
+
+            cred.id, credentials[other].id = credentials[other].id, cred.id
+
+        else:
+            RofiScript.emit(rows, selection)
+            return
+
+        credentials, rows = RofiScript.save(credentials)
+        shown, rows = RofiScript.view(credentials, rows)
+
+        if cred in shown:
+            selection = shown.index(cred)
+
+        RofiScript.emit(rows, selection)
+
+    def launch(where: str = None) -> None:
+        '''
+        Starts rofi with ctfcred as script mode. The rofi process replaces the current one.
+
+        Parameters:
+            where           Filter expression that is passed to the script mode
+
+        Returns:
+            None
+        '''
+        script = [sys.argv[0], '--rofi-script'] + (['--where', where] if where else [])
+        command = ['rofi', '-show', RofiScript.mode, '-modi', f'{RofiScript.mode}:{shlex.join(script)}'] + Config.key_mappings
+
+        os.execvp('rofi', command)
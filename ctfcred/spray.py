@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import heapq
+import bisect
+
+from typing import Iterable, Iterator
+from datetime import datetime
+from ctfcred.credential import Credential
+from ctfcred.utils import print_collection
+from ctfcred.config import Config
+
+
+class SprayException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class SprayPlan:
+    '''
+    A SprayPlan distributes the combinations of all stored users and passwords over rounds
+    that respect an account lockout policy. Each round corresponds to one observation window
+    and contains at most threshold - 1 attempts per user, so that one attempt remains for
+    the legitimate user. Passwords are ranked by the number of credentials that use them
+    and tried in this order. Combinations that are already stored are skipped.
+
+    The plan is generated lazily: users without stored passwords share the same position
+    within the password ranking, all other users keep their own offset. Within a round,
+    the attempts of each password rank are ordered by a priority queue, so that each
+    password is sprayed against all users before the next one is tried. The product of
+    users and passwords is never materialized.
+    '''
+
+    def __init__(self, credentials: Iterable[Credential], threshold: int, window: int, domain: bool = False) -> None:
+        '''
+        Creates a new SprayPlan.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+            threshold       Number of failed attempts that locks an account
+            window          Observation window of the lockout policy in seconds
+            domain          Use usernames with domain
+
+        Returns:
+            None
+        '''
+        if threshold < 2:
+            raise SprayException('A lockout threshold of at least 2 is required for spraying.')
+
+        self.attempts = threshold - 1
+        self.window = window
+
+        reuse = dict()
+        users = set()
+        known = dict()
+
+        for cred in credentials:
+
+            if cred.password:
+                reuse[cred.password] = reuse.get(cred.password, 0) + 1
+
+            if cred.username:
+
+                user = cred.user_string(domain)
+                users.add(user)
+
+                if cred.password:
+                    known.setdefault(user, set()).add(cred.password)
+
+        self.passwords = sorted(reuse, key=lambda x: (-reuse[x], x))
+        ranks = {password: rank for rank, password in enumerate(self.passwords)}
+
+        self.plain = sorted(users - known.keys())
+        self.known = {user: sorted(ranks[password] for password in known[user]) for user in sorted(known)}
+
+    def round(self, number: int, offsets: dict[str, int]) -> list[tuple[int, int, list[str]]]:
+        '''
+        Returns the attempts of one round as heap of password ranks and users. Users with
+        stored passwords skip the ranks of these passwords and the resulting offsets are
+        updated for the next round.
+
+        Parameters:
+            number          Number of the round (starting at 0)
+            offsets         Offsets of users with stored passwords
+
+        Returns:
+            list            Heap of rank, kind and user list tuples
+        '''
+        base = number * self.attempts
+        count = len(self.passwords)
+
+        heap = [(rank, 0, self.plain) for rank in range(base, min(base + self.attempts, count)) if self.plain]
+        groups = dict()
+
+        for user, ranks in self.known.items():
+
+            pos = base + offsets[user]
+            ix = bisect.bisect_left(ranks, pos)
+            picked = 0
+
+            while picked < self.attempts and pos < count:
+
+                if ix < len(ranks) and ranks[ix] == pos:
+                    ix += 1
+
+                else:
+                    groups.setdefault(pos, []).append(user)
+                    picked += 1
+
+                pos += 1
+
+            offsets[user] = pos - base - self.attempts
+
+        heap += [(rank, 1, users) for rank, users in groups.items()]
+        heapq.heapify(heap)
+
+        return heap
+
+    def rounds(self) -> Iterator[tuple[int, str, str]]:
+        '''
+        Yields the attempts of the plan round by round. Attempts within a round are ordered
+        by password rank.
+
+        Parameters:
+            None
+
+        Returns:
+            Iterator        Tuples of round number (starting at 0), user and password
+        '''
+        offsets = dict.fromkeys(self.known, 0)
+        number = 0
+
+        while True:
+
+            heap = self.round(number, offsets)
+
+            if not heap:
+                return
+
+            while heap:
+
+                rank, kind, users = heapq.heappop(heap)
+                password = self.passwords[rank]
+
+                for user in users:
+                    yield (number, user, password)
+
+            number += 1
+
+    def lines(self, sep: str, start: float) -> Iterator[str]:
+        '''
+        Yields the attempts of the plan as lines. Each line contains the round number, the
+        earliest time at which the round may start and the user-pass combination, separated
+        by tabs.
+
+        Parameters:
+            sep             Separator to use between username and password
+            start           Unix timestamp of the first round
+
+        Returns:
+            Iterator        Formatted attempts
+        '''
+        current, prefix = None, None
+
+        for number, user, password in self.rounds():
+
+            if number != current:
+                current = number
+                begin = datetime.fromtimestamp(start + number * self.window).isoformat(timespec='seconds')
+                prefix = f'{number + 1}\t{begin}\t'
+
+            yield f'{prefix}{user}{sep}{password}'
+
+    def export(self, sep: str, start: float) -> None:
+        '''
+        Exports the plan to stdout.
+
+        Parameters:
+            sep             Separator to use between username and password
+            start           Unix timestamp of the first round
+
+        Returns:
+            None
+        '''
+        print_collection(self.lines(sep, start), Config.delimiter)
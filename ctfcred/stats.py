@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import json
+import heapq
+import hashlib
+
+from typing import Iterable
+from ctfcred.config import Config
+from ctfcred.credential import Credential
+
+
+class SpaceSaving:
+    '''
+    Space-Saving summary that tracks the most frequent items of a stream with a fixed number
+    of counters. When all counters are in use, the counter with the lowest count is taken
+    over by the new item, which inherits the count as its maximum overestimation. Each item
+    that occurs more often than len(stream) / capacity is guaranteed to be tracked. The
+    counter with the lowest count is found via a heap with lazy invalidation.
+    '''
+
+    def __init__(self, capacity: int) -> None:
+        '''
+        Creates a new SpaceSaving summary.
+
+        Parameters:
+            capacity        Maximum number of tracked items
+
+        Returns:
+            None
+        '''
+        self.capacity = max(1, capacity)
+        self.counters = dict()
+        self.heap = []
+
+    def add(self, item: str) -> None:
+        '''
+        Counts one occurrence of the specified item.
+
+        Parameters:
+            item            Item to count
+
+        Returns:
+            None
+        '''
+        counter = self.counters.get(item)
+
+        if counter is not None:
+            counter[0] += 1
+
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[item] = [1, 0]
+
+        else:
+            count, victim = self.pop_min()
+            del self.counters[victim]
+
+            counter = self.counters[item] = [count + 1, count]
+
+        heapq.heappush(self.heap, (counter[0], item))
+
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, item) for item, (count, error) in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def pop_min(self) -> tuple[int, str]:
+        '''
+        Removes and returns the heap entry of the item with the lowest count. Outdated heap
+        entries are skipped.
+
+        Parameters:
+            None
+
+        Returns:
+            tuple           Count and item
+        '''
+        while True:
+
+            count, item = heapq.heappop(self.heap)
+            counter = self.counters.get(item)
+
+            if counter is not None and counter[0] == count:
+                return (count, item)
+
+    def top(self, n: int) -> list[tuple[str, int, int]]:
+        '''
+        Returns the n items with the highest counts.
+
+        Parameters:
+            n               Number of items to return
+
+        Returns:
+            list            Tuples of item, count and maximum overestimation
+        '''
+        top = heapq.nlargest(n, self.counters.items(), key=lambda x: (x[1][0], -x[1][1]))
+        return [(item, count, error) for item, (count, error) in top]
+
+
+class Statistics:
+    '''
+    Statistics are computed in a single pass over the credentials. Distinct usernames and
+    passwords are tracked as fixed size digests, so memory does not grow with the length
+    of the values. The byte lengths of the distinct values are summed up when they are
+    first seen, which allows to compute the exact size of a --mix export without creating
+    the product. The most reused passwords are tracked with a Space-Saving summary, which
+    only sees repeated occurrences, so that passwords used once do not occupy its counters.
+    '''
+    digest_size = 8
+
+    def __init__(self, sep: str = ':', top: int = 10) -> None:
+        '''
+        Creates a new Statistics object.
+
+        Parameters:
+            sep             Separator that is used for user-pass exports
+            top             Number of most reused passwords to report
+
+        Returns:
+            None
+        '''
+        self.sep = sep
+        self.top_n = top
+
+        counters = ['credentials', 'username', 'password', 'otp', 'url', 'domain', 'hash', 'imported', 'manual']
+        self.counts = dict.fromkeys(counters, 0)
+        self.domains = dict()
+
+        self.users = set()
+        self.domain_users = set()
+        self.passwords = set()
+        self.reused = set()
+
+        self.sizes = {'users': 0, 'domain_users': 0, 'passwords': 0}
+        self.summary = SpaceSaving(max(64, 10 * top))
+
+    def digest(value: str) -> bytes:
+        '''
+        Returns a fixed size digest of the specified value.
+
+        Parameters:
+            value           Value to digest
+
+        Returns:
+            bytes           Digest of the value
+        '''
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=Statistics.digest_size).digest()
+
+    def add(self, cred: Credential) -> None:
+        '''
+        Adds a credential to the statistics.
+
+        Parameters:
+            cred            Credential to add
+
+        Returns:
+            None
+        '''
+        self.counts['credentials'] += 1
+
+        for field in ['otp', 'url', 'domain', 'hash']:
+            if getattr(cred, field):
+                self.counts[field] += 1
+
+        if cred.batch is not None or cred.note == 'Import':
+            self.counts['imported'] += 1
+
+        else:
+            self.counts['manual'] += 1
+
+        if cred.username:
+
+            self.counts['username'] += 1
+
+            user = cred.user_string(False)
+            digest = Statistics.digest(user)
+
+            if digest not in self.users:
+                self.users.add(digest)
+                self.sizes['users'] += len(user.encode('utf-8'))
+
+            user = cred.user_string(True)
+            digest = Statistics.digest(user)
+
+            if digest not in self.domain_users:
+
+                self.domain_users.add(digest)
+                self.sizes['domain_users'] += len(user.encode('utf-8'))
+
+                domain = cred.domain or Config.default_domain or ''
+                self.domains[domain] = self.domains.get(domain, 0) + 1
+
+        if cred.password:
+
+            self.counts['password'] += 1
+            digest = Statistics.digest(cred.password)
+
+            if digest in self.passwords:
+                self.reused.add(digest)
+                self.summary.add(cred.password)
+
+            else:
+                self.passwords.add(digest)
+                self.sizes['passwords'] += len(cred.password.encode('utf-8'))
+
+    def collect(credentials: Iterable[Credential], sep: str = ':', top: int = 10) -> Statistics:
+        '''
+        Computes the statistics of the specified credentials.
+
+        Parameters:
+            credentials     Iterable of Credential objects
+            sep             Separator that is used for user-pass exports
+            top             Number of most reused passwords to report
+
+        Returns:
+            Statistics      Computed statistics
+        '''
+        stats = Statistics(sep, top)
+
+        for cred in credentials:
+            stats.add(cred)
+
+        return stats
+
+    def mix_size(self, domain: bool) -> dict:
+        '''
+        Returns the number of lines and bytes of a --mix export. Each line consists of
+        one distinct username, the separator, one distinct password and the delimiter.
+
+        Parameters:
+            domain          Whether usernames are exported with domain
+
+        Returns:
+            dict            Number of lines and bytes
+        '''
+        users = len(self.domain_users if domain else self.users)
+        user_bytes = self.sizes['domain_users' if domain else 'users']
+
+        passwords = len(self.passwords)
+        overhead = len(self.sep.encode('utf-8')) + len(Config.delimiter.encode('utf-8'))
+
+        lines = users * passwords
+        size = passwords * user_bytes + users * self.sizes['passwords'] + lines * overhead
+
+        return {'lines': lines, 'bytes': size}
+
+    def to_dict(self) -> dict:
+        '''
+        Returns the statistics as dictionary.
+
+        Parameters:
+            None
+
+        Returns:
+            dict            Statistics
+        '''
+        top = [{'password': password, 'count': count + 1, 'error': error}
+               for password, count, error in self.summary.top(self.top_n)]
+
+        return {
+                 'credentials': self.counts['credentials'],
+                 'with': {field: self.counts[field] for field in ['username', 'password', 'otp', 'url', 'domain', 'hash']},
+                 'imported': self.counts['imported'],
+                 'manual': self.counts['manual'],
+                 'distinct_users': len(self.users),
+                 'distinct_passwords': len(self.passwords),
+                 'reused_passwords': len(self.reused),
+                 'password_reuses': self.counts['password'] - len(self.passwords),
+                 'users_per_domain': dict(sorted(self.domains.items())),
+                 'top_passwords': top,
+                 'mix': {'users_pass': self.mix_size(False), 'users_pass_domain': self.mix_size(True)},
+               }
+
+    def report(self, as_json: bool = False) -> None:
+        '''
+        Prints the statistics either as human readable summary or as json.
+
+        Parameters:
+            as_json         Print the statistics as json
+
+        Returns:
+            None
+        '''
+        stats = self.to_dict()
+
+        if as_json:
+            print(json.dumps(stats, indent=2))
+            return
+
+        print(f"[+] Credentials:        {stats['credentials']} ({stats['imported']} imported, {stats['manual']} manual)")
+        print('[+] With field:         ' + ', '.join(f'{field} {count}' for field, count in stats['with'].items()))
+        print(f"[+] Distinct users:     {stats['distinct_users']}")
+        reuse = f"{stats['reused_passwords']} reused, {stats['password_reuses']} reuses"
+        print(f"[+] Distinct passwords: {stats['distinct_passwords']} ({reuse})")
+
+        mix = stats['mix']
+        print(f"[+] --mix size:         {mix['users_pass']['lines']} lines, {mix['users_pass']['bytes']} bytes")
+        print(f"[+] --mix size domain:  {mix['users_pass_domain']['lines']} lines, {mix['users_pass_domain']['bytes']} bytes")
+
+        if stats['users_per_domain']:
+
+            print('[+] Users per domain:')
+
+            for domain, count in stats['users_per_domain'].items():
+                print(f'      {str(count).rjust(8)}  {domain or "(none)"}')
+
+        if stats['top_passwords']:
+
+            print('[+] Most reused passwords:')
+
+            for entry in stats['top_passwords']:
+                error = f" (overcounted by at most {entry['error']})" if entry['error'] else ''
+                print(f"      {str(entry['count']).rjust(8)}  {entry['password']}{error}")
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import re
+import json
+import base64
+import urllib.parse
+
+from ctfcred.hashing import nt_hash
+
+
+class TemplateException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class Template:
+    '''
+    Template objects represent a custom export format like '{domain|upper}\\{user}:{pass}'.
+    Placeholders refer to one of the fields user, domain or pass and can be followed by a
+    chain of transforms (e.g. {pass|nt|upper}). Other characters, including braces that do
+    not belong to a placeholder, are copied literally. The template is compiled once into a
+    format string, so formatting a record only requires a single str.format call.
+    '''
+    fields = ['user', 'domain', 'pass']
+    placeholder = re.compile(r'\{(user|domain|pass)((?:\|[a-z0-9]+)*)\}')
+
+    transforms = {
+                   'b64': lambda v: v and base64.b64encode(v.encode('utf-8')).decode('utf-8'),
+                   'json': lambda v: json.dumps(v),
+                   'lower': lambda v: v and v.lower(),
+                   'nt': lambda v: v and nt_hash(v),
+                   'upper': lambda v: v and v.upper(),
+                   'urlencode': lambda v: v and urllib.parse.quote(v, safe=''),
+                 }
+
+    def __init__(self, template: str) -> None:
+        '''
+        Compiles the specified template.
+
+        Parameters:
+            template        Template string
+
+        Returns:
+            None
+        '''
+        self.template = template
+        self.slots = []
+
+        parts = []
+        offset = 0
+
+        for match in Template.placeholder.finditer(template):
+
+            field, chain = match.groups()
+            funcs = []
+
+            for name in filter(None, chain.split('|')):
+
+                if name not in Template.transforms:
+                    available = ', '.join(Template.transforms)
+                    raise TemplateException(f"Unknown transform '{name}'. Available transforms: {available}.")
+
+                funcs.append(Template.transforms[name])
+
+            parts.append(Template.escape(template[offset:match.start()]))
+            parts.append(f'{{{len(self.slots)}}}')
+
+            self.slots.append((Template.fields.index(field), funcs))
+            offset = match.end()
+
+        if not self.slots:
+            available = ', '.join(Template.fields)
+            raise TemplateException(f"Template '{template}' contains no placeholder. Available fields: {available}.")
+
+        parts.append(Template.escape(template[offset:]))
+        self.compiled = ''.join(parts)
+
+    def escape(text: str) -> str:
+        '''
+        Escapes literal braces for the use within a format string.
+
+        Parameters:
+            text            Literal text
+
+        Returns:
+            str             Escaped text
+        '''
+        return text.replace('{', '{{').replace('}', '}}')
+
+    def apply(value: str, funcs: list) -> str:
+        '''
+        Applies a chain of transforms to a value. Missing values are rendered as empty
+        string, unless they are transformed to json.
+
+        Parameters:
+            value           Value to transform
+            funcs           Transform functions to apply
+
+        Returns:
+            str             Transformed value
+        '''
+        for func in funcs:
+            value = func(value)
+
+        return '' if value is None else value
+
+    def format(self, user: str, domain: str, password: str) -> str:
+        '''
+        Formats a single record using the compiled template.
+
+        Parameters:
+            user            Username of the record
+            domain          Domain of the record
+            password        Password of the record
+
+        Returns:
+            str             Formatted record
+        '''
+        record = (user, domain, password)
+        return self.compiled.format(*(Template.apply(record[ix], funcs) for ix, funcs in self.slots))
@@ -2,18 +2,496 @@
 
 from __future__ import annotations
 
-from typing import Union
+import os
+import glob
+import json
+import math
+import sys
+import time
+import random
+import hashlib
+import itertools
+import concurrent.futures
 
+from pathlib import Path
+from datetime import datetime
+from typing import Iterable, Iterator, BinaryIO
 
-def print_collection(col: Union[list, set]):
+
+durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+class OutputWriter:
     '''
-    Prints each item of the specified collection.
+    Buffered writer for exported items. Instead of issuing one write call per
+    item, encoded items are collected and flushed in large chunks to the underlying
+    binary stream. A closed downstream pipe (e.g. ctfcred --passwords | head) is
+    handled silently. If output is set, items are written to this stream instead of
+    stdout.
+    '''
+    chunk_size = 64 * 1024
+    output = None
+
+    def __init__(self, stream: BinaryIO = None, delimiter: str = '\n') -> None:
+        '''
+        Creates a new OutputWriter object.
+
+        Parameters:
+            stream          Binary stream to write to (default: output or sys.stdout.buffer)
+            delimiter       Delimiter that is appended to each item
+
+        Returns:
+            None
+        '''
+        self.stream = stream or OutputWriter.output or sys.stdout.buffer
+        self.delimiter = delimiter.encode('utf-8')
+
+        self.size = 0
+        self.buffer = []
+
+    def __enter__(self) -> OutputWriter:
+        '''
+        Context manager entry. Returns the writer itself.
+        '''
+        return self
+
+    def __exit__(self, *args) -> None:
+        '''
+        Context manager exit. Flushes all pending output.
+        '''
+        self.flush()
+
+    def write(self, item: str) -> None:
+        '''
+        Appends an item to the output buffer. The buffer is flushed as soon as
+        it exceeds the configured chunk size.
+
+        Parameters:
+            item            Item to write
+
+        Returns:
+            None
+        '''
+        data = item.encode('utf-8') + self.delimiter
+
+        self.buffer.append(data)
+        self.size += len(data)
+
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def write_all(self, items: Iterable[str]) -> None:
+        '''
+        Writes each item of the specified iterable.
+
+        Parameters:
+            items           Iterable of items to write
+
+        Returns:
+            None
+        '''
+        for item in items:
+            self.write(item)
+
+    def flush(self) -> None:
+        '''
+        Writes all buffered items to the underlying stream.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        data = b''.join(self.buffer)
+
+        self.size = 0
+        self.buffer = []
+
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+
+        except BrokenPipeError:
+            OutputWriter.handle_broken_pipe()
+
+    def handle_broken_pipe() -> None:
+        '''
+        Handles a closed downstream pipe. stdout is redirected to /dev/null to prevent
+        another BrokenPipeError when the interpreter flushes it during shutdown. Afterwards,
+        the process exits with the status code a SIGPIPE terminated process would have.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+
+        sys.exit(141)
+
+
+class ShardWriter:
+    '''
+    Writes exported items into a fixed number of shard files. Each item belongs to a user
+    and all items of a user are written to the same shard. Users are assigned either by
+    a hash of the username, which is stable across runs and credential files, or round
+    robin in the order they appear. Items are buffered per shard and buffers are written
+    by a thread pool, with at most one pending write per shard to preserve the order.
+    '''
+    modes = ['hash', 'round-robin']
+
+    def __init__(self, directory: Path, count: int, mode: str = 'hash', delimiter: str = '\n') -> None:
+        '''
+        Creates a new ShardWriter and opens the shard files.
+
+        Parameters:
+            directory       Directory to create the shard files in
+            count           Number of shards
+            mode            Assignment of users to shards (hash or round-robin)
+            delimiter       Delimiter that is appended to each item
+
+        Returns:
+            None
+        '''
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        width = len(str(count - 1))
+
+        self.count = count
+        self.mode = mode
+        self.delimiter = delimiter.encode('utf-8')
+
+        self.paths = [directory.joinpath(f'shard-{str(ix).zfill(width)}.txt') for ix in range(count)]
+        self.files = [open(path, 'wb') for path in self.paths]
+
+        self.buffers = [[] for ix in range(count)]
+        self.sizes = [0] * count
+        self.lines = [0] * count
+        self.pending = [None] * count
+
+        self.assigned = dict()
+        self.last = (None, 0)
+
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(count, os.cpu_count() or 1))
+
+    def __enter__(self) -> ShardWriter:
+        '''
+        Context manager entry. Returns the writer itself.
+        '''
+        return self
+
+    def __exit__(self, *args) -> None:
+        '''
+        Context manager exit. Writes all pending output and closes the shard files.
+        '''
+        self.close()
+
+    def shard(self, user: str) -> int:
+        '''
+        Returns the shard of the specified user.
+
+        Parameters:
+            user            Username the item belongs to
+
+        Returns:
+            int             Index of the shard
+        '''
+        if self.last[0] == user:
+            return self.last[1]
+
+        if self.mode == 'hash':
+            digest = hashlib.blake2b(user.encode('utf-8'), digest_size=8).digest()
+            shard = int.from_bytes(digest, 'big') % self.count
+
+        else:
+            shard = self.assigned.setdefault(user, len(self.assigned) % self.count)
+
+        self.last = (user, shard)
+        return shard
+
+    def write(self, user: str, item: str) -> None:
+        '''
+        Appends an item to the buffer of the shard of the specified user.
+
+        Parameters:
+            user            Username the item belongs to
+            item            Item to write
+
+        Returns:
+            None
+        '''
+        shard = self.shard(user)
+        data = item.encode('utf-8') + self.delimiter
+
+        self.buffers[shard].append(data)
+        self.sizes[shard] += len(data)
+        self.lines[shard] += 1
+
+        if self.sizes[shard] >= OutputWriter.chunk_size:
+            self.flush(shard)
+
+    def write_all(self, items: Iterable[tuple[str, str]]) -> None:
+        '''
+        Writes each user, item tuple of the specified iterable. Consecutive items of the
+        same user are appended to the shard buffer in groups.
+
+        Parameters:
+            items           Iterable of username and item tuples
+
+        Returns:
+            None
+        '''
+        delimiter = self.delimiter
+
+        for user, group in itertools.groupby(items, key=lambda x: x[0]):
+
+            shard = self.shard(user)
+
+            while data := [item.encode('utf-8') + delimiter for user, item in itertools.islice(group, 4096)]:
+
+                self.buffers[shard].extend(data)
+                self.sizes[shard] += sum(map(len, data))
+                self.lines[shard] += len(data)
+
+                if self.sizes[shard] >= OutputWriter.chunk_size:
+                    self.flush(shard)
+
+    def flush(self, shard: int) -> None:
+        '''
+        Hands the buffer of a shard to the thread pool. If the previous write of the shard
+        is still pending, it is awaited first.
+
+        Parameters:
+            shard           Index of the shard
+
+        Returns:
+            None
+        '''
+        data = b''.join(self.buffers[shard])
+
+        self.buffers[shard] = []
+        self.sizes[shard] = 0
+
+        if self.pending[shard] is not None:
+            self.pending[shard].result()
+
+        self.pending[shard] = self.pool.submit(self.files[shard].write, data)
+
+    def close(self) -> None:
+        '''
+        Writes all buffered items and closes the shard files.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        for shard in range(self.count):
+            self.flush(shard)
+
+        self.pool.shutdown(wait=True)
+
+        for shard in range(self.count):
+            self.pending[shard].result()
+            self.files[shard].close()
+
+    def report(self) -> None:
+        '''
+        Prints the number of lines within each shard to stderr.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        for path, lines in zip(self.paths, self.lines):
+            print(f'[+] {str(lines).rjust(10)} lines  {path}', file=sys.stderr)
+
+
+def sample(items: Iterable, fraction: float, seed: int = 0) -> Iterator:
+    '''
+    Yields a random sample of the specified items, where each item is selected with the
+    specified probability. Instead of drawing a random number per item, the number of
+    items to skip until the next selected one is drawn from the geometric distribution
+    and skipped items are consumed with itertools.islice. The sample is deterministic
+    for the same seed and items.
 
     Parameters:
-        col         Collection type to print
+        items       Iterable to sample from
+        fraction    Probability of each item to be selected (0 < fraction <= 1)
+        seed        Seed of the random number generator
+
+    Returns:
+        Iterator    Selected items
+    '''
+    items = iter(items)
+
+    if fraction >= 1:
+        yield from items
+        return
+
+    rng = random.Random(seed)
+    log = math.log(1 - fraction)
+
+    while True:
+
+        skip = int(math.log(1 - rng.random()) / log)
+
+        for item in itertools.islice(items, skip, skip + 1):
+            yield item
+            break
+
+        else:
+            return
+
+
+def parse_fraction(value: str) -> float:
+    '''
+    Parses a sample fraction from the command line. The fraction can be specified as
+    number between 0 and 1 or as percentage (e.g. 5%).
+
+    Parameters:
+        value       Fraction to parse
+
+    Returns:
+        float       Parsed fraction
+    '''
+    fraction = float(value[:-1]) / 100 if value.endswith('%') else float(value)
+
+    if not 0 < fraction <= 1:
+        raise ValueError(f'Sample fraction must be within (0, 1]: {value}')
+
+    return fraction
+
+
+def print_collection(col: Iterable[str], delimiter: str = '\n') -> None:
+    '''
+    Prints each item of the specified collection. The collection can be an arbitrary
+    iterable, including generators. Output is written in chunks to stdout.
+
+    Parameters:
+        col         Iterable to print
+        delimiter   Delimiter to print after each item
+
+    Returns:
+        None
+    '''
+    with OutputWriter(delimiter=delimiter) as writer:
+        writer.write_all(col)
+
+
+def parse_time(value: str) -> float:
+    '''
+    Parses a point in time from the command line. Supported are unix timestamps,
+    ISO 8601 dates (2021-06-01 or 2021-06-01T12:00) and relative durations like
+    30m, 2h, 1d or 1w that are interpreted relative to the current time.
+
+    Parameters:
+        value       Time specification to parse
+
+    Returns:
+        float       Corresponding unix timestamp
+    '''
+    try:
+        return float(value)
+
+    except ValueError:
+        pass
+
+    if value and value[-1] in durations and value[:-1].isdigit():
+        return time.time() - parse_duration(value)
+
+    return datetime.fromisoformat(value).timestamp()
+
+
+def parse_duration(value: str) -> int:
+    '''
+    Parses a duration from the command line. Supported are plain seconds and durations
+    like 30m, 2h, 1d or 1w.
+
+    Parameters:
+        value       Duration to parse
+
+    Returns:
+        int         Duration in seconds
+    '''
+    if value.isdigit():
+        return int(value)
+
+    if value and value[-1] in durations and value[:-1].isdigit():
+        return int(value[:-1]) * durations[value[-1]]
+
+    raise ValueError(f'Invalid duration: {value}')
+
+
+def expand_paths(pattern: str) -> list[Path]:
+    '''
+    Expands a directory or glob pattern into a sorted list of files. For directories,
+    all regular files directly within the directory are returned.
+
+    Parameters:
+        pattern     Directory or glob pattern
+
+    Returns:
+        list        Sorted list of matching files
+    '''
+    path = Path(pattern).expanduser()
+
+    if path.is_dir():
+        return sorted(child for child in path.iterdir() if child.is_file())
+
+    return sorted(Path(match) for match in glob.glob(str(path)) if Path(match).is_file())
+
+
+def create_private(path: Path) -> None:
+    '''
+    Creates or truncates the specified file, which is only readable and writable by the
+    current user. Files that are opened for writing afterwards keep these permissions.
+
+    Parameters:
+        path        Path of the file
 
     Returns:
         None
     '''
-    for item in col:
-        print(item)
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+    os.chmod(path, 0o600)
+
+
+def encode_record(record: dict) -> str:
+    '''
+    Serializes a credential record into its canonical json representation. Notes that
+    are timestamps are tagged, so that they can be restored with the correct type.
+
+    Parameters:
+        record      Credential record
+
+    Returns:
+        str         Canonical json representation
+    '''
+    def tag(value):
+        return {'$datetime': value.isoformat()}
+
+    return json.dumps(record, sort_keys=True, separators=(',', ':'), default=tag)
+
+
+def decode_record(data: str) -> dict:
+    '''
+    Deserializes a credential record that was serialized with encode_record.
+
+    Parameters:
+        data        Json representation
+
+    Returns:
+        dict        Credential record
+    '''
+    def untag(value):
+        return datetime.fromisoformat(value['$datetime']) if '$datetime' in value else value
+
+    return json.loads(data, object_hook=untag)
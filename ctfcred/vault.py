@@ -0,0 +1,604 @@
+from __future__ import annotations
+
+import os
+import sys
+import hmac
+import json
+import time
+import base64
+import socket
+import struct
+import shutil
+import getpass
+import hashlib
+import subprocess
+
+from pathlib import Path
+from ctfcred.config import Config, DependencyException
+from ctfcred.utils import encode_record, decode_record
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+except ImportError:
+    AESGCM = None
+
+
+class VaultException(Exception):
+    '''
+    Custom Exception class.
+    '''
+
+
+class Agent:
+    '''
+    The Agent keeps the derived key of an encrypted credential file in memory, so that
+    the expensive key derivation only runs once per unlock. It is a small background
+    process listening on a unix socket that is only accessible by the current user.
+    After the configured time to live, the agent exits and the key is gone.
+    '''
+
+    def request(command: bytes) -> bytes:
+        '''
+        Sends a command to the running agent.
+
+        Parameters:
+            command         Command to send (get or lock)
+
+        Returns:
+            bytes           Response of the agent or None if no agent is running
+        '''
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+
+                sock.settimeout(1)
+                sock.connect(str(Config.agent_socket))
+                sock.sendall(command + b'\n')
+
+                response = b''
+
+                while chunk := sock.recv(4096):
+                    response += chunk
+
+                return response
+
+        except OSError:
+            return None
+
+    def get() -> bytes:
+        '''
+        Obtains the key from the running agent.
+
+        Parameters:
+            None
+
+        Returns:
+            bytes           Key held by the agent or None
+        '''
+        return Agent.request(b'get') or None
+
+    def lock() -> bool:
+        '''
+        Stops the running agent.
+
+        Parameters:
+            None
+
+        Returns:
+            bool            True if an agent was running
+        '''
+        return Agent.request(b'lock') is not None
+
+    def listen() -> socket.socket:
+        '''
+        Creates the listening socket of the agent. The socket file is created with
+        permissions that only allow access by the current user.
+
+        Parameters:
+            None
+
+        Returns:
+            socket          Listening unix socket
+        '''
+        Config.agent_socket.parent.mkdir(parents=True, exist_ok=True)
+        Config.agent_socket.unlink(missing_ok=True)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+
+        try:
+            server.bind(str(Config.agent_socket))
+
+        finally:
+            os.umask(umask)
+
+        server.listen()
+        return server
+
+    def serve(server: socket.socket, key: bytes, ttl: int) -> None:
+        '''
+        Answers requests of the current user until the time to live expires or the
+        agent is locked. Connections of other users are closed without response. The
+        socket file is only removed if it was not replaced by a newer agent.
+
+        Parameters:
+            server          Listening unix socket
+            key             Key to hand out
+            ttl             Time to live in seconds
+
+        Returns:
+            None
+        '''
+        deadline = time.monotonic() + ttl
+        inode = os.stat(Config.agent_socket).st_ino
+
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+
+                server.settimeout(remaining)
+
+                try:
+                    conn, _ = server.accept()
+
+                except socket.timeout:
+                    break
+
+                with conn:
+
+                    peer = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+                    _, uid, _ = struct.unpack('3i', peer)
+
+                    if uid != os.getuid():
+                        continue
+
+                    conn.settimeout(1)
+                    command = conn.recv(64).strip()
+
+                    if command == b'get':
+                        conn.sendall(key)
+
+                    elif command == b'lock':
+                        break
+
+        finally:
+            server.close()
+
+            try:
+                if os.stat(Config.agent_socket).st_ino == inode:
+                    Config.agent_socket.unlink()
+
+            except FileNotFoundError:
+                pass
+
+    def start(key: bytes, ttl: int) -> None:
+        '''
+        Starts a new agent for the specified key in the background. A running agent
+        is replaced.
+
+        Parameters:
+            key             Key to hold
+            ttl             Time to live in seconds
+
+        Returns:
+            None
+        '''
+        Agent.lock()
+        server = Agent.listen()
+
+        pid = os.fork()
+
+        if pid:
+            server.close()
+            os.waitpid(pid, 0)
+            return
+
+        os.setsid()
+
+        if os.fork():
+            os._exit(0)
+
+        devnull = os.open(os.devnull, os.O_RDWR)
+
+        for fd in range(3):
+            os.dup2(devnull, fd)
+
+        try:
+            Agent.serve(server, key, ttl)
+
+        finally:
+            os._exit(0)
+
+
+class Vault:
+    '''
+    The Vault implements the encrypted storage format of the credential file. The key is
+    derived from a password using scrypt. Credential records are grouped into chunks and
+    each chunk is encrypted with AES-GCM. Chunk boundaries are determined by the uids of
+    the records, so that an edit only changes the chunk that contains the edited record.
+    Unchanged chunks are written back without being encrypted again. A separately
+    encrypted meta chunk contains the configuration and the ordered list of chunks, which
+    protects the credential file against reordered, removed or replayed chunks.
+    '''
+    boundary = 0x3f
+    chunk_size = 256
+    scrypt = {'n': 2 ** 15, 'r': 8, 'p': 1}
+
+    keys = {}
+    headers = {}
+    chunks = {}
+
+    def cipher(key: bytes) -> AESGCM:
+        '''
+        Returns an AES-GCM cipher for the encryption part of the specified key.
+
+        Parameters:
+            key             Key as returned by Vault.derive
+
+        Returns:
+            AESGCM          Cipher object
+        '''
+        if AESGCM is None:
+            raise DependencyException("Encrypted credential files require the 'cryptography' package.")
+
+        return AESGCM(key[:32])
+
+    def mac(key: bytes, data: bytes) -> bytes:
+        '''
+        Computes the keyed digest of the specified data using the mac part of the key.
+
+        Parameters:
+            key             Key as returned by Vault.derive
+            data            Data to authenticate
+
+        Returns:
+            bytes           HMAC-SHA256 digest
+        '''
+        return hmac.new(key[32:], data, hashlib.sha256).digest()
+
+    def seal(key: bytes, data: bytes, aad: bytes) -> str:
+        '''
+        Encrypts data with a fresh nonce.
+
+        Parameters:
+            key             Key as returned by Vault.derive
+            data            Plaintext
+            aad             Associated data that is authenticated, but not encrypted
+
+        Returns:
+            str             Base64 encoded nonce and ciphertext
+        '''
+        nonce = os.urandom(12)
+        return base64.b64encode(nonce + Vault.cipher(key).encrypt(nonce, data, aad)).decode('ascii')
+
+    def open(key: bytes, data: str | bytes, aad: bytes) -> bytes:
+        '''
+        Decrypts data that was encrypted with Vault.seal.
+
+        Parameters:
+            key             Key as returned by Vault.derive
+            data            Base64 encoded nonce and ciphertext
+            aad             Associated data that was used for encryption
+
+        Returns:
+            bytes           Plaintext
+        '''
+        raw = base64.b64decode(data)
+
+        try:
+            return Vault.cipher(key).decrypt(raw[:12], raw[12:], aad)
+
+        except InvalidTag:
+            raise VaultException('Unable to decrypt the credential file. The data was modified or the key is wrong.')
+
+    def derive(password: str, header: dict) -> bytes:
+        '''
+        Derives the key for the specified password. The first half of the key is used
+        for encryption, the second half for keyed digests.
+
+        Parameters:
+            password        Password of the credential file
+            header          Header of the credential file
+
+        Returns:
+            bytes           Derived key
+        '''
+        salt = base64.b64decode(header['salt'])
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=header['n'], r=header['r'], p=header['p'],
+                              maxmem=128 * header['r'] * (header['n'] + header['p'] + 2), dklen=64)
+
+    def create(password: str) -> tuple[dict, bytes]:
+        '''
+        Creates the header and key for a new encrypted credential file.
+
+        Parameters:
+            password        Password of the credential file
+
+        Returns:
+            tuple           Header and derived key
+        '''
+        header = {'kdf': 'scrypt', 'salt': base64.b64encode(os.urandom(16)).decode('ascii'), **Vault.scrypt}
+        key = Vault.derive(password, header)
+
+        header['check'] = Vault.seal(key, b'ctfcred', header['salt'].encode())
+        return (header, key)
+
+    def verify(key: bytes, header: dict) -> bool:
+        '''
+        Checks whether a key belongs to the credential file with the specified header.
+
+        Parameters:
+            key             Key to check
+            header          Header of the credential file
+
+        Returns:
+            bool            True if the key is correct
+        '''
+        try:
+            return len(key) == 64 and Vault.open(key, header['check'], header['salt'].encode()) == b'ctfcred'
+
+        except VaultException:
+            return False
+
+    def prompt(message: str) -> str:
+        '''
+        Asks for the password of the credential file. The password is taken from the
+        CTFCRED_PASSWORD environment variable, the terminal or a rofi password prompt.
+
+        Parameters:
+            message         Prompt to display
+
+        Returns:
+            str             Entered password
+        '''
+        if 'CTFCRED_PASSWORD' in os.environ:
+            return os.environ['CTFCRED_PASSWORD']
+
+        if sys.stdin.isatty():
+            return getpass.getpass(f'{message}: ')
+
+        if shutil.which('rofi'):
+
+            process = subprocess.run(['rofi', '-dmenu', '-password', '-p', message, '-lines', '0'], input='',
+                                     stdout=subprocess.PIPE, text=True)
+
+            if process.returncode == 0:
+                return process.stdout.rstrip('\n')
+
+        raise VaultException('Unable to obtain the password of the credential file.')
+
+    def header(path: Path) -> dict:
+        '''
+        Reads the header of an encrypted credential file.
+
+        Parameters:
+            path            Path of the credential file
+
+        Returns:
+            dict            Header of the credential file
+        '''
+        with open(path, 'rb') as file:
+
+            if file.readline() != Config.vault_magic:
+                raise VaultException(f'{path} is not an encrypted credential file.')
+
+            return json.loads(file.readline())
+
+    def unlock(header: dict, start: bool = True) -> bytes:
+        '''
+        Returns the key for the credential file with the specified header. The key is
+        obtained from the process cache, from the agent or by asking for the password.
+        In the latter case, a new agent is started for the derived key, unless start
+        is False.
+
+        Parameters:
+            header          Header of the credential file
+            start           Start an agent after asking for the password
+
+        Returns:
+            bytes           Derived key
+        '''
+        if header['salt'] in Vault.keys:
+            return Vault.keys[header['salt']]
+
+        key = Agent.get()
+
+        if key is None or not Vault.verify(key, header):
+
+            key = Vault.derive(Vault.prompt('ctfcred password'), header)
+
+            if not Vault.verify(key, header):
+                raise VaultException('Wrong password for the credential file.')
+
+            if start:
+                Agent.start(key, Config.agent_ttl)
+
+        Vault.keys[header['salt']] = key
+        return key
+
+    def store_key() -> bytes:
+        '''
+        Returns the key of the configured credential file.
+
+        Parameters:
+            None
+
+        Returns:
+            bytes           Derived key
+        '''
+        if Config.credential_file not in Vault.headers:
+            Vault.headers[Config.credential_file] = Vault.header(Config.credential_file)
+
+        return Vault.unlock(Vault.headers[Config.credential_file])
+
+    def read(path: Path) -> dict:
+        '''
+        Decrypts an encrypted credential file. The ciphertexts of the chunks are kept, so
+        that unchanged chunks can be reused when the file is written again.
+
+        Parameters:
+            path            Path of the credential file
+
+        Returns:
+            dict            Content of the credential file
+        '''
+        with open(path, 'rb') as file:
+            lines = file.read().split(b'\n')
+
+        header = json.loads(lines[1])
+        key = Vault.unlock(header)
+        aad = header['salt'].encode()
+
+        yml = json.loads(Vault.open(key, lines[2], aad))
+        stored = dict(line.split(b' ', 1) for line in lines[3:] if line)
+        records = []
+
+        for digest in yml.pop('chunks'):
+
+            if digest.encode() not in stored:
+                raise VaultException('The credential file is incomplete.')
+
+            data = Vault.open(key, stored[digest.encode()], aad)
+
+            if not hmac.compare_digest(Vault.mac(key, data).hex()[:32], digest):
+                raise VaultException('The credential file contains a replaced chunk.')
+
+            records += [decode_record(record) for record in data.decode('utf-8').split('\n')]
+
+        Vault.headers[path] = header
+        Vault.chunks[path] = {digest.decode(): data.decode() for digest, data in stored.items()}
+
+        yml['imports'] = {int(batch): info for batch, info in (yml.get('imports') or {}).items()}
+        yml['credentials'] = records
+
+        return yml
+
+    def split(key: bytes, records: list[dict]) -> list[bytes]:
+        '''
+        Groups records into serialized chunks. A chunk ends after each record whose keyed
+        uid digest matches the boundary mask. Boundaries therefore only depend on the uids
+        of the records and do not move when a record is edited. The size of a chunk is
+        limited to chunk_size records.
+
+        Parameters:
+            key             Key as returned by Vault.derive
+            records         Credential records
+
+        Returns:
+            list            Plaintext of each chunk
+        '''
+        chunks = []
+        current = []
+
+        for record in records:
+
+            data = encode_record(record)
+            current.append(data)
+
+            boundary = Vault.mac(key, (record.get('uid') or data).encode('utf-8'))[0] & Vault.boundary == 0
+
+            if boundary or len(current) >= Vault.chunk_size:
+                chunks.append('\n'.join(current).encode('utf-8'))
+                current = []
+
+        if current:
+            chunks.append('\n'.join(current).encode('utf-8'))
+
+        return chunks
+
+    def write(path: Path, yml: dict) -> bytes:
+        '''
+        Encrypts the content of a credential file. Only chunks that are not part of the
+        previously read or written file are encrypted.
+
+        Parameters:
+            path            Path of the credential file
+            yml             Content of the credential file
+
+        Returns:
+            bytes           Encrypted credential file
+        '''
+        if path not in Vault.headers:
+            Vault.headers[path] = Vault.header(path)
+
+        header = Vault.headers[path]
+        key = Vault.unlock(header)
+        aad = header['salt'].encode()
+
+        previous = Vault.chunks.get(path, {})
+        stored = {}
+        digests = []
+
+        for data in Vault.split(key, yml['credentials']):
+
+            digest = Vault.mac(key, data).hex()[:32]
+            digests.append(digest)
+
+            if digest not in stored:
+                stored[digest] = previous.get(digest) or Vault.seal(key, data, aad)
+
+        meta = {name: value for name, value in yml.items() if name != 'credentials'}
+        meta['chunks'] = digests
+
+        Vault.chunks[path] = stored
+
+        lines = [json.dumps(header), Vault.seal(key, json.dumps(meta).encode('utf-8'), aad)]
+        lines += [f'{digest} {data}' for digest, data in stored.items()]
+
+        return Config.vault_magic + '\n'.join(lines).encode('ascii') + b'\n'
+
+    def seal_blob(data: str) -> str:
+        '''
+        Encrypts a history blob with the key of the configured credential file.
+
+        Parameters:
+            data            Serialized record
+
+        Returns:
+            str             Encrypted record
+        '''
+        return '!' + Vault.seal(Vault.store_key(), data.encode('utf-8'), b'history')
+
+    def open_blob(data: str) -> str:
+        '''
+        Decrypts a history blob. Blobs that were stored in plaintext are returned as is.
+
+        Parameters:
+            data            Stored blob
+
+        Returns:
+            str             Serialized record
+        '''
+        if not data.startswith('!'):
+            return data
+
+        return Vault.open(Vault.store_key(), data[1:], b'history').decode('utf-8')
+
+    def encrypt(password: str) -> None:
+        '''
+        Switches the configured credential file to encrypted storage. The file is written
+        by the next call to Credential.to_file. Plaintext copies within the column store,
+        the completion index, the hash cache and the row cache of the rofi script mode
+        are removed.
+
+        Parameters:
+            password        Password for the credential file
+
+        Returns:
+            None
+        '''
+        header, key = Vault.create(password)
+
+        Vault.keys[header['salt']] = key
+        Vault.headers[Config.credential_file] = header
+        Vault.chunks.pop(Config.credential_file, None)
+
+        Config.encrypted = True
+
+        shutil.rmtree(Config.column_dir, ignore_errors=True)
+        shutil.rmtree(Config.completion_dir, ignore_errors=True)
+
+        Config.hash_cache.unlink(missing_ok=True)
+        Config.row_cache.unlink(missing_ok=True)
+
+        Agent.start(key, Config.agent_ttl)
@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+import ctypes
+import select
+import struct
+import ctypes.util
+
+from pathlib import Path
+from ctfcred.config import Config
+from ctfcred.parsers import LootParser
+from ctfcred.launcher import Launcher
+from ctfcred.credential import Credential
+
+
+class Inotify:
+    '''
+    Minimal ctypes wrapper around the inotify API of the linux kernel. Only directories are
+    watched, as watches on regular files do not survive log rotation. If inotify is not
+    available, creating an Inotify object raises an OSError.
+    '''
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    header = struct.Struct('iIII')
+
+    def __init__(self) -> None:
+        '''
+        Creates a new inotify instance.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this platform.')
+
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        self.dirs = {}
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed.')
+
+    def add(self, directory: Path) -> None:
+        '''
+        Adds a watch for the specified directory.
+
+        Parameters:
+            directory       Directory to watch
+
+        Returns:
+            None
+        '''
+        wd = self.libc.inotify_add_watch(self.fd, str(directory).encode(), Inotify.mask)
+
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'Unable to watch {directory}.')
+
+        self.dirs[wd] = directory
+
+    def read(self, timeout: float) -> set[Path]:
+        '''
+        Waits up to timeout seconds for events and returns the paths of all files that
+        were changed or created.
+
+        Parameters:
+            timeout         Maximum time to wait in seconds
+
+        Returns:
+            set             Paths of changed files
+        '''
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, 65536)
+        offset = 0
+        paths = set()
+
+        while offset < len(data):
+
+            wd, _, _, length = Inotify.header.unpack_from(data, offset)
+            offset += Inotify.header.size
+
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+
+            if wd in self.dirs and name:
+                paths.add(self.dirs[wd].joinpath(name))
+
+        return paths
+
+    def close(self) -> None:
+        '''
+        Closes the inotify file descriptor.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        os.close(self.fd)
+
+
+class Watcher:
+    '''
+    The Watcher follows loot files (or all files within a directory) and imports new
+    credentials as they appear. For each file, the inode and the read offset are tracked,
+    so that only new bytes are parsed. A changed inode or a shrinking file is treated as
+    log rotation and the file is read from the start. Files are read in chunks of limited
+    size. Parsed records are deduplicated against the stored credentials and are written
+    in small batches.
+    '''
+    batch_size = 256
+    read_size = 1024 * 1024
+
+    def __init__(self, targets: list[str], fmt: str = None, sep: str = ':', interval: float = 2.0,
+                 notify: bool = False) -> None:
+        '''
+        Creates a new Watcher for the specified files or directories.
+
+        Parameters:
+            targets         Files or directories to watch
+            fmt             Loot format of the files (default: detect per file)
+            sep             Separator for user-pass files
+            interval        Maximum number of seconds before pending records are written
+            notify          Send a notification for each written batch
+
+        Returns:
+            None
+        '''
+        self.targets = [Path(target).expanduser().absolute() for target in targets]
+        self.fmt = fmt
+        self.sep = sep
+        self.interval = interval
+        self.notify = notify
+
+        self.offsets = {}
+        self.parsers = {}
+        self.batches = {}
+        self.pending = {}
+
+        self.credentials = None
+        self.stamp = None
+        self.flushed = time.monotonic()
+
+    def tracks(self, path: Path) -> bool:
+        '''
+        Checks whether the specified path belongs to one of the watched targets.
+
+        Parameters:
+            path            Path to check
+
+        Returns:
+            bool            True if the path is watched
+        '''
+        return path in self.targets or path.parent in self.targets
+
+    def files(self) -> list[Path]:
+        '''
+        Returns all currently existing files that belong to the watched targets.
+
+        Parameters:
+            None
+
+        Returns:
+            list            Watched files
+        '''
+        files = []
+
+        for target in self.targets:
+
+            if target.is_dir():
+                files += sorted(child for child in target.iterdir() if child.is_file())
+
+            elif target.is_file():
+                files.append(target)
+
+        return files
+
+    def read(self, path: Path) -> None:
+        '''
+        Parses the complete lines that were appended to the specified file since the last
+        read. The file is read in chunks of read_size bytes and pending records are written
+        whenever they are due, so that large files are never loaded at once. Incomplete
+        trailing lines are kept for the next read.
+
+        Parameters:
+            path            File to read
+
+        Returns:
+            None
+        '''
+        try:
+            stat = path.stat()
+
+        except OSError:
+            return
+
+        inode, offset = self.offsets.get(path, (stat.st_ino, 0))
+
+        if stat.st_ino != inode or stat.st_size < offset:
+            offset = 0
+
+        if stat.st_size == offset:
+            return
+
+        with open(path, 'rb') as file:
+
+            file.seek(offset)
+            data = b''
+
+            while offset + len(data) < stat.st_size:
+
+                chunk = file.read(min(Watcher.read_size, stat.st_size - offset - len(data)))
+
+                if not chunk:
+                    break
+
+                data += chunk
+                end = data.rfind(b'\n') + 1
+
+                if not end:
+                    continue
+
+                offset += end
+                self.offsets[path] = (stat.st_ino, offset)
+
+                self.parse(path, data[:end])
+                data = data[end:]
+
+                if self.due():
+                    self.flush()
+
+    def parse(self, path: Path, data: bytes) -> None:
+        '''
+        Parses complete lines of the specified file and adds the records to the pending ones.
+        The loot format of the file is detected on the first call.
+
+        Parameters:
+            path            File the lines belong to
+            data            Complete lines to parse
+
+        Returns:
+            None
+        '''
+        if path not in self.parsers:
+            self.parsers[path] = LootParser(self.fmt or LootParser.detect(path, 'userpass'), self.sep)
+
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        self.pending.setdefault(path, []).extend(self.parsers[path].parse(lines))
+
+    def load(self) -> None:
+        '''
+        Loads the stored credentials. Credentials are only reloaded if the credential file
+        was changed by someone else since the last write.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        try:
+            stat = Config.credential_file.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+
+        except OSError:
+            stamp = None
+
+        if self.credentials is None or stamp != self.stamp:
+            self.credentials = Credential.from_file()
+
+    def flush(self) -> None:
+        '''
+        Merges the pending records into the stored credentials and writes the credential
+        file. Each watched file uses one import batch for the whole watch session.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        self.flushed = time.monotonic()
+        pending = {path: records for path, records in self.pending.items() if records}
+        self.pending = {}
+
+        if not pending:
+            return
+
+        self.load()
+        total = 0
+
+        for path, records in pending.items():
+
+            batch = self.batches.get(path)
+
+            if batch not in Config.imports:
+                batch = self.batches[path] = Credential.new_batch(path)
+
+            new = Config.imports[batch]['new']
+            self.credentials = Credential.import_loot(self.credentials, records, batch)
+
+            Config.imports[batch]['new'] += new
+            Config.imports[batch]['lines'] = self.parsers[path].lines
+
+            count = Config.imports[batch]['new'] - new
+            total += count
+
+            if count:
+                print(f'[+] Imported {count} new credentials from {path}.')
+
+        Credential.to_file(self.credentials)
+
+        stat = Config.credential_file.stat()
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+
+        if self.notify and total:
+            Launcher.notify_send(None, f'ctfcred: imported {total} new credentials')
+
+    def due(self) -> bool:
+        '''
+        Checks whether pending records should be written.
+
+        Parameters:
+            None
+
+        Returns:
+            bool            True if pending records should be written
+        '''
+        count = sum(len(records) for records in self.pending.values())
+        return count >= Watcher.batch_size or (count > 0 and time.monotonic() - self.flushed >= self.interval)
+
+    def inotify(self) -> Inotify:
+        '''
+        Creates an Inotify instance that watches the directories of the targets. If inotify
+        is not available, None is returned.
+
+        Parameters:
+            None
+
+        Returns:
+            Inotify         Inotify instance or None
+        '''
+        try:
+            inotify = Inotify()
+
+            for directory in {target if target.is_dir() else target.parent for target in self.targets}:
+                inotify.add(directory)
+
+            return inotify
+
+        except OSError as e:
+            print(f'[-] {e} Falling back to polling.', file=sys.stderr)
+            return None
+
+    def changes(self, inotify: Inotify) -> list[Path]:
+        '''
+        Waits for changes and returns the changed files. Without inotify, the targets are
+        polled in the configured interval and all files are returned.
+
+        Parameters:
+            inotify         Inotify instance or None
+
+        Returns:
+            list            Changed files
+        '''
+        if inotify is None:
+            time.sleep(self.interval)
+            return self.files()
+
+        return [path for path in inotify.read(self.interval) if self.tracks(path) and path.is_file()]
+
+    def run(self) -> None:
+        '''
+        Starts watching the targets until interrupted. Existing file contents are imported
+        first. Afterwards, inotify is used to wait for changes. If inotify is not available,
+        the targets are polled in the configured interval.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        '''
+        for path in self.files():
+            self.read(path)
+
+        self.flush()
+        inotify = self.inotify()
+
+        try:
+            while True:
+
+                for path in self.changes(inotify):
+                    self.read(path)
+
+                if self.due():
+                    self.flush()
+
+        except KeyboardInterrupt:
+            self.flush()
+
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -24,6 +24,10 @@ setuptools.setup(
                         'pyotp',
                         'pyperclip'
                      ],
+    extras_require={
+                        'encryption': ['cryptography'],
+                        'zstd': ['zstandard'],
+                   },
     scripts=[
                 'bin/ctfcred',
             ],
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+'''
+Compares read and write latency and the file size of the credential file for the
+available compression methods. The benchmark runs on a temporary credential file:
+
+    python3 tests/benchmark/compression_bench.py [count]
+'''
+
+import sys
+import time
+import tempfile
+
+from pathlib import Path
+from ctfcred.config import Config
+from ctfcred.credential import Credential
+from ctfcred.compression import Compression, zstandard
+
+
+def measure(func, rounds: int = 3) -> float:
+    '''
+    Returns the best of several timings of func in milliseconds.
+
+    Parameters:
+        func            Function to measure
+        rounds          Number of rounds
+
+    Returns:
+        float           Best timing in milliseconds
+    '''
+    timings = []
+
+    for _ in range(rounds):
+
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings)
+
+
+def main() -> None:
+    '''
+    Runs the benchmark and prints one line per compression method.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    methods = ['none', 'gzip'] + (['zstd'] if zstandard else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        tmp = Path(tmp)
+
+        Config.credential_file = tmp.joinpath('ctfcred.yml')
+
+        credentials = {Credential(f'user{ix}', f'Password{ix % 997}!', None, None, None, 'corp.local', 0)
+                       for ix in range(count)}
+
+        print(f'{count} credentials')
+        print(f"{'method'.ljust(8)}  {'write ms'.rjust(10)}  {'read ms'.rjust(10)}  {'size kB'.rjust(10)}")
+
+        for method in methods:
+
+            Config.compression = '' if method == 'none' else method
+            Config.encrypted = False
+
+            write = measure(lambda: Config.write_cred_file({'credentials': [cred.to_dict() for cred in credentials]}))
+            read = measure(lambda: Config.read_cred_file(Config.credential_file))
+            size = Config.credential_file.stat().st_size / 1024
+
+            assert Compression.detect(Config.credential_file) == (None if method == 'none' else method)
+            print(f'{method.ljust(8)}  {write:10.1f}  {read:10.1f}  {size:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import ctfcred
+import pytest
+import subprocess
+
+from ctfcred.launcher import Launcher
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    '''
+    Records the commands that are started by AutoType instead of running them.
+
+    Parameters:
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        list            Recorded commands and their input
+    '''
+    commands = []
+
+    monkeypatch.setattr(subprocess, 'run', lambda command, input=None, **kwargs: commands.append((command, input)))
+    monkeypatch.setattr(ctfcred.Config, 'autotype_delay', 0)
+    monkeypatch.setattr(ctfcred.Config, 'default_sequence', None)
+    monkeypatch.setattr(Launcher, 'notify_send', lambda *args: None)
+
+    return commands
+
+
+def test_parse():
+    '''
+    Checks the parsing of auto-type sequences.
+    '''
+    steps = ctfcred.AutoType.parse('user<TAB>pass<ENTER>')
+    assert steps == [('field', 'user'), ('key', 'Tab'), ('field', 'pass'), ('key', 'Return')]
+
+    assert ctfcred.AutoType.parse('user_domain <Tab> otp') == [('field', 'user_domain'), ('key', 'Tab'), ('field', 'otp')]
+
+    with pytest.raises(ctfcred.AutoTypeException):
+        ctfcred.AutoType.parse('user<TAB>secret')
+
+    with pytest.raises(ctfcred.AutoTypeException):
+        ctfcred.AutoType.parse('<TAB><ENTER>')
+
+
+def test_type(cred, commands, monkeypatch):
+    '''
+    Checks that the default sequence is typed with a single key press.
+    '''
+    monkeypatch.setattr(ctfcred.AutoType, 'typer', lambda: 'xdotool')
+
+    assert Launcher.handle_copy(21, [cred])
+    assert commands == [
+                         (['xdotool', 'type', '--clearmodifiers', '--file', '-'], b'tony'),
+                         (['xdotool', 'key', '--clearmodifiers', 'Tab'], None),
+                         (['xdotool', 'type', '--clearmodifiers', '--file', '-'], b'tonyPassword'),
+                         (['xdotool', 'key', '--clearmodifiers', 'Return'], None),
+                       ]
+
+
+def test_rotate(cred, commands, monkeypatch):
+    '''
+    Checks that the clipboard is rotated if no typing tool is available and that the
+    sequence of the credential takes precedence.
+    '''
+    monkeypatch.setattr(ctfcred.AutoType, 'typer', lambda: None)
+    monkeypatch.setattr(ctfcred.AutoType, 'clipper', lambda: 'wl-copy')
+
+    cred.sequence = 'user_domain<TAB>pass<TAB>url'
+    Launcher.handle_copy(21, [cred])
+
+    assert [data for command, data in commands] == [b'exmaple.com/tony', b'tonyPassword', b'https://example.com']
+    assert all(command[0] == 'wl-copy' for command, data in commands)
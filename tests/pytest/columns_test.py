@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+import stat
+
+from ctfcred.config import Config
+from ctfcred.columns import ColumnStore
+from ctfcred.credential import Credential
+from ctfcred.history import History
+
+
+def test_column_store(tmp_path, monkeypatch):
+    '''
+    Test whether distinct values are read from the column store and whether
+    the column store is invalidated when the credential file changes.
+
+    Parameters:
+        tmp_path        Temporary directory for the credential and column files
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    cred_file = tmp_path.joinpath('ctfcred.yml')
+    cred_file.write_text('credentials: []\n')
+
+    monkeypatch.setattr(Config, 'credential_file', cred_file)
+    monkeypatch.setattr(Config, 'column_dir', tmp_path.joinpath('columns'))
+    monkeypatch.setattr(Config, 'default_domain', 'default.org')
+
+    records = [
+                {'username': 'tony', 'password': 'secret', 'url': None, 'domain': 'example.org'},
+                {'username': 'timmy', 'password': 'secret', 'url': None, 'domain': None},
+                {'username': None, 'password': 'p@ssw0rd', 'url': None, 'domain': 'example.org'},
+              ]
+
+    ColumnStore.write(records)
+
+    assert list(ColumnStore.distinct('username')) == ['timmy', 'tony']
+    assert list(ColumnStore.distinct('password')) == ['p@ssw0rd', 'secret']
+    assert list(ColumnStore.distinct('domain')) == ['default.org', 'example.org']
+    assert list(ColumnStore.distinct('url')) == []
+
+    for path in Config.column_dir.iterdir():
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+    cred_file.write_text('credentials: []\ndefault_url: null\n')
+    assert ColumnStore.distinct('username') is None
+
+
+def test_column_store_meta(store):
+    '''
+    Test whether storing changed watermarks keeps the column store in sync and creates
+    no new history version.
+
+    Parameters:
+        store           Temporary credential store
+
+    Returns:
+        None
+    '''
+    credentials = {Credential('timmy', 'password123', None, None, None, None, 0)}
+    Credential.to_file(credentials)
+
+    Config.watermarks['spray'] = 1.0
+    Credential.to_file_meta(credentials)
+
+    assert ColumnStore.meta() is not None
+    assert list(ColumnStore.distinct('username')) == ['timmy']
+    assert History.versions() == [1]
+    assert Config.completion_dir.joinpath('watermark').read_text() == 'spray\n'
+
+    Credential.from_file()
+    assert Config.watermarks == {'spray': 1.0}
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+
+import stat
+
+from ctfcred.config import Config
+from ctfcred.completion import CompletionIndex
+
+
+def test_completion_index(tmp_path, monkeypatch):
+    '''
+    Test whether the completion index contains the sorted distinct values of each field
+    and is only readable by the current user.
+
+    Parameters:
+        tmp_path        Temporary directory
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Config, 'completion_dir', tmp_path)
+    monkeypatch.setattr(Config, 'default_domain', 'default.org')
+    monkeypatch.setattr(Config, 'watermarks', {'spray': 0})
+    monkeypatch.setattr(Config, 'imports', {1: {}, 2: {}})
+
+    records = [
+                {'username': 'timmy', 'domain': 'corp.local', 'url': None, 'tags': ['dc01', 'web01']},
+                {'username': 'tony', 'domain': 'corp.local', 'url': 'https://example.com', 'tags': ['dc01']},
+                {'username': None, 'domain': None, 'url': None, 'tags': []},
+              ]
+
+    CompletionIndex.write(records)
+
+    def read(field):
+        return tmp_path.joinpath(field).read_text().splitlines()
+
+    assert read('user') == ['timmy', 'tony']
+    assert read('domain') == ['corp.local', 'default.org']
+    assert read('url') == ['https://example.com']
+    assert read('tag') == ['dc01', 'web01']
+    assert read('alias') == []
+    assert read('watermark') == ['spray']
+    assert read('batch') == ['1', '2']
+
+    assert stat.S_IMODE(tmp_path.stat().st_mode) == 0o700
+    assert all(stat.S_IMODE(path.stat().st_mode) == 0o600 for path in tmp_path.iterdir())
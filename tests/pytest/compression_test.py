@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+import gzip
+import pytest
+
+from ctfcred.config import Config, DependencyException
+from ctfcred.credential import Credential
+from ctfcred.compression import Compression, zstandard
+
+
+def test_compression_detect(tmp_path):
+    '''
+    Test whether compressed files are detected by their magic bytes and can be read
+    and written transparently.
+
+    Parameters:
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    plain = tmp_path.joinpath('plain.txt')
+    plain.write_text('timmy:password123\n')
+
+    with Compression.open(tmp_path.joinpath('loot.gz'), 'w') as file:
+        file.write('timmy:password123\n')
+
+    renamed = tmp_path.joinpath('loot.gz').rename(tmp_path.joinpath('loot.txt'))
+
+    assert Compression.detect(plain) is None
+    assert Compression.detect(renamed) == 'gzip'
+    assert gzip.decompress(renamed.read_bytes()) == b'timmy:password123\n'
+
+    with Compression.open(renamed, 'r') as file:
+        assert file.read() == 'timmy:password123\n'
+
+    with Compression.open(renamed, 'rb') as file:
+        assert file.read() == b'timmy:password123\n'
+
+
+def test_compression_store(store, monkeypatch):
+    '''
+    Test whether a compressed credential file stays compressed and whether compressed
+    files can be imported.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Config, 'compression', 'gzip')
+    Credential.to_file({Credential('timmy', 'password123', None, None, None, None, 0)})
+
+    monkeypatch.setattr(Config, 'compression', None)
+    assert Config.store_compression() == 'gzip'
+
+    loot = store.joinpath('loot.txt')
+    loot.write_bytes(gzip.compress(b'tony:tonyPassword\n'))
+
+    credentials = Credential.from_file()
+    credentials |= Credential.import_userpass(loot, ':', False)
+    Credential.to_file(credentials)
+
+    assert Compression.detect(Config.credential_file) == 'gzip'
+    assert {cred.username for cred in Credential.from_file()} == {'timmy', 'tony'}
+
+
+@pytest.mark.skipif(zstandard is not None, reason='zstandard is installed')
+def test_compression_zstd_missing(tmp_path):
+    '''
+    Test whether zstd compression without the zstandard package raises a DependencyException.
+
+    Parameters:
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    with pytest.raises(DependencyException):
+        Compression.open(tmp_path.joinpath('export.zst'), 'w')
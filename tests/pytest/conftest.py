@@ -41,6 +41,33 @@ def cred_list():
     return [cred1, cred2, cred3, cred4]
 
 
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    '''
+    Redirects the credential file and all derived files into a temporary directory.
+
+    Parameters:
+        tmp_path        Temporary directory
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        Path            Temporary directory
+    '''
+    monkeypatch.setattr(ctfcred.Config, 'credential_file', tmp_path.joinpath('ctfcred.yml'))
+    monkeypatch.setattr(ctfcred.Config, 'hash_cache', tmp_path.joinpath('hashes.json'))
+    monkeypatch.setattr(ctfcred.Config, 'column_dir', tmp_path.joinpath('columns'))
+    monkeypatch.setattr(ctfcred.Config, 'completion_dir', tmp_path.joinpath('completion'))
+    monkeypatch.setattr(ctfcred.Config, 'row_cache', tmp_path.joinpath('rows.json'))
+    monkeypatch.setattr(ctfcred.Config, 'history_dir', tmp_path.joinpath('history'))
+    monkeypatch.setattr(ctfcred.Config, 'agent_socket', tmp_path.joinpath('agent.sock'))
+    monkeypatch.setattr(ctfcred.Config, 'encrypted', None)
+    monkeypatch.setattr(ctfcred.Config, 'compression', None)
+    monkeypatch.setattr(ctfcred.Config, 'imports', {})
+    monkeypatch.setattr(ctfcred.Config, 'watermarks', {})
+
+    return tmp_path
+
+
 def pytest_addoption(parser):
     '''
     Not sure how to run clipboard tests in a CI properly. Until a better solution
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+import pytest
+
+from ctfcred.filter import Filter, CredentialIndex, FilterException
+
+
+@pytest.mark.usefixtures('cred_list')
+def test_filter(cred_list):
+    '''
+    Test whether filter expressions select the expected credentials.
+
+    Parameters:
+        cred_list       List of credential objects
+
+    Returns:
+        None
+    '''
+    cred_list[0].tags = ['dc01']
+    cred_list[1].tags = ['dc01', 'web01']
+
+    assert Filter('tag=dc01').apply(cred_list) == cred_list[0:2]
+    assert Filter('tag=dc01,has=otp').apply(cred_list) == [cred_list[1]]
+    assert Filter('user=dummy').apply(cred_list) == [cred_list[2]]
+    assert Filter('has=password').apply(cred_list) == [cred_list[0], cred_list[1], cred_list[3]]
+    assert Filter('domain=unknown.org').apply(cred_list) == []
+
+
+@pytest.mark.usefixtures('cred_list')
+def test_index(cred_list):
+    '''
+    Test whether the credential index is only built for queried keys.
+
+    Parameters:
+        cred_list       List of credential objects
+
+    Returns:
+        None
+    '''
+    index = CredentialIndex(cred_list)
+
+    assert index.lookup('user', 'timmy') == {cred_list[0].id}
+    assert list(index.indexes) == ['user']
+
+
+def test_invalid_filter():
+    '''
+    Test whether invalid filter expressions are rejected.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    with pytest.raises(FilterException, match='Unknown filter key'):
+        Filter('color=blue')
+
+    with pytest.raises(FilterException, match='Invalid filter clause'):
+        Filter('domain')
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+import stat
+import hashlib
+
+from ctfcred.config import Config
+from ctfcred.hashing import Hasher, md4, nt_hash
+
+
+def test_md4():
+    '''
+    Test the MD4 implementation against the test vectors from RFC 1320.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    assert md4(b'').hex() == '31d6cfe0d16ae931b73c59d7e0c089c0'
+    assert md4(b'abc').hex() == 'a448017aaf21d8525fc10ae87aa6729d'
+    assert md4(b'1234567890' * 8).hex() == 'e33b4ddc9c38f2199c3e7b164fcc0536'
+
+
+def test_nt_hash():
+    '''
+    Test whether NT hashes are computed correctly.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    assert nt_hash('password') == '8846f7eaee8fb117ad06bdd830b7586c'
+
+
+def test_hash_passwords(tmp_path, monkeypatch):
+    '''
+    Test whether ntlm hashes are computed by the process pool and stored within the
+    hash cache, while other algorithms are computed inline without cache.
+
+    Parameters:
+        tmp_path        Temporary directory for the hash cache
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Config, 'hash_cache', tmp_path.joinpath('hashes.json'))
+    monkeypatch.setattr(Config, 'encrypted', False)
+    monkeypatch.setattr(Hasher, 'batch_size', 2)
+    monkeypatch.setattr(Hasher, 'pool_threshold', 4)
+
+    passwords = [f'password{i}' for i in range(8)]
+    hashes = Hasher.hash_passwords('ntlm', passwords)
+
+    assert hashes == {password: nt_hash(password) for password in passwords}
+    assert Hasher.load_cache('ntlm') == {Hasher.key(password): hashes[password] for password in passwords}
+
+    hashes = Hasher.hash_passwords('sha256', passwords)
+
+    assert hashes == {password: hashlib.sha256(password.encode('utf-8')).hexdigest() for password in passwords}
+    assert Hasher.load_cache('sha256') == {}
+
+
+def test_hash_cache(store, monkeypatch):
+    '''
+    Test whether the hash cache does not contain plaintext passwords, is only readable
+    by the current user, is pruned to the exported passwords and is not used for
+    encrypted credential files.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Config, 'encrypted', False)
+
+    Hasher.hash_passwords('ntlm', ['Secret1', 'Secret2'])
+    Hasher.hash_passwords('ntlm', ['Secret1'])
+
+    assert 'Secret' not in Config.hash_cache.read_text()
+    assert stat.S_IMODE(Config.hash_cache.stat().st_mode) == 0o600
+    assert Hasher.load_cache('ntlm') == {Hasher.key('Secret1'): nt_hash('Secret1')}
+
+    Config.hash_cache.unlink()
+    monkeypatch.setattr(Config, 'encrypted', True)
+
+    assert Hasher.hash_passwords('ntlm', ['Secret1']) == {'Secret1': nt_hash('Secret1')}
+    assert not Config.hash_cache.exists()
+
+
+def test_hash_stream(monkeypatch):
+    '''
+    Test whether ntlm streams hashed by the process pool match the sequential hashes
+    and whether known hashes are reused.
+
+    Parameters:
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Hasher, 'batch_size', 3)
+    monkeypatch.setattr(Hasher, 'pool_threshold', 4)
+
+    passwords = [f'password{i}' for i in range(20)]
+    expected = [nt_hash(password) for password in passwords]
+
+    assert list(Hasher.hash_stream('ntlm', passwords)) == expected
+    assert list(Hasher.hash_stream('ntlm', passwords[:3], {'password1': 'known'})) == [expected[0], 'known', expected[2]]
+
+    expected = [hashlib.md5(password.encode('utf-8')).hexdigest() for password in passwords]
+    assert list(Hasher.hash_stream('md5', passwords)) == expected
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+
+import stat
+import pytest
+
+from ctfcred.config import Config
+from ctfcred.credential import Credential
+from ctfcred.history import History, UnknownVersion
+
+
+def test_history(store, monkeypatch):
+    '''
+    Test whether versions are created for each change and can be restored.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(History, 'full_interval', 4)
+
+    credentials = {Credential('timmy', 'password123', 'this is timmy', None, None, None, 0)}
+    Credential.to_file(credentials)
+    Credential.to_file(credentials)
+
+    assert History.versions() == [1]
+
+    for username in ['tony', 'jane', 'carol', 'alex', 'bob']:
+
+        credentials = Credential.from_file()
+        credentials.add(Credential(username, None, None, None, None, None, 0))
+        Credential.to_file(credentials)
+
+    versions = History.versions()
+    assert versions == [1, 2, 3, 4, 5, 6]
+    assert History.manifest(4)['parent'] is None and History.manifest(6)['parent'] == 5
+
+    records = History.restore(versions[-2])
+    assert [record['username'] for record in records] == ['timmy', 'tony', 'jane', 'carol', 'alex']
+
+    records = History.restore(versions[-1])
+    restored = Credential.from_records(records)
+    assert next(cred for cred in restored if cred.username == 'timmy').note == 'this is timmy'
+
+    with pytest.raises(UnknownVersion):
+        History.restore(1000)
+
+
+def test_history_default_sequence(store, monkeypatch):
+    '''
+    Test whether a changed default sequence creates a new version and is restored.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    credentials = {Credential('timmy', 'password123', None, None, None, None, 0)}
+
+    monkeypatch.setattr(Config, 'default_sequence', 'user<TAB>pass<ENTER>')
+    Credential.to_file(credentials)
+
+    Config.default_sequence = 'pass<ENTER>'
+    Credential.to_file(credentials)
+
+    assert History.versions() == [1, 2]
+
+    History.restore(1)
+    assert Config.default_sequence == 'user<TAB>pass<ENTER>'
+
+
+def test_history_prune(store, monkeypatch):
+    '''
+    Test whether pruning keeps the newest versions restorable and drops unreferenced blobs.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(History, 'keep', 2)
+    monkeypatch.setattr(History, 'full_interval', 100)
+
+    for count in range(1, 6):
+        History.snapshot([{'username': f'user{ix}', 'note': 'x'} for ix in range(count)])
+
+    with History.lock():
+        History.prune()
+
+    assert History.versions() == [4, 5]
+    assert [record['username'] for record in History.restore(4)] == ['user0', 'user1', 'user2', 'user3']
+    assert len(History.load_blobs()) == 5
+
+
+def test_history_snapshot_prune(store, monkeypatch):
+    '''
+    Test whether snapshots prune old versions synchronously and whether the history
+    directory is only accessible by the current user.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(History, 'keep', 2)
+    monkeypatch.setattr(History, 'full_interval', 1)
+
+    for count in range(1, 5):
+        History.snapshot([{'username': f'user{ix}', 'note': 'x'} for ix in range(count)])
+
+    assert History.versions() == [3, 4]
+    assert len(History.load_blobs()) == 4
+    assert stat.S_IMODE(Config.history_dir.stat().st_mode) == 0o700
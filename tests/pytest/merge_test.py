@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+import copy
+import gzip
+import yaml
+
+from ctfcred.config import Config
+from ctfcred.compression import Compression
+from ctfcred.credential import Credential
+from ctfcred.merge import CredentialMerger
+
+
+def credentials() -> set:
+    '''
+    Returns a small set of credentials with fixed uids.
+
+    Parameters:
+        None
+
+    Returns:
+        set             Set of Credential objects
+    '''
+    timmy = Credential('timmy', 'password123', 'this is timmy', None, None, 'corp', 100, uid='a')
+    tony = Credential('tony', 'tonyPassword', None, 'https://example.com', None, None, 100, uid='b')
+    jane = Credential('jane', 'janesPassword', None, None, None, None, 100, uid='c')
+
+    return {timmy, tony, jane}
+
+
+def by_user(creds: set) -> dict:
+    '''
+    Maps usernames to credentials.
+
+    Parameters:
+        creds           Set of Credential objects
+
+    Returns:
+        dict            Mapping of username -> credential
+    '''
+    return {cred.username: cred for cred in creds}
+
+
+def test_merge():
+    '''
+    Test whether a two-way merge fills missing fields and matches independently
+    created credentials by content.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    mine = credentials()
+    theirs = credentials()
+
+    by_user(theirs)['tony'].otp = 'JBSWY3DPEHPK3PXP'
+    theirs.add(Credential('timmy', 'password123', None, None, None, 'corp', 100, uid='x'))
+    theirs.add(Credential('carol', 'carolsPassword', None, None, None, None, 100))
+
+    merger = CredentialMerger()
+    merged = by_user(merger.merge(mine, theirs))
+
+    assert sorted(merged) == ['carol', 'jane', 'timmy', 'tony']
+    assert merged['tony'].otp == 'JBSWY3DPEHPK3PXP'
+    assert merged['timmy'].note == 'this is timmy'
+    assert (merger.added, merger.updated, merger.removed, merger.conflicts) == (1, 1, 0, 0)
+
+
+def test_sync():
+    '''
+    Test whether a three-way merge resolves fields and deletions against the base.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    base = credentials()
+    mine = copy.deepcopy(base)
+    theirs = copy.deepcopy(base)
+
+    mine_users, theirs_users = by_user(mine), by_user(theirs)
+
+    mine_users['timmy'].url = 'https://mine.example.com'
+    theirs_users['timmy'].otp = 'JBSWY3DPEHPK3PXP'
+
+    mine_users['tony'].url, mine_users['tony'].modified = 'https://old.example.com', 200
+    theirs_users['tony'].url, theirs_users['tony'].modified = 'https://new.example.com', 300
+
+    theirs.remove(theirs_users['jane'])
+
+    merger = CredentialMerger(base)
+    merged = by_user(merger.merge(mine, theirs))
+
+    assert sorted(merged) == ['timmy', 'tony']
+    assert merged['timmy'].url == 'https://mine.example.com'
+    assert merged['timmy'].otp == 'JBSWY3DPEHPK3PXP'
+    assert merged['tony'].url == 'https://new.example.com'
+    assert (merger.added, merger.updated, merger.removed, merger.conflicts) == (0, 2, 1, 1)
+
+
+def test_sync_file(store):
+    '''
+    Test whether merged credentials can be written to a credential file other than the
+    configured one, keeping its remaining content and compression.
+
+    Parameters:
+        store           Temporary credential store
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential('carol', 'carolsPassword', None, None, None, None, 0)})
+
+    mine = store.joinpath('mine.yml')
+    records = [cred.to_dict() for cred in credentials()]
+    mine.write_bytes(gzip.compress(yaml.dump({'credentials': records, 'default_domain': 'corp'}).encode('utf-8')))
+
+    credentials_mine, meta = CredentialMerger.read_file(mine)
+    CredentialMerger.write_file(mine, CredentialMerger().merge(credentials_mine, set()), meta)
+
+    assert Compression.detect(mine) == 'gzip'
+    assert Config.read_cred_file(mine)['default_domain'] == 'corp'
+    assert sorted(by_user(CredentialMerger.read(mine))) == ['jane', 'timmy', 'tony']
+    assert [cred.username for cred in Credential.from_file()] == ['carol']
+
+
+def test_merge_order():
+    '''
+    Test whether a merge keeps the order of the local credentials and appends the
+    added credentials in their original order, even if both sides use the same ids.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    Credential.reset_count()
+    theirs = {Credential(f't{ix}', 'password', None, None, None, None, 100) for ix in range(1, 4)}
+
+    Credential.reset_count()
+    mine = {Credential(f'm{ix}', 'password', None, None, None, None, 100) for ix in range(1, 5)}
+
+    merged = sorted(CredentialMerger().merge(mine, theirs), key=lambda x: x.id)
+
+    assert [cred.username for cred in merged] == ['m1', 'm2', 'm3', 'm4', 't1', 't2', 't3']
+    assert [cred.id for cred in merged] == list(range(1, 8))
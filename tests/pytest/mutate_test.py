@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+
+import pytest
+
+from ctfcred.mutate import Rule, Mutator, BloomFilter, MutationException
+
+
+@pytest.mark.parametrize('rule, word, expected', [
+    (':', 'p@ssW0rd', 'p@ssW0rd'),
+    ('l', 'p@ssW0rd', 'p@ssw0rd'),
+    ('u', 'p@ssW0rd', 'P@SSW0RD'),
+    ('c', 'p@ssW0rd', 'P@ssw0rd'),
+    ('C', 'p@ssW0rd', 'p@SSW0RD'),
+    ('t', 'p@ssW0rd', 'P@SSw0RD'),
+    ('T3', 'p@ssW0rd', 'p@sSW0rd'),
+    ('r', 'p@ssW0rd', 'dr0Wss@p'),
+    ('d', 'p@ssW0rd', 'p@ssW0rdp@ssW0rd'),
+    ('p2', 'abc', 'abcabcabc'),
+    ('f', 'p@ssW0rd', 'p@ssW0rddr0Wss@p'),
+    ('{', 'p@ssW0rd', '@ssW0rdp'),
+    ('}', 'p@ssW0rd', 'dp@ssW0r'),
+    ('$1 $2', 'p@ssW0rd', 'p@ssW0rd12'),
+    ('^1^2', 'p@ssW0rd', '21p@ssW0rd'),
+    ('[ ]', 'p@ssW0rd', '@ssW0r'),
+    ('D3', 'p@ssW0rd', 'p@sW0rd'),
+    ('x04', 'p@ssW0rd', 'p@ss'),
+    ('O12', 'p@ssW0rd', 'psW0rd'),
+    ('i4!', 'p@ssW0rd', 'p@ss!W0rd'),
+    ('o3$', 'p@ssW0rd', 'p@s$W0rd'),
+    ("'6", 'p@ssW0rd', 'p@ssW0'),
+    ('ss$', 'p@ssW0rd', 'p@$$W0rd'),
+    ('@s', 'p@ssW0rd', 'p@W0rd'),
+    ('z2', 'p@ssW0rd', 'ppp@ssW0rd'),
+    ('Z2', 'p@ssW0rd', 'p@ssW0rddd'),
+    ('q', 'abc', 'aabbcc'),
+    ('k', 'p@ssW0rd', '@pssW0rd'),
+    ('K', 'p@ssW0rd', 'p@ssW0dr'),
+    ('E', 'p@ss w0rd', 'P@ss W0rd'),
+])
+def test_rules(rule, word, expected):
+    '''
+    Test whether the supported rule functions behave like their hashcat counterparts.
+
+    Parameters:
+        rule            Rule to apply
+        word            Word to mutate
+        expected        Expected result
+
+    Returns:
+        None
+    '''
+    assert Rule(rule).apply(word) == expected
+
+
+def test_invalid_rules():
+    '''
+    Test whether unsupported or incomplete rules are rejected.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    with pytest.raises(MutationException, match='Unsupported rule function'):
+        Rule('X')
+
+    with pytest.raises(MutationException, match='Missing argument'):
+        Rule('s1')
+
+
+def test_bloom_filter():
+    '''
+    Test whether the bloom filter detects duplicates.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    bloom = BloomFilter(100000)
+
+    assert all(bloom.add(f'password{i}') for i in range(1000))
+    assert not any(bloom.add(f'password{i}') for i in range(1000))
+
+
+def test_mutator_candidates():
+    '''
+    Test whether the mutator deduplicates candidates and honors the per user limit.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    mutator = Mutator([':', 'l', 'c', '$1'], limit=2, with_user=True)
+
+    assert list(mutator.candidates(['password'])) == ['password', 'Password']
+    assert list(mutator.candidates(['password'], 'timmy')) == ['password', 'Password']
+    assert list(mutator.candidates(['password'], 'timmy')) == ['password1', 'timmy']
+
+    mutator = Mutator(['$1'], with_user=True)
+    assert list(mutator.candidates(['secret'], 'tony')) == ['secret1', 'tony1', 'secrettony1']
+
+
+def test_mutator_filter(monkeypatch):
+    '''
+    Test whether each user gets its own filter and whether large amounts of candidates
+    are deduplicated by a bloom filter sized for the user.
+
+    Parameters:
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Mutator, 'exact_threshold', 10)
+
+    mutator = Mutator([':', 'c', 'u', '$1', '$2', '$3'])
+    words = [f'password{ix}x' for ix in range(100)]
+
+    for user in ['timmy', 'tony']:
+
+        candidates = list(mutator.candidates(words, user))
+
+        assert isinstance(mutator.seen[1], BloomFilter)
+        assert mutator.seen[1].size >= BloomFilter(len(words) * 6).size
+        assert len(candidates) == len(set(candidates)) == len(words) * 6
+
+
+def test_mutator_pool(monkeypatch):
+    '''
+    Test whether mutations created by the process pool match the sequential ones and
+    are returned in the same order.
+
+    Parameters:
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    rules = [f'${i}' for i in range(10)] + ['c', 'u']
+
+    words = ['password', 'secret', 'winter', 'summer', 'autumn']
+    expected = list(Mutator(rules).candidates(words))
+
+    monkeypatch.setattr(Mutator, 'chunk_size', 2)
+    monkeypatch.setattr(Mutator, 'pool_threshold', 1)
+
+    assert list(Mutator(rules).candidates(words)) == expected
+    assert list(Mutator(rules, limit=5).candidates(words)) == expected[:5]
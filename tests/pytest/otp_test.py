@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+
+import pyotp
+
+from ctfcred.otp import TOTPEngine
+
+
+def test_engine_codes():
+    '''
+    Test whether the TOTPEngine computes the same codes as pyotp.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    engine = TOTPEngine(['otpo', 'thisistoniesotpsecret'])
+
+    assert engine.get('otpo') == pyotp.TOTP('otpo').now()
+    assert engine.get('thisistoniesotpsecret') == pyotp.TOTP('thisistoniesotpsecret').now()
+    assert 0 < engine.remaining() <= engine.interval
+
+
+def test_engine_invalid():
+    '''
+    Test whether invalid secrets are detected during loading.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    engine = TOTPEngine(['otpo', 'thisisanotpsecret', 'b@d!'])
+
+    assert engine.invalid == {'thisisanotpsecret', 'b@d!'}
+    assert engine.get('b@d!') is None
+    assert engine.get(None) is None
+    assert engine.column('b@d!').strip() == 'invalid'
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+import pytest
+
+from ctfcred.config import Config
+from ctfcred.credential import Credential
+from ctfcred.parsers import LootParser, UnknownLootFormat
+
+
+nt = '31d6cfe0d16ae931b73c59d7e0c089c0'
+lm = 'aad3b435b51404eeaad3b435b51404ee'
+ntlmv2 = 'jane::CORP:1122334455667788:' + 'ab' * 16 + ':0101000000000000'
+
+
+@pytest.mark.parametrize('fmt,line,expected', [
+    ('secretsdump', f'corp.local\\timmy:1103:{lm}:{nt}:::', ('timmy', None, 'corp.local', nt)),
+    ('secretsdump', f'Administrator:500:{lm}:{nt.upper()}:::', ('Administrator', None, None, nt)),
+    ('secretsdump', 'CORP\\carol:CLEARTEXT:Summer2021!', ('carol', 'Summer2021!', 'CORP', None)),
+    ('potfile', f'{nt}:password123', (None, 'password123', None, nt)),
+    ('potfile', f'{nt}:$HEX[703a77]', (None, 'p:w', None, nt)),
+    ('potfile', f'{ntlmv2}:Winter2021', (None, 'Winter2021', None, ntlmv2)),
+    ('netexec', 'SMB  10.0.0.1  445  DC01  [+] corp.local\\alex:S3cur3 (Pwn3d!)', ('alex', 'S3cur3', 'corp.local', None)),
+    ('netexec', f'SMB  10.0.0.1  445  DC01  \x1b[32m[+]\x1b[0m CORP\\alex:{lm}:{nt}', ('alex', None, 'CORP', nt)),
+    ('responder', f'[SMB] NTLMv2-SSP Hash     : {ntlmv2}', ('jane', None, 'CORP', ntlmv2)),
+    ('netexec', 'SMB  10.0.0.1  445  DC01  [-] corp.local\\alex:wrong STATUS_LOGON_FAILURE', None),
+    ('secretsdump', '[*] Dumping Domain Credentials (domain\\uid:rid:lmhash:nthash)', None),
+])
+def test_parse(fmt, line, expected):
+    '''
+    Test whether loot lines are parsed into the expected records.
+
+    Parameters:
+        fmt             Loot format
+        line            Line to parse
+        expected        Expected record
+
+    Returns:
+        None
+    '''
+    records = list(LootParser(fmt).parse([line + '\n']))
+    assert records == ([expected] if expected else [])
+
+
+def test_detect(tmp_path):
+    '''
+    Test whether loot formats are detected and unknown formats are rejected.
+
+    Parameters:
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    loot = tmp_path / 'ntds'
+    loot.write_text(f'[*] Using the DRSUAPI method\ncorp\\timmy:1103:{lm}:{nt}:::\n')
+
+    assert LootParser.detect(loot) == 'secretsdump'
+
+    loot.write_text(f'{nt}:password123\n')
+    assert LootParser.detect(loot) == 'potfile'
+
+    loot.write_text('nothing to see here\n')
+
+    with pytest.raises(UnknownLootFormat):
+        LootParser.detect(loot)
+
+    with pytest.raises(UnknownLootFormat):
+        LootParser('unknown')
+
+
+def test_import_loot():
+    '''
+    Test whether cracked hashes are joined into stored credentials.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    credentials = {Credential('alice', 'secret', None, None, None, None, 0)}
+
+    dump = LootParser('secretsdump').parse([f'corp\\timmy:1103:{lm}:{nt}:::', f'corp\\carol:1104:{lm}:{"0" * 32}:::'])
+    credentials = Credential.import_loot(credentials, dump)
+
+    potfile = LootParser('potfile').parse([f'{nt}:password123'])
+    credentials = Credential.import_loot(credentials, potfile)
+
+    passwords = {cred.username: cred.password for cred in credentials}
+    assert passwords == {'alice': 'secret', 'timmy': 'password123', 'carol': None}
+
+    dump = LootParser('netexec').parse([f'[+] corp\\jane:{nt}'])
+    credentials = Credential.import_loot(credentials, dump)
+
+    jane = next(cred for cred in credentials if cred.username == 'jane')
+    assert jane.password == 'password123' and jane.hash == nt
+
+
+def test_import_files(tmp_path, monkeypatch):
+    '''
+    Test whether multiple files are imported with one batch per file and duplicates
+    across files are only added once.
+
+    Parameters:
+        tmp_path        Temporary directory
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    (tmp_path / 'a.txt').write_text('corp\\timmy:password123\ncarol:secret\ncarol:secret\n')
+    (tmp_path / 'b.txt').write_text(f'corp\\timmy:1103:{lm}:{nt}:::\n')
+    (tmp_path / 'c.txt').write_text('corp/timmy:password123\njane:\n')
+
+    monkeypatch.setattr(Config, 'imports', {})
+    filenames = sorted(tmp_path.iterdir())
+    credentials = Credential.import_files(set(), filenames)
+
+    users = sorted(((cred.domain, cred.username, cred.password, cred.batch) for cred in credentials), key=str)
+
+    assert users == [('corp', 'timmy', 'password123', 1), ('corp', 'timmy', None, 2), (None, 'carol', 'secret', 1),
+                     (None, 'jane', None, 3)]
+
+
+def test_import_files_passwords(tmp_path, monkeypatch, capsys):
+    '''
+    Test whether password only user-pass lines are imported as credentials and whether
+    only rejected credentials are reported as duplicates.
+
+    Parameters:
+        tmp_path        Temporary directory
+        monkeypatch     pytest monkeypatch fixture
+        capsys          pytest capsys fixture
+
+    Returns:
+        None
+    '''
+    (tmp_path / 'a.txt').write_text(':fresh\n')
+    (tmp_path / 'b.txt').write_text(':fresh\ncarol:secret\n')
+
+    monkeypatch.setattr(Config, 'imports', {})
+    credentials = Credential.import_files(set(), [tmp_path / 'a.txt', tmp_path / 'b.txt'])
+
+    assert sorted(((cred.username, cred.password) for cred in credentials), key=str) == [('carol', 'secret'), (None, 'fresh')]
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[2:6] == ['1', 'new', '0', 'duplicate']
+    assert lines[1].split()[2:6] == ['1', 'new', '1', 'duplicate']
+
+
+def test_undo_import(store, tmp_path):
+    '''
+    Test whether undoing an import batch removes the credentials with the recorded
+    uids and whether batches without recorded uids are removed by their batch.
+
+    Parameters:
+        store           Temporary credential store
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    (tmp_path / 'a.txt').write_text('carol:secret\njane:secret\n')
+    (tmp_path / 'b.txt').write_text('alex:secret\n')
+
+    credentials = {Credential('timmy', 'password123', None, None, None, None, 0)}
+    credentials = Credential.import_files(credentials, [tmp_path / 'a.txt', tmp_path / 'b.txt'])
+    Credential.to_file(credentials)
+
+    assert sorted(Config.imports[1]['uids']) == sorted(cred.uid for cred in credentials if cred.batch == 1)
+
+    Credential.undo_import(1)
+    assert sorted(cred.username for cred in Credential.from_file()) == ['alex', 'timmy']
+
+    credentials = Credential.from_file()
+    del Config.imports[2]['uids']
+    Credential.to_file(credentials)
+
+    Credential.undo_import(2)
+    assert [cred.username for cred in Credential.from_file()] == ['timmy']
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+import curses
+
+from ctfcred.picker import Picker
+
+
+rows = [
+         '1.  timmy               https://example.com   P  this is timmy\n',
+         '2.  tony                                      P  Admin account\n',
+         '3.  jane                https://example.org   P  \n',
+         '4.  Tommy               https://test.com         \n',
+       ]
+
+
+def test_picker_search():
+    '''
+    Test whether rows are filtered case insensitive by all query tokens.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    picker = Picker(rows)
+
+    assert picker.search('') == [0, 1, 2, 3]
+    assert picker.search('t') == [0, 1, 2, 3]
+    assert picker.search('tom') == [3]
+    assert picker.search('example') == [0, 2]
+    assert picker.search('example .org') == [2]
+    assert picker.search('admin') == [1]
+    assert picker.search('missing') == []
+
+
+def test_picker_incremental():
+    '''
+    Test whether extended queries only filter the previous results and whether the
+    selection contains marked rows.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    picker = Picker(rows, multi=True)
+
+    picker.update('https')
+    assert picker.results == [0, 2, 3]
+
+    picker.find = None
+    picker.update('https://example')
+
+    assert picker.results == [0, 2]
+    assert picker.selection() == [0]
+
+    picker.marked = [2, 0]
+    assert picker.selection() == [2, 0]
+
+    assert Picker([]).search('timmy') == []
+
+
+def test_picker_offsets():
+    '''
+    Test whether rare tokens are mapped to the correct rows when lower casing changes
+    the length of a row.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    rows = ['İİİİİİİİ admin', 'user0 ab', 'user1 cd'] + [f'user{index}' for index in range(2, 32)]
+    picker = Picker(rows)
+
+    assert picker.search('ab') == [1]
+    assert picker.search('cd') == [2]
+    assert picker.search('admin') == [0]
+
+
+class Screen:
+    '''
+    Minimal replacement for a curses window that returns predefined key presses.
+    '''
+
+    def __init__(self, keys: list) -> None:
+        self.keys = list(keys)
+
+    def keypad(self, flag: bool) -> None:
+        pass
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return (4, 80)
+
+    def get_wch(self):
+        return self.keys.pop(0)
+
+
+def test_picker_keys(monkeypatch):
+    '''
+    Test whether key presses are dispatched to navigation, editing and actions.
+
+    Parameters:
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(curses, 'raw', lambda: None)
+    monkeypatch.setattr(Picker, 'draw', lambda self, screen: None)
+
+    keys = ['e', 'x', curses.KEY_BACKSPACE, curses.KEY_DOWN, curses.KEY_NPAGE, curses.KEY_UP, '\x15']
+    assert Picker(rows).loop(Screen(keys)) == (20, [2])
+
+    keys = ['t', 'o', 'm', '\n']
+    assert Picker(rows).loop(Screen(keys)) == (0, [3])
+
+    keys = ['\t', '\t', curses.KEY_SR]
+    assert Picker(rows, multi=True).loop(Screen(keys)) == (17, [0, 1])
+
+    keys = ['z', '\n', '\x1b']
+    assert Picker(rows).loop(Screen(keys)) == (1, [])
@@ -23,7 +23,7 @@ def test_overwrite_launcher(cred):
     Launcher.notify_send = lambda *args: None
 
 
-@pytest.mark.usefixtures('cred_list')
+@pytest.mark.usefixtures('cred_list', 'store')
 def test_delete(cred_list):
     '''
     Test whether delete operation is working.
@@ -248,7 +248,7 @@ def test_default_user_domain_copy(cred_list):
         assert copied_user_domain == compare
 
 
-@pytest.mark.usefixtures('cred_list')
+@pytest.mark.usefixtures('cred_list', 'store')
 def test_move_up(cred_list):
     '''
     Test whether moving credentials is working.
@@ -271,7 +271,7 @@ def test_move_up(cred_list):
     assert cred1_id == cred_list[0].id
 
 
-@pytest.mark.usefixtures('cred_list')
+@pytest.mark.usefixtures('cred_list', 'store')
 def test_move_down(cred_list):
     '''
     Test whether moving credentials is working.
@@ -292,3 +292,67 @@ def test_move_down(cred_list):
 
     assert cred0_id == cred_list[1].id
     assert cred1_id == cred_list[0].id
+
+
+@pytest.mark.usefixtures('cred_list', 'store')
+def test_multi_copy(cred_list):
+    '''
+    Test whether copy operations on multiple credentials copy one line per credential.
+
+    Parameters:
+        cred_list       List of credential objects
+
+    Returns:
+        None
+    '''
+    Launcher.handle_exit(20, cred_list[:2], cred_list)
+    assert pyperclip.paste() == 'timmy:password123\ntony:tonyPassword'
+
+    Launcher.handle_exit(10, cred_list, cred_list)
+    assert pyperclip.paste() == 'password123\ntonyPassword\nlonelypassword'
+
+    Launcher.handle_exit(20, cred_list[3], cred_list)
+    assert pyperclip.paste() == ':lonelypassword'
+
+
+@pytest.mark.usefixtures('cred_list', 'store')
+def test_multi_delete(cred_list):
+    '''
+    Test whether multiple credentials are deleted at once.
+
+    Parameters:
+        cred_list       List of credential objects
+
+    Returns:
+        None
+    '''
+    selection = cred_list[1:3]
+
+    with pytest.raises(ctfcred.launcher.RofiException, match="rofi returned unexpected return code: 99"):
+        Launcher.handle_exit(12, selection, cred_list)
+
+    assert len(cred_list) == 2
+    assert all(cred not in cred_list for cred in selection)
+
+
+@pytest.mark.usefixtures('cred_list', 'store')
+def test_multi_move(cred_list):
+    '''
+    Test whether multiple credentials are moved as a block.
+
+    Parameters:
+        cred_list       List of credential objects
+
+    Returns:
+        None
+    '''
+    ids = [cred.id for cred in cred_list]
+
+    with pytest.raises(ctfcred.launcher.RofiException, match="rofi returned unexpected return code: 99"):
+        Launcher.handle_exit(17, cred_list[1:3], cred_list)
+
+    assert [cred.id for cred in cred_list] == [ids[2], ids[0], ids[1], ids[3]]
+
+    Launcher.handle_exit(17, cred_list[1:3], cred_list)
+
+    assert [cred.id for cred in cred_list] == [ids[2], ids[0], ids[1], ids[3]]
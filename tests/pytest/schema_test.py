@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import yaml
+import ctfcred
+import pytest
+
+from datetime import datetime
+
+
+def test_migrate_records():
+    '''
+    Checks that records of older schema versions are upgraded to the current version.
+    '''
+    old = {'username': 'timmy', 'password': 'password123', 'note': datetime(2020, 1, 1), 'timestamp': 1.0}
+    custom = {'username': 'tony', 'password': None, 'note': 'admin', 'url': 'https://example.com', 'timestamp': 1.0}
+
+    records = list(ctfcred.Schema.records([old, custom], 0))
+    current = ctfcred.Credential('jane', None, None, None, None, None, 0).to_dict()
+
+    for record in records:
+        assert sorted(record) == sorted(current)
+
+    assert records[0]['custom_note'] is False
+    assert records[0]['modified'] == 1.0
+    assert records[1]['custom_note'] is True
+    assert records[1]['url'] == 'https://example.com'
+
+
+def test_migrate_file(store):
+    '''
+    Checks that an old credential file can be read and is only upgraded once it is
+    written again.
+    '''
+    records = [{'username': 'timmy', 'password': 'password123', 'otp': None, 'note': 'this is timmy',
+                'url': None, 'domain': None, 'timestamp': 1.0}]
+
+    with open(ctfcred.Config.credential_file, 'w') as file:
+        yaml.dump({'credentials': records}, file)
+
+    credentials = ctfcred.Credential.from_file()
+    cred = credentials.pop()
+
+    assert cred.username == 'timmy' and cred.note == 'this is timmy' and cred.custom_note
+    assert 'schema' not in ctfcred.Config.credential_file.read_text()
+
+    ctfcred.Credential.to_file({cred})
+    yml = ctfcred.Config.read_cred_file(ctfcred.Config.credential_file)
+
+    assert yml['schema'] == ctfcred.Schema.version
+    assert 'alias' in yml['credentials'][0]
+
+
+def test_missing_attribute():
+    '''
+    Checks that records that lack required attributes are still rejected.
+    '''
+    with pytest.raises(ctfcred.credential.MissingCredentialAttribute):
+        ctfcred.Credential.from_records([{'password': 'password123', 'note': None}], 0)
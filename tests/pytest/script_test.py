@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+import stat
+
+from ctfcred.config import Config
+from ctfcred.script import RofiScript
+from ctfcred.credential import Credential
+
+
+def callback(monkeypatch, capsys, code: int, uid: str = None) -> list[str]:
+    '''
+    Runs a rofi script mode callback and returns the printed rows without mode options.
+    '''
+    monkeypatch.setenv('ROFI_RETV', str(code))
+
+    if uid:
+        monkeypatch.setenv('ROFI_INFO', uid)
+
+    RofiScript.run()
+    return capsys.readouterr().out.splitlines()
+
+
+def test_script_rows(store, monkeypatch, capsys):
+    '''
+    Test whether the initial callback prints all rows and creates the row cache.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+        capsys          pytest capsys fixture
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential(name, 'password', None, None, None, None, 0) for name in ['timmy', 'tony', 'jane']})
+    uids = [cred.uid for cred in sorted(Credential.from_file(), key=lambda x: x.id)]
+
+    lines = callback(monkeypatch, capsys, 0)
+
+    assert '\0no-custom\x1ftrue' in lines and '\0new-selection\x1f0' in lines
+    assert [line.split('\x1f')[-1] for line in lines[4:]] == uids
+    assert Config.row_cache.is_file()
+    assert stat.S_IMODE(Config.row_cache.stat().st_mode) == 0o600
+
+    cache = RofiScript.read_cache()
+    assert [record['uid'] for record in cache['records']] == uids
+
+    Credential.to_file(Credential.from_file() | {Credential('carol', None, None, None, None, None, 0)})
+    assert RofiScript.read_cache() is None
+
+
+def test_script_actions(store, monkeypatch, capsys):
+    '''
+    Test whether move and delete callbacks update the credential file and keep the cursor
+    on the affected credential.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+        capsys          pytest capsys fixture
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential(name, 'password', None, None, None, None, 0) for name in ['timmy', 'tony', 'jane']})
+    creds = sorted(Credential.from_file(), key=lambda x: x.id)
+
+    callback(monkeypatch, capsys, 0)
+    lines = callback(monkeypatch, capsys, 17, creds[2].uid)
+
+    assert '\0new-selection\x1f1' in lines
+    usernames = [cred.username for cred in sorted(Credential.from_file(), key=lambda x: x.id)]
+    assert usernames == [creds[0].username, creds[2].username, creds[1].username]
+
+    lines = callback(monkeypatch, capsys, 12, creds[0].uid)
+
+    assert len(lines) == 4 + 2
+    assert creds[0].username not in {cred.username for cred in Credential.from_file()}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import ctfcred
+import pytest
+import itertools
+
+
+@pytest.fixture
+def spray_creds():
+    '''
+    Returns credentials with reused passwords and users without password.
+
+    Parameters:
+        None
+
+    Returns:
+        list            List of Credential objects
+    '''
+    ctfcred.Credential.reset_count()
+
+    creds = [ctfcred.Credential(f'user{ctr}', None, None, None, None, None, 0) for ctr in range(20)]
+    creds += [ctfcred.Credential(f'admin{ctr}', f'Password{ctr % 3}', None, None, None, None, 0) for ctr in range(7)]
+    creds += [ctfcred.Credential(None, f'Winter202{ctr}', None, None, None, None, 0) for ctr in range(5)]
+
+    return creds
+
+
+def test_spray_plan(spray_creds):
+    '''
+    Test whether each combination that is not stored is planned exactly once and whether
+    no user gets more attempts per round than the lockout policy allows.
+
+    Parameters:
+        spray_creds     List of credential objects
+
+    Returns:
+        None
+    '''
+    plan = ctfcred.SprayPlan(spray_creds, 4, 1800)
+    attempts = list(plan.rounds())
+
+    known = {(cred.username, cred.password) for cred in spray_creds if cred.username and cred.password}
+    users = {cred.username for cred in spray_creds if cred.username}
+    passwords = {cred.password for cred in spray_creds if cred.password}
+
+    planned = [(user, password) for number, user, password in attempts]
+
+    assert len(planned) == len(set(planned))
+    assert set(planned) == set(itertools.product(users, passwords)) - known
+
+    for number, group in itertools.groupby(attempts, key=lambda x: x[0]):
+
+        group = list(group)
+        counts = {user: sum(1 for attempt in group if attempt[1] == user) for user in users}
+
+        assert max(counts.values()) <= 3
+        ranks = [plan.passwords.index(attempt[2]) for attempt in group]
+        assert ranks == sorted(ranks)
+
+
+def test_spray_order(spray_creds):
+    '''
+    Test whether reused passwords are sprayed first and whether rounds are separated by
+    the observation window.
+
+    Parameters:
+        spray_creds     List of credential objects
+
+    Returns:
+        None
+    '''
+    plan = ctfcred.SprayPlan(spray_creds, 2, 600)
+
+    assert plan.passwords[:3] == ['Password0', 'Password1', 'Password2']
+
+    lines = list(plan.lines(':', 0))
+    first = [line.split('\t') for line in lines if line.startswith('1\t')]
+    second = [line.split('\t') for line in lines if line.startswith('2\t')]
+
+    assert {line[2] for line in first} >= {f'user{ctr}:Password0' for ctr in range(20)}
+    assert second[0][1] > first[0][1]
+
+    with pytest.raises(ctfcred.SprayException):
+        ctfcred.SprayPlan(spray_creds, 1, 600)
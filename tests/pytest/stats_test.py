@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import ctfcred
+import pytest
+
+
+def test_space_saving():
+    '''
+    Checks that frequent items are tracked when the summary runs out of counters.
+    '''
+    summary = ctfcred.SpaceSaving(4)
+
+    for ctr in range(200):
+        summary.add('Winter2024!' if ctr % 3 == 0 else f'unique{ctr}')
+
+    item, count, error = summary.top(1)[0]
+
+    assert item == 'Winter2024!'
+    assert count - error <= 67 <= count
+
+
+@pytest.mark.parametrize('domain', [False, True])
+def test_mix_size(capsysbinary, cred_list, monkeypatch, domain):
+    '''
+    Compares the estimated --mix size with the actual export.
+    '''
+    monkeypatch.setattr(ctfcred.Config, 'delimiter', '\n')
+
+    cred_list.append(ctfcred.Credential('admin', 'password123', None, None, None, 'corp.local', 0))
+    cred_list.append(ctfcred.Credential('tony', 'Sommer2024', None, None, None, None, 0))
+
+    stats = ctfcred.Statistics.collect(cred_list, '::')
+    ctfcred.Credential.export_user_pass(cred_list, '::', True, domain, False)
+
+    output = capsysbinary.readouterr().out
+    size = stats.mix_size(domain)
+
+    assert size == {'lines': output.count(b'\n'), 'bytes': len(output)}
+
+
+def test_stats(cred_list, monkeypatch):
+    '''
+    Checks the counters of the statistics.
+    '''
+    monkeypatch.setattr(ctfcred.Config, 'default_domain', None)
+
+    cred_list.append(ctfcred.Credential('admin', 'password123', 'Import', None, None, 'corp.local', 0, batch=1))
+    cred_list.append(ctfcred.Credential('root', 'password123', None, None, None, 'corp.local', 0))
+
+    stats = ctfcred.Statistics.collect(cred_list).to_dict()
+
+    assert stats['credentials'] == 6
+    assert stats['imported'] == 1
+    assert stats['with']['otp'] == 1
+    assert stats['with']['password'] == 5
+    assert stats['distinct_passwords'] == 3
+    assert stats['reused_passwords'] == 1
+    assert stats['password_reuses'] == 2
+    assert stats['users_per_domain'] == {'': 2, 'corp.local': 2, 'exmaple.com': 1}
+    assert stats['top_passwords'] == [{'password': 'password123', 'count': 3, 'error': 0}]
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+import pytest
+
+from ctfcred.template import Template, TemplateException
+
+
+@pytest.mark.parametrize('template,expected', [
+    ('{user}:{pass}', 'timmy:p@ss w0rd'),
+    ('{domain|upper}\\{user}', 'CORP.LOCAL\\timmy'),
+    ('{user}@{domain}', 'timmy@corp.local'),
+    ('{pass|b64}', 'cEBzcyB3MHJk'),
+    ('{pass|urlencode}', 'p%40ss%20w0rd'),
+    ('{"user": {user|json}, "pass": {pass|json}}', '{"user": "timmy", "pass": "p@ss w0rd"}'),
+    ('{{user}}', '{timmy}'),
+])
+def test_template(template, expected):
+    '''
+    Test whether templates are formatted as expected.
+
+    Parameters:
+        template        Template to compile
+        expected        Expected output
+
+    Returns:
+        None
+    '''
+    assert Template(template).format('timmy', 'corp.local', 'p@ss w0rd') == expected
+
+
+def test_template_missing():
+    '''
+    Test whether missing values are rendered as empty strings or json null.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    assert Template('{domain|upper}/{user}').format('timmy', None, None) == '/timmy'
+    assert Template('{domain|json}').format('timmy', None, None) == 'null'
+
+
+def test_template_nt():
+    '''
+    Test whether the nt transform creates NT hashes.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    template = Template('{user}:{pass|nt|upper}')
+    assert template.format('timmy', None, 'password') == 'timmy:8846F7EAEE8FB117AD06BDD830B7586C'
+
+
+def test_template_errors():
+    '''
+    Test whether invalid templates are rejected.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    with pytest.raises(TemplateException):
+        Template('{user|rot13}')
+
+    with pytest.raises(TemplateException):
+        Template('no placeholder')
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+import io
+import stat
+import itertools
+
+from ctfcred.config import Config
+from ctfcred.credential import Credential
+from ctfcred.utils import OutputWriter, ShardWriter, sample
+
+
+def test_writer_delimiter():
+    '''
+    Test whether the output writer appends the configured delimiter.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    stream = io.BytesIO()
+
+    with OutputWriter(stream, '\0') as writer:
+        writer.write_all(['timmy', 'tony'])
+
+    assert stream.getvalue() == b'timmy\0tony\0'
+
+
+def test_writer_chunks():
+    '''
+    Test whether the output writer buffers items and flushes them in chunks.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    stream = io.BytesIO()
+    writer = OutputWriter(stream)
+
+    writer.write('timmy')
+    assert stream.getvalue() == b''
+
+    writer.write_all(f'user{i}' for i in range(OutputWriter.chunk_size))
+    assert len(stream.getvalue()) >= OutputWriter.chunk_size
+
+    writer.flush()
+    assert stream.getvalue().count(b'\n') == OutputWriter.chunk_size + 1
+
+
+def test_sample():
+    '''
+    Test whether sampling is deterministic and selects roughly the requested fraction.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    '''
+    first = list(sample(range(100000), 0.1))
+    second = list(sample(range(100000), 0.1))
+
+    assert first == second
+    assert 9000 < len(first) < 11000
+    assert list(sample(range(10), 1)) == list(range(10))
+
+
+def test_shard_writer(tmp_path):
+    '''
+    Test whether all items of a user end up within the same shard and no item is lost.
+
+    Parameters:
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    items = [(f'user{u}', f'user{u}:pass{p}') for u, p in itertools.product(range(50), range(100))]
+
+    for mode in ShardWriter.modes:
+
+        with ShardWriter(tmp_path.joinpath(mode), 4, mode) as writer:
+            writer.write_all(items)
+
+        shards = [path.read_text().splitlines() for path in writer.paths]
+
+        assert sorted(itertools.chain(*shards)) == sorted(item for user, item in items)
+        assert sum(writer.lines) == len(items)
+
+        for lines in shards:
+            users = {line.split(':')[0] for line in lines}
+            assert len(lines) == 100 * len(users)
+            assert not any(users & {line.split(':')[0] for line in other} for other in shards if other is not lines)
+
+
+def test_store_permissions(store):
+    '''
+    Test whether new credential files are only accessible by the current user and
+    whether existing credential files keep their permissions when they are rewritten.
+
+    Parameters:
+        store           Temporary credential store
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential('timmy', 'password123', None, None, None, None, 0)})
+    assert stat.S_IMODE(Config.credential_file.stat().st_mode) == 0o600
+
+    Config.credential_file.chmod(0o640)
+    Credential.to_file({Credential('tony', 'tonyPassword', None, None, None, None, 0)})
+    assert stat.S_IMODE(Config.credential_file.stat().st_mode) == 0o640
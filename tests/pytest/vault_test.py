@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+
+import pytest
+import threading
+
+from ctfcred.config import Config
+from ctfcred.history import History
+from ctfcred.credential import Credential
+from ctfcred.vault import Agent, Vault, VaultException
+
+
+@pytest.fixture
+def vault(store, monkeypatch):
+    '''
+    Prepares a temporary store for encryption. Key derivation is made cheap and no
+    agent process is started.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        Path            Temporary directory
+    '''
+    monkeypatch.setattr(Vault, 'scrypt', {'n': 2 ** 10, 'r': 8, 'p': 1})
+    monkeypatch.setattr(Vault, 'keys', {})
+    monkeypatch.setattr(Vault, 'headers', {})
+    monkeypatch.setattr(Vault, 'chunks', {})
+    monkeypatch.setattr(Agent, 'start', lambda key, ttl: None)
+    monkeypatch.setenv('CTFCRED_PASSWORD', 'secret')
+
+    return store
+
+
+def forget(monkeypatch):
+    '''
+    Drops all cached keys and chunks, as if a new process was started.
+    '''
+    monkeypatch.setattr(Vault, 'keys', {})
+    monkeypatch.setattr(Vault, 'headers', {})
+    monkeypatch.setattr(Vault, 'chunks', {})
+    monkeypatch.setattr(Config, 'encrypted', None)
+
+
+def test_encrypt(vault, monkeypatch):
+    '''
+    Test whether an encrypted credential file can be read again and contains no plaintext.
+
+    Parameters:
+        vault           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential('timmy', 'password123', 'this is timmy', None, None, 'corp.local', 0)})
+
+    Config.hash_cache.write_text('{}')
+    Config.row_cache.write_text('{}')
+
+    Vault.encrypt('secret')
+    Credential.to_file(Credential.from_file())
+
+    data = Config.credential_file.read_bytes()
+
+    assert data.startswith(Config.vault_magic)
+    assert b'password123' not in data
+    assert not Config.column_dir.exists() and not Config.completion_dir.exists()
+    assert not Config.hash_cache.exists() and not Config.row_cache.exists()
+
+    forget(monkeypatch)
+    cred = Credential.from_file().pop()
+
+    assert (cred.username, cred.password, cred.domain, cred.note) == ('timmy', 'password123', 'corp.local', 'this is timmy')
+
+    forget(monkeypatch)
+    monkeypatch.setenv('CTFCRED_PASSWORD', 'wrong')
+
+    with pytest.raises(VaultException):
+        Credential.from_file()
+
+
+def test_unlock_start(vault, monkeypatch):
+    '''
+    Test whether an agent is only started after asking for the password if requested.
+
+    Parameters:
+        vault           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential('timmy', 'password123', None, None, None, None, 0)})
+
+    Vault.encrypt('secret')
+    Credential.to_file(Credential.from_file())
+
+    started = []
+    monkeypatch.setattr(Agent, 'start', lambda key, ttl: started.append(key))
+    monkeypatch.setattr(Agent, 'get', lambda: None)
+
+    forget(monkeypatch)
+    key = Vault.unlock(Vault.header(Config.credential_file), start=False)
+    assert started == []
+
+    forget(monkeypatch)
+    assert Vault.unlock(Vault.header(Config.credential_file)) == key
+    assert started == [key]
+
+
+def test_encrypt_chunks(vault, monkeypatch):
+    '''
+    Test whether an edit only re-encrypts the chunk that contains the edited record and
+    whether replaced chunks are detected.
+
+    Parameters:
+        vault           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    Vault.encrypt('secret')
+    Credential.to_file({Credential(f'user{ix}', f'pass{ix}', None, None, None, None, 0) for ix in range(1000)})
+
+    forget(monkeypatch)
+    credentials = Credential.from_file()
+    before = Config.credential_file.read_bytes().split(b'\n')
+
+    next(cred for cred in credentials if cred.username == 'user500').password = 'changed'
+    Credential.to_file(credentials)
+
+    after = Config.credential_file.read_bytes().split(b'\n')
+    changed = set(after[3:]) - set(before[3:])
+
+    assert len(after) > 10 and len(changed) == 1
+
+    forget(monkeypatch)
+    assert 'changed' in {cred.password for cred in Credential.from_file()}
+
+    lines = list(after)
+    lines[3] = lines[3].split(b' ')[0] + b' ' + lines[4].split(b' ')[1]
+    Config.credential_file.write_bytes(b'\n'.join(lines))
+
+    forget(monkeypatch)
+
+    with pytest.raises(VaultException):
+        Credential.from_file()
+
+
+def test_encrypt_history(vault, monkeypatch):
+    '''
+    Test whether history blobs are encrypted and can be restored.
+
+    Parameters:
+        vault           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    Credential.to_file({Credential('timmy', 'password123', None, None, None, None, 0)})
+
+    Vault.encrypt('secret')
+    Credential.to_file(Credential.from_file())
+    History.reseal()
+
+    pack = Config.history_dir.joinpath('objects.pack')
+    assert b'password123' not in pack.read_bytes()
+
+    forget(monkeypatch)
+    records = History.restore(History.versions()[-1])
+
+    assert records[0]['password'] == 'password123'
+
+
+def test_agent(store):
+    '''
+    Test whether the agent hands out its key and stops when it is locked.
+
+    Parameters:
+        store           Temporary credential store
+
+    Returns:
+        None
+    '''
+    key = bytes(range(64))
+
+    server = Agent.listen()
+    thread = threading.Thread(target=Agent.serve, args=(server, key, 30))
+    thread.start()
+
+    assert Agent.get() == key
+    assert Agent.lock()
+
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert Agent.get() is None
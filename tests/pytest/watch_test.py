@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+
+import os
+
+from ctfcred.config import Config
+from ctfcred.watch import Inotify, Watcher
+
+
+def test_watch_offsets(store):
+    '''
+    Test whether only complete new lines are imported and log rotation is detected.
+
+    Parameters:
+        store           Temporary credential store
+
+    Returns:
+        None
+    '''
+    tmp_path = store
+    loot = tmp_path.joinpath('loot.txt')
+    loot.write_text('alex:S3cur3P@55w0rd\ntimmy:pass')
+
+    watcher = Watcher([str(loot)], 'userpass')
+    watcher.read(loot)
+    watcher.flush()
+
+    assert {cred.username for cred in watcher.credentials} == {'alex'}
+
+    with open(loot, 'a') as file:
+        file.write('word123\nalex:S3cur3P@55w0rd\n')
+
+    watcher.read(loot)
+    watcher.flush()
+
+    credentials = {(cred.username, cred.password) for cred in watcher.credentials}
+    assert credentials == {('alex', 'S3cur3P@55w0rd'), ('timmy', 'password123')}
+    assert Config.imports[1]['new'] == 2
+
+    os.rename(loot, tmp_path.joinpath('loot.txt.1'))
+    loot.write_text('jane:janesPassword\n')
+
+    watcher.read(loot)
+    watcher.flush()
+
+    assert len(watcher.credentials) == 3
+    assert Config.imports[1]['new'] == 3
+
+
+def test_watch_chunks(store, monkeypatch):
+    '''
+    Test whether large files are read in chunks and whether pending records are written
+    while reading, including lines that are longer than a chunk.
+
+    Parameters:
+        store           Temporary credential store
+        monkeypatch     pytest monkeypatch fixture
+
+    Returns:
+        None
+    '''
+    monkeypatch.setattr(Watcher, 'read_size', 16)
+    monkeypatch.setattr(Watcher, 'batch_size', 2)
+
+    users = [f'user{index}' for index in range(8)] + ['a' * 40]
+    loot = store.joinpath('loot.txt')
+    loot.write_text(''.join(f'{user}:password\n' for user in users) + 'timmy:pass')
+
+    watcher = Watcher([str(loot)], 'userpass')
+    flushes = []
+
+    def flush():
+        flushes.append(sum(len(records) for records in watcher.pending.values()))
+        Watcher.flush(watcher)
+
+    monkeypatch.setattr(watcher, 'flush', flush)
+    watcher.read(loot)
+    watcher.flush()
+
+    assert len(flushes) > 2
+    assert {cred.username for cred in watcher.credentials} == set(users)
+    assert watcher.offsets[loot][1] == loot.stat().st_size - len('timmy:pass')
+
+
+def test_inotify(tmp_path):
+    '''
+    Test whether inotify reports changed files within a watched directory.
+
+    Parameters:
+        tmp_path        Temporary directory
+
+    Returns:
+        None
+    '''
+    inotify = Inotify()
+    inotify.add(tmp_path)
+
+    tmp_path.joinpath('loot.txt').write_text('alex:S3cur3P@55w0rd\n')
+
+    assert tmp_path.joinpath('loot.txt') in inotify.read(1)
+    assert inotify.read(0) == set()
+
+    inotify.close()